@@ -112,7 +112,7 @@ def update_requirements():
 
     # 添加缺失的依赖
     dependencies = [
-        "gunicorn>=20.1.0,<21.0.0",  # WSGI服务器
+        "gunicorn>=22.0.0,<24.0.0",  # WSGI服务器
         "dj-database-url>=2.1.0,<3.0.0",  # 数据库URL解析
         "psycopg2-binary>=2.9.9,<3.0.0",  # PostgreSQL适配器
     ]
@@ -0,0 +1,141 @@
+"""
+头像
+
+上传的头像在保存资料时统一处理：按 EXIF 方向旋转、居中裁剪为正方形，
+缩放为 large（资料页）和 small（列表、详情、评论）两种尺寸，以 WebP 保存且不带 EXIF。
+Profile.avatar 指向 large，small 按命名规则保存在同一目录。
+
+每个用户的头像 URL 缓存在 AVATAR_CACHE 中，模板通过 {% avatar_url user_id %} 读取，
+不需要关联 Profile 表；列表和详情视图先用 request_avatar_urls 批量取出本页作者的头像。
+是否有 small 由文件名判断（规范化的头像按 <用户id>-<随机后缀>.webp 命名），不访问存储。
+
+ProfileUpdateForm 保存后在事务提交后删除缓存，并失效显示该用户头像的页面
+（user:<id>、列表，以及该用户发布或评论过的消息和所属标签页）；被替换的旧头像文件随之删除。
+"""
+import posixpath
+import re
+import uuid
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.templatetags.static import static
+
+AVATAR_SIZES = {'small': 96, 'large': 256}
+AVATAR_KEY = 'avatar:{}'
+DEFAULT_AVATAR = 'images/default_avatar.svg'
+# store_avatar 生成的文件名，存储遇到重名时会追加 _<7 位随机字符>
+NORMALIZED_RE = re.compile(r'^\d+-[0-9a-f]{8}(_[A-Za-z0-9]{7})?\.webp$')
+
+
+def _cache():
+    return caches[getattr(settings, 'AVATAR_CACHE', 'default')]
+
+
+def small_name(name):
+    """avatars/7-1a2b.webp -> avatars/7-1a2b-small.webp"""
+    stem, ext = posixpath.splitext(name)
+    return f'{stem}-small{ext}'
+
+
+def _encode(image, size):
+    from PIL import Image, ImageOps
+
+    buffer = BytesIO()
+    ImageOps.fit(image, (size, size), Image.LANCZOS).save(
+        buffer, 'WEBP', quality=getattr(settings, 'AVATAR_QUALITY', 85)
+    )
+    return ContentFile(buffer.getvalue())
+
+
+def store_avatar(profile):
+    """把 profile.avatar 中刚上传的图片替换为规范化后的头像（不保存 profile）"""
+    from PIL import Image, ImageOps
+
+    discard_avatar(profile)
+    uploaded = profile.avatar.file
+    uploaded.seek(0)
+    image = ImageOps.exif_transpose(Image.open(uploaded))
+    image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    # 文件名带随机后缀，更换头像后 URL 随之变化，浏览器和 CDN 不会使用旧缓存
+    profile.avatar.save(f'{profile.user_id}-{uuid.uuid4().hex[:8]}.webp', _encode(image, AVATAR_SIZES['large']), save=False)
+    default_storage.save(small_name(profile.avatar.name), _encode(image, AVATAR_SIZES['small']))
+
+
+def discard_avatar(profile):
+    """事务提交后删除 profile 已保存的头像文件（large 和 small），在替换或清除头像前调用"""
+    from .models import Profile
+
+    if profile.pk is None:
+        return
+    name = Profile.objects.filter(pk=profile.pk).values_list('avatar', flat=True).first()
+    if not name:
+        return
+
+    def delete():
+        for path in (name, small_name(name)):
+            default_storage.delete(path)
+    transaction.on_commit(delete)
+
+
+def resolve_avatar(name):
+    """根据头像文件名得到各尺寸的 URL；规范化之前上传的头像没有 small，使用原图"""
+    if not name:
+        default = static(DEFAULT_AVATAR)
+        return {'small': default, 'large': default}
+    large = default_storage.url(name)
+    if not NORMALIZED_RE.match(posixpath.basename(name)):
+        return {'small': large, 'large': large}
+    return {'small': default_storage.url(small_name(name)), 'large': large}
+
+
+def avatar_urls(user_ids):
+    """批量获取用户头像 URL：{user_id: {'small': url, 'large': url}}，缓存未命中的一次查询"""
+    from .models import Profile
+
+    user_ids = set(user_ids)
+    if not user_ids:
+        return {}
+    cache = _cache()
+    cached = cache.get_many([AVATAR_KEY.format(pk) for pk in user_ids])
+    result = {pk: cached[AVATAR_KEY.format(pk)] for pk in user_ids if AVATAR_KEY.format(pk) in cached}
+    missing = user_ids - result.keys()
+    if missing:
+        names = dict(Profile.objects.filter(user_id__in=missing).values_list('user_id', 'avatar'))
+        resolved = {pk: resolve_avatar(names.get(pk)) for pk in missing}
+        cache.set_many(
+            {AVATAR_KEY.format(pk): urls for pk, urls in resolved.items()},
+            getattr(settings, 'AVATAR_CACHE_TIMEOUT', 24 * 60 * 60),
+        )
+        result.update(resolved)
+    return result
+
+
+def request_avatar_urls(request, user_ids):
+    """同一请求中复用已取过的头像 URL，只批量获取其余用户的"""
+    resolved = getattr(request, '_avatar_urls', None)
+    if resolved is None:
+        resolved = {}
+        if request is not None:
+            request._avatar_urls = resolved
+    resolved.update(avatar_urls(set(user_ids) - resolved.keys()))
+    return resolved
+
+
+def invalidate_avatar(user_id):
+    """事务提交后删除缓存的头像 URL，并失效显示该用户头像的页面"""
+    from comments.models import Comment
+    from message_board_messages.models import Message
+    from message_board_messages.page_cache import bump, message_scopes
+
+    def callback():
+        _cache().delete(AVATAR_KEY.format(user_id))
+        message_ids = {
+            *Message.objects.filter(author_id=user_id).values_list('pk', flat=True),
+            *Comment.objects.filter(author_id=user_id).values_list('message_id', flat=True).distinct(),
+        }
+        bump(f'user:{user_id}', *message_scopes(*message_ids))
+    transaction.on_commit(callback)
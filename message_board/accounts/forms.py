@@ -1,4 +1,5 @@
 from django import forms
+from .avatars import discard_avatar, invalidate_avatar, store_avatar
 from .models import Profile
 
 
@@ -9,4 +10,18 @@ class ProfileUpdateForm(forms.ModelForm):
         fields = ['avatar', 'bio', 'website']
         widgets = {
             'bio': forms.Textarea(attrs={'rows': 4}),
-        }
\ No newline at end of file
+        }
+
+    def save(self, commit=True):
+        """新上传的头像规范化为固定尺寸，删除旧头像文件，并失效缓存的头像 URL"""
+        profile = super().save(commit=False)
+        if 'avatar' in self.changed_data:
+            if profile.avatar:
+                store_avatar(profile)
+            else:
+                # 清除头像
+                discard_avatar(profile)
+            invalidate_avatar(profile.user_id)
+        if commit:
+            profile.save()
+        return profile
@@ -0,0 +1,15 @@
+from django import template
+
+from ..avatars import request_avatar_urls
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def avatar_url(context, user_id, size='small'):
+    """
+    用户头像的 URL，不查询 Profile 表
+
+    用法: <img src="{% avatar_url message.author_id %}">；同一请求中已取过的用户直接复用。
+    """
+    return request_avatar_urls(context.get('request'), [user_id])[user_id][size]
@@ -1,3 +1,117 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+
+from message_board_messages.models import Message
+from .avatars import avatar_urls, resolve_avatar, small_name
+
+
+def upload(width=1000, height=600):
+    exif = Image.Exif()
+    exif[0x010F] = 'Camera Maker'  # Make
+    buffer = BytesIO()
+    Image.new('RGB', (width, height), 'blue').save(buffer, 'JPEG', exif=exif.tobytes())
+    return SimpleUploadedFile('me.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+
+class AvatarTests(TestCase):
+    """头像规范化和头像 URL 缓存测试"""
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=media)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client.login(username='testuser', password='testpassword')
+
+    def update_avatar(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('accounts:profile'), {'avatar': upload(), 'bio': '', 'website': ''})
+        self.assertEqual(response.status_code, 302)
+        self.user.profile.refresh_from_db()
+        return self.user.profile.avatar.name
+
+    def test_upload_is_normalized(self):
+        """上传的头像裁剪为正方形的 large 和 small，WebP 且不带 EXIF"""
+        name = self.update_avatar()
+        self.assertTrue(name.endswith('.webp'))
+        for path, size in ((name, 256), (small_name(name), 96)):
+            with default_storage.open(path) as file:
+                image = Image.open(file)
+                self.assertEqual(image.format, 'WEBP')
+                self.assertEqual(image.size, (size, size))
+                self.assertFalse(image.getexif())
+
+    def test_urls_cached_and_invalidated(self):
+        """头像 URL 缓存命中不查询数据库，更换头像后失效"""
+        default = avatar_urls([self.user.pk])[self.user.pk]
+        self.assertEqual(default['small'], default['large'])
+        with self.assertNumQueries(0):
+            self.assertEqual(avatar_urls([self.user.pk])[self.user.pk], default)
+
+        name = self.update_avatar()
+        urls = avatar_urls([self.user.pk])[self.user.pk]
+        self.assertEqual(urls['large'], default_storage.url(name))
+        self.assertEqual(urls['small'], default_storage.url(small_name(name)))
+
+    def test_list_reads_avatars_in_one_query(self):
+        """列表页一次取出本页所有作者的头像，缓存命中后不再查询 Profile 表"""
+        for i in range(3):
+            author = User.objects.create_user(username=f'author{i}')
+            Message.objects.create(title=f'消息{i}', slug=f'message-{i}', author=author, content='内容', status='published')
+        url = reverse('message_board_messages:message_list')
+
+        def profile_queries():
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertContains(response, 'default_avatar.svg')
+            return [query for query in queries.captured_queries if 'accounts_profile' in query['sql']]
+
+        self.assertEqual(len(profile_queries()), 1)
+        self.assertEqual(profile_queries(), [])
+
+    def test_cached_pages_show_new_avatar(self):
+        """更换头像后缓存的列表页和详情页随之失效"""
+        message = Message.objects.create(
+            title='消息', slug='message', author=self.user, content='内容', status='published'
+        )
+        pages = [
+            reverse('message_board_messages:message_list'),
+            reverse('message_board_messages:message_detail', args=[message.pk]),
+        ]
+        for url in pages:
+            self.assertContains(Client().get(url), 'default_avatar.svg')
+        name = self.update_avatar()
+        for url in pages:
+            self.assertContains(Client().get(url), default_storage.url(small_name(name)))
+
+    def test_replaced_avatar_is_deleted(self):
+        """替换或清除头像后删除旧文件"""
+        first = self.update_avatar()
+        second = self.update_avatar()
+        self.assertFalse(default_storage.exists(first))
+        self.assertFalse(default_storage.exists(small_name(first)))
+        self.assertTrue(default_storage.exists(second))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('accounts:profile'), {'avatar-clear': 'on', 'bio': '', 'website': ''})
+        self.assertFalse(default_storage.exists(second))
+
+    def test_resolve_does_not_touch_storage(self):
+        """由文件名判断是否有 small，不逐个检查文件是否存在"""
+        with mock.patch.object(default_storage, 'exists', side_effect=AssertionError):
+            normalized = resolve_avatar('avatars/7-1a2b3c4d.webp')
+            legacy = resolve_avatar('avatars/me.jpg')
+        self.assertTrue(normalized['small'].endswith('7-1a2b3c4d-small.webp'))
+        self.assertEqual(legacy['small'], legacy['large'])
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from comments.models import Comment
+from message_board_messages.counters import apply_counter_deltas
+from message_board_messages.models import Message
+
+
+class Command(BaseCommand):
+    help = '按批次重新统计评论数，修正 Message.comments_count 的偏差'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='每批处理的消息数')
+        parser.add_argument('--dry-run', action='store_true', help='只报告偏差，不写入数据库')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        checked = fixed = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                Message.objects.filter(pk__gt=last_pk).order_by('pk')
+                .values_list('pk', 'comments_count')[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1][0]
+            actual = dict(
+                Comment.objects.filter(message_id__in=[pk for pk, _ in batch])
+                .order_by().values_list('message').annotate(total=Count('id'))
+            )
+            # 以增量方式修正，统计期间新增或删除的评论不会被覆盖
+            deltas = {pk: actual.get(pk, 0) - stored for pk, stored in batch if actual.get(pk, 0) != stored}
+            if deltas and not options['dry_run']:
+                apply_counter_deltas('comments_count', deltas)
+            checked += len(batch)
+            fixed += len(deltas)
+
+        action = '发现' if options['dry_run'] else '已修正'
+        self.stdout.write(self.style.SUCCESS(f'检查了 {checked} 条消息，{action} {fixed} 条评论数偏差'))
@@ -1,6 +1,43 @@
-from django.db import models
+import threading
+from collections import Counter
+
+from django.db import models, transaction
+from django.db.models import Count
 from django.conf import settings
 from django.utils import timezone
+from message_board_messages.counters import apply_counter_deltas
+from message_board_messages.page_cache import invalidate
+
+# 批量操作期间关闭逐条计数，由批量操作自行汇总更新
+_counting = threading.local()
+
+
+class CommentQuerySet(models.QuerySet):
+    """评论查询集，批量创建和删除时按消息汇总更新评论计数"""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            deltas = Counter(obj.message_id for obj in objs)
+            apply_counter_deltas('comments_count', deltas)
+            invalidate('counts', *(f'message:{pk}' for pk in deltas), using=self.db)
+        return objs
+
+    def delete(self):
+        with transaction.atomic(using=self.db):
+            counts = self.order_by().values_list('message').annotate(total=Count('id'))
+            deltas = {message_id: -total for message_id, total in counts}
+            _counting.suppressed = True
+            try:
+                result = super().delete()
+            finally:
+                _counting.suppressed = False
+            apply_counter_deltas('comments_count', deltas)
+            invalidate('counts', *(f'message:{pk}' for pk in deltas), using=self.db)
+        return result
+
+    delete.alters_data = True
+    delete.queryset_only = True
 
 
 class Comment(models.Model):
@@ -23,6 +60,8 @@ class Comment(models.Model):
     # 更新时间
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         # 按创建时间倒序排列
         ordering = ['-created_at']
@@ -32,21 +71,29 @@ class Comment(models.Model):
         return f'{self.author.username}: {self.content[:20]}...'
 
 
-# 信号接收器，用于更新消息的评论计数
+# 信号接收器，用于更新消息的评论计数并失效详情页缓存
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
 
+# 只更新 comments_count 一列，使用 F 表达式原子加减，避免重写整行和并发丢失计数
 @receiver(post_save, sender=Comment)
 def update_message_comments_count(sender, instance, created, **kwargs):
-    if created:
+    if created and not getattr(_counting, 'suppressed', False):
         # 增加消息的评论计数
-        instance.message.comments_count += 1
-        instance.message.save()
+        apply_counter_deltas('comments_count', {instance.message_id: 1})
+        # 评论数显示在 API 的消息列表中
+        invalidate('counts')
+    invalidate(f'message:{instance.message_id}')
 
 
 @receiver(post_delete, sender=Comment)
-def decrease_message_comments_count(sender, instance, **kwargs):
+def decrease_message_comments_count(sender, instance, origin=None, **kwargs):
+    if getattr(_counting, 'suppressed', False):
+        return
+    if getattr(origin, 'pk', None) == instance.message_id and origin._meta.model_name == 'message':
+        # 消息本身被删除时无需更新计数
+        return
     # 减少消息的评论计数
-    instance.message.comments_count -= 1
-    instance.message.save()
+    apply_counter_deltas('comments_count', {instance.message_id: -1})
+    invalidate('counts', f'message:{instance.message_id}')
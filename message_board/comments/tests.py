@@ -1,3 +1,57 @@
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
 from django.test import TestCase
 
-# Create your tests here.
+from message_board_messages.models import Message
+from .models import Comment
+
+
+class CommentsCountTests(TestCase):
+    """评论计数维护测试"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.message = Message.objects.create(
+            title='测试消息标题', slug='test-message', author=self.user,
+            content='测试消息内容' * 1000, status='published'
+        )
+
+    def count(self):
+        return Message.objects.values_list('comments_count', flat=True).get(pk=self.message.pk)
+
+    def test_create_updates_only_counter_column(self):
+        """新增评论只更新 comments_count 一列"""
+        with self.assertNumQueries(2):
+            Comment.objects.create(message=self.message, author=self.user, content='评论')
+        self.assertEqual(self.count(), 1)
+
+    def test_delete_decrements(self):
+        comment = Comment.objects.create(message=self.message, author=self.user, content='评论')
+        comment.delete()
+        self.assertEqual(self.count(), 0)
+
+    def test_bulk_create_and_queryset_delete(self):
+        """批量创建和批量删除按消息汇总更新计数"""
+        Comment.objects.bulk_create([
+            Comment(message=self.message, author=self.user, content=f'评论{i}') for i in range(5)
+        ])
+        self.assertEqual(self.count(), 5)
+        Comment.objects.filter(content__in=['评论0', '评论1']).delete()
+        self.assertEqual(self.count(), 3)
+
+    def test_stale_instance_does_not_overwrite_counter(self):
+        """用过期实例保存消息不会覆盖计数"""
+        Comment.objects.create(message=self.message, author=self.user, content='评论')
+        self.message.title = '新标题'
+        self.message.save()
+        self.assertEqual(self.count(), 1)
+
+    def test_recount_comments_fixes_drift(self):
+        Comment.objects.create(message=self.message, author=self.user, content='评论')
+        Message.objects.filter(pk=self.message.pk).update(comments_count=7)
+        out = StringIO()
+        call_command('recount_comments', '--batch-size', '1', stdout=out)
+        self.assertEqual(self.count(), 1)
+        self.assertIn('1 条', out.getvalue())
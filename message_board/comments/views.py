@@ -2,7 +2,8 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.http import HttpResponseBadRequest
 from .models import Comment
-from message_board_messages.models import Message, Notification
+from message_board_messages.models import Message
+from message_board_messages.notifications import notify
 
 
 @login_required
@@ -25,15 +26,8 @@ def add_comment(request, message_id):
             content=content
         )
         
-        # 创建通知（如果评论者不是消息作者）
-        if request.user != message.author:
-            Notification.objects.create(
-                recipient=message.author,
-                actor=request.user,
-                verb='comment',
-                target=message,
-                content=f'{request.user.username} 评论了您的消息 "{message.title}"'
-            )
+        # 发送通知（如果评论者不是消息作者），由后台批量写入
+        notify(message.author_id, request.user, 'comment', message)
 
     # 重定向到消息详情页
     return redirect('message_board_messages:message_detail', pk=message_id)
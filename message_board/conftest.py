@@ -0,0 +1,17 @@
+import pytest
+from django.core.cache import caches
+
+
+@pytest.fixture(autouse=True)
+def sync_notifications(settings):
+    """测试中直接写入通知、刷新相关消息，不启动后台线程"""
+    settings.NOTIFICATION_DISPATCH_MODE = 'sync'
+    settings.RELATED_REFRESH_MODE = 'sync'
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    """测试之间不共享缓存中的计数"""
+    for cache in caches.all():
+        cache.clear()
+    yield
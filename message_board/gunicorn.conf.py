@@ -0,0 +1,119 @@
+"""
+Gunicorn 生产环境配置
+
+在 message_board/ 目录下直接运行 `gunicorn`，或在仓库根目录运行
+`gunicorn -c message_board/gunicorn.conf.py`。各项都可以通过环境变量调整：
+
+- PORT: 监听端口（Railway / Render 会自动设置），默认 8000
+- WEB_CONCURRENCY: worker 进程数，默认 CPU 核数 * 2 + 1（最多 GUNICORN_MAX_WORKERS 个）；
+  缓存使用 locmem 时页面代数、计数和会话无法在进程之间共享，只启动一个 worker
+- GUNICORN_WORKER_CLASS:
+    - gthread（默认）: 多进程 + 每进程 GUNICORN_THREADS 个线程，适合数据库 / 缓存 I/O 较多的页面
+    - sync: 每个进程同时只处理一个请求
+    - asgi: 通过 uvicorn-worker 运行 message_board.asgi（视图都是同步的，会在线程中执行）
+- GUNICORN_PRELOAD: 在主进程中预先加载应用再 fork，worker 共享只读内存、启动更快，默认开启
+- GUNICORN_MAX_REQUESTS / GUNICORN_MAX_REQUESTS_JITTER: 处理一定数量请求后重启 worker，防止内存缓慢增长
+- GUNICORN_KEEPALIVE: keep-alive 连接空闲秒数（sync worker 不支持 keep-alive）
+- GUNICORN_TIMEOUT / GUNICORN_GRACEFUL_TIMEOUT: 请求超时和平滑退出时等待进行中请求的秒数
+
+平滑重启：`kill -HUP <主进程>` 按新配置逐个替换 worker，不中断请求；预加载时应用代码在主进程中，
+部署新代码需要 `kill -USR2 <主进程>` 启动新主进程，确认正常后向旧主进程发送 QUIT。
+主进程 PID 写入 GUNICORN_PIDFILE（设置时）。
+"""
+import multiprocessing
+import os
+import sys
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def _cpu_count():
+    try:
+        # 容器中只统计分配给当前进程的核
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return multiprocessing.cpu_count()
+
+
+WORKER_CLASSES = {
+    'sync': 'sync',
+    'gthread': 'gthread',
+    'asgi': 'uvicorn_worker.UvicornWorker',
+}
+
+mode = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+if mode not in WORKER_CLASSES:
+    raise ValueError(f'GUNICORN_WORKER_CLASS 只能是 {", ".join(WORKER_CLASSES)}，而不是 {mode!r}')
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'message_board.settings')
+
+chdir = os.path.dirname(os.path.abspath(__file__))
+if chdir not in sys.path:
+    sys.path.insert(0, chdir)
+
+from message_board.cache_config import CACHE_ALIASES, cache_backend  # noqa: E402
+
+
+def _process_local_cache():
+    return any(cache_backend(os.environ, alias) == 'locmem' for alias in CACHE_ALIASES)
+
+
+wsgi_app = 'message_board.asgi:application' if mode == 'asgi' else 'message_board.wsgi:application'
+bind = f'0.0.0.0:{os.environ.get("PORT", "8000")}'
+
+worker_class = WORKER_CLASSES[mode]
+if _process_local_cache():
+    # 各 worker 各有一份缓存，一个 worker 中的失效其他 worker 看不到，会长时间返回旧页面
+    workers = 1
+else:
+    workers = _env_int('WEB_CONCURRENCY', min(_cpu_count() * 2 + 1, _env_int('GUNICORN_MAX_WORKERS', 12)))
+threads = _env_int('GUNICORN_THREADS', 4) if mode == 'gthread' else 1
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'True').lower() == 'true'
+
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 1000)
+# 错开各 worker 的重启时间，避免同时重启
+max_requests_jitter = _env_int('GUNICORN_MAX_REQUESTS_JITTER', 100)
+keepalive = _env_int('GUNICORN_KEEPALIVE', 5)
+timeout = _env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = _env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+
+pidfile = os.environ.get('GUNICORN_PIDFILE') or None
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG') or None
+errorlog = '-'
+# 平台的负载均衡在前面终止 HTTPS，信任其转发的协议头
+forwarded_allow_ips = os.environ.get('FORWARDED_ALLOW_IPS', '*')
+
+
+def when_ready(server):
+    if _process_local_cache():
+        server.log.warning(
+            '缓存使用 locmem，只启动 1 个 worker；设置 CACHE_BACKEND=redis / memcached / db 后可启动多个 worker'
+        )
+
+
+def post_fork(server, worker):
+    # 预加载时主进程可能已经打开过数据库连接，不能与 worker 共用
+    if server.cfg.preload_app:
+        from django.db import connections
+
+        connections.close_all()
+
+
+def worker_exit(server, worker):
+    """worker 退出（重启、平滑重启、关闭）前写回进程内缓冲的通知、浏览量和待刷新的相关消息"""
+    from django.apps import apps
+
+    if not apps.ready:
+        return
+    try:
+        from message_board_messages.counters import flush_view_counts
+        from message_board_messages.notifications import flush_queue
+        from message_board_messages.related import flush_queue as flush_related
+
+        flush_queue()
+        flush_view_counts()
+        flush_related()
+    except Exception:
+        server.log.exception('worker 退出时写回缓冲数据失败')
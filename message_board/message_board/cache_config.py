@@ -0,0 +1,91 @@
+"""
+缓存配置
+
+根据环境变量生成 CACHES 配置，所有别名使用同一种后端：
+
+- CACHE_BACKEND: locmem（默认，开发用）、file、db、redis、memcached
+- CACHE_URL: redis / memcached 的地址，file 后端为缓存目录
+- CACHE_KEY_PREFIX / CACHE_VERSION: 键前缀和版本号，修改版本号即可整体失效
+- CACHE_BACKEND_<ALIAS>: 单独为某个别名指定后端，例如 CACHE_BACKEND_SESSIONS=db
+
+别名：
+- default: 通用缓存
+- pages: 页面和片段缓存
+- counters: 浏览量、未读数等计数器
+- sessions: 会话（共享后端时使用 cached_db 会话）
+
+locmem 只在单个进程内有效，gunicorn 多进程部署时应使用 redis、memcached 或 db。
+"""
+import os
+
+CACHE_ALIASES = ('default', 'pages', 'counters', 'sessions')
+
+BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'db': 'django.core.cache.backends.db.DatabaseCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+    'memcached': 'django.core.cache.backends.memcached.PyMemcacheCache',
+    'dummy': 'django.core.cache.backends.dummy.DummyCache',
+}
+
+# 进程间共享的后端
+SHARED_BACKENDS = ('file', 'db', 'redis', 'memcached')
+
+DEFAULT_LOCATIONS = {
+    'redis': 'redis://127.0.0.1:6379/0',
+    'memcached': '127.0.0.1:11211',
+}
+
+# 各别名的默认过期时间（秒），None 表示不过期，由写入方自行指定
+TIMEOUTS = {
+    'default': 300,
+    'pages': 6 * 60 * 60,
+    'counters': None,
+    'sessions': 14 * 24 * 60 * 60,
+}
+
+
+def cache_backend(environ, alias='default'):
+    """获取某个别名使用的后端名称"""
+    backend = environ.get(f'CACHE_BACKEND_{alias.upper()}') or environ.get('CACHE_BACKEND') or 'locmem'
+    if backend not in BACKENDS:
+        raise ValueError(f'未知的缓存后端: {backend}，可选值为 {", ".join(BACKENDS)}')
+    return backend
+
+
+def build_caches(environ=None, base_dir='.'):
+    """根据环境变量生成 CACHES 配置"""
+    environ = os.environ if environ is None else environ
+    prefix = environ.get('CACHE_KEY_PREFIX', 'message_board')
+    version = int(environ.get('CACHE_VERSION', 1))
+
+    caches = {}
+    for alias in CACHE_ALIASES:
+        backend = cache_backend(environ, alias)
+        config = {
+            'BACKEND': BACKENDS[backend],
+            'KEY_PREFIX': f'{prefix}:{alias}',
+            'VERSION': version,
+            'TIMEOUT': TIMEOUTS[alias],
+        }
+        if backend == 'locmem':
+            config['LOCATION'] = f'{prefix}-{alias}'
+            config['OPTIONS'] = {'MAX_ENTRIES': 10000}
+        elif backend == 'file':
+            root = environ.get('CACHE_URL') or os.path.join(base_dir, '.cache')
+            config['LOCATION'] = os.path.join(root, alias)
+            config['OPTIONS'] = {'MAX_ENTRIES': 10000}
+        elif backend == 'db':
+            # 所有别名共用一张表，通过 KEY_PREFIX 区分；需先运行 createcachetable
+            config['LOCATION'] = environ.get('CACHE_TABLE', 'cache_table')
+        elif backend in DEFAULT_LOCATIONS:
+            config['LOCATION'] = environ.get('CACHE_URL') or DEFAULT_LOCATIONS[backend]
+        caches[alias] = config
+    return caches
+
+
+def uses_shared_sessions(environ=None):
+    """会话别名是否为进程间共享的后端"""
+    environ = os.environ if environ is None else environ
+    return cache_backend(environ, 'sessions') in SHARED_BACKENDS
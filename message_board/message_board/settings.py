@@ -14,6 +14,7 @@ from pathlib import Path
 import os
 from dotenv import load_dotenv
 import dj_database_url
+from .cache_config import build_caches, uses_shared_sessions
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -62,6 +63,13 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# 进程内提供静态文件（WhiteNoise），适用于 Railway / Render 等前面没有 Nginx 的部署；
+# 由前置代理或 CDN 提供 /static/ 时设置 SERVE_STATIC=False
+SERVE_STATIC = os.environ.get('SERVE_STATIC', 'True').lower() == 'true'
+if SERVE_STATIC:
+    # 放在 SecurityMiddleware 之后、其他中间件之前，静态文件请求不经过会话和认证
+    MIDDLEWARE.insert(1, 'whitenoise.middleware.WhiteNoiseMiddleware')
+
 ROOT_URLCONF = 'message_board.urls'
 
 TEMPLATES = [
@@ -74,6 +82,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'message_board_messages.context_processors.notifications',
             ],
         },
     },
@@ -126,6 +135,14 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
+# collectstatic 生成带内容哈希的文件名和 gzip / brotli 预压缩版本，详见 static_storage.py
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'message_board.static_storage.StaticFilesStorage'},
+}
+# 开发时修改静态文件无需重新 collectstatic
+WHITENOISE_USE_FINDERS = DEBUG
+WHITENOISE_AUTOREFRESH = DEBUG
 
 # Media files
 MEDIA_URL = 'media/'
@@ -146,14 +163,80 @@ REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10
 }
+# API 列表使用 values() + orjson 的快速路径（fastpath.py），False 时统一走序列化器
+API_FAST_LIST = True
 
 # 缓存配置
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'unique-snowflake',
-    }
-}
+# 通过 CACHE_BACKEND 环境变量选择 locmem / file / db / redis / memcached，详见 cache_config.py
+CACHES = build_caches(os.environ, BASE_DIR)
+if uses_shared_sessions(os.environ):
+    # 会话放在共享缓存中，数据库作为后备
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    SESSION_CACHE_ALIAS = 'sessions'
+
+# 列表分页模式：'cursor' 为游标分页，只有上一页/下一页，深翻页不做 COUNT(*) 和 OFFSET；
+# 'page' 为页码分页。请求带 page 参数（旧链接）时总是使用页码分页，带 cursor 参数时总是使用游标分页
+MESSAGE_PAGINATION_MODE = os.environ.get('MESSAGE_PAGINATION_MODE', 'cursor')
+# 游标分页附带的近似总数缓存时间（秒）
+APPROXIMATE_COUNT_CACHE = 'counters'
+APPROXIMATE_COUNT_TIMEOUT = 5 * 60
+
+# 浏览量计数配置
+# 浏览量先累计在缓存中，每隔 VIEW_COUNTER_FLUSH_INTERVAL 秒批量写回一次；
+# 设为 None 时只通过 flush_view_counts 管理命令（如定时任务）写回
+VIEW_COUNTER_CACHE = 'counters'
+VIEW_COUNTER_DEDUPE_WINDOW = 30 * 60  # 同一访客30分钟内重复访问只计一次
+VIEW_COUNTER_FLUSH_INTERVAL = 60
+
+# 页面缓存配置
+# 匿名访问的列表、标签和详情页按代数缓存，数据变化时由信号失效，详见 page_cache.py
+PAGE_CACHE_ALIAS = 'pages'
+PAGE_CACHE_TIMEOUT = int(os.environ.get('PAGE_CACHE_TIMEOUT', 6 * 60 * 60))
+
+# 全文搜索最多返回的结果数，详见 search.py
+SEARCH_MAX_RESULTS = 1000
+# 中文分词：'bigram' 只用二元组；'jieba' 额外写入词典分词得到的长词（需安装 jieba）
+SEARCH_SEGMENTER = os.environ.get('SEARCH_SEGMENTER', 'bigram')
+
+# 相关消息：每条消息保存的数量，以及消息变化时刷新的邻居数，详见 related.py
+RELATED_MESSAGES_COUNT = 3
+RELATED_REFRESH_NEIGHBOURS = 50
+# 'thread' 由后台线程批量刷新邻居的相关消息；'sync' 在事务提交后直接刷新
+RELATED_REFRESH_MODE = os.environ.get('RELATED_REFRESH_MODE', 'thread')
+RELATED_REFRESH_INTERVAL = 2  # 后台线程最多等待多少秒凑满一批
+
+# 用户收藏的消息 id 列表缓存，详见 interactions.py
+INTERACTION_CACHE = 'default'
+INTERACTION_CACHE_TIMEOUT = 24 * 60 * 60
+
+# 用户头像 URL 缓存，详见 accounts/avatars.py
+AVATAR_CACHE = 'default'
+AVATAR_CACHE_TIMEOUT = 24 * 60 * 60
+
+# 图片缩放版本，详见 images.py
+# 'thread' 由后台线程池生成；'sync' 在事务提交后直接生成
+IMAGE_PROCESSING_MODE = os.environ.get('IMAGE_PROCESSING_MODE', 'thread')
+IMAGE_PROCESSING_WORKERS = 2
+IMAGE_VARIANT_WIDTHS = {'thumb': 240, 'card': 480, 'detail': 960}
+IMAGE_VARIANT_QUALITY = 80
+# CKEditor 上传的图片保存到 media/uploads/ 并生成缩放版本
+CKEDITOR_5_FILE_STORAGE = 'message_board_messages.images.EditorImageStorage'
+
+# 热门排序：各计数的权重、时间衰减指数和重新计算的时间窗口，详见 ranking.py
+HOT_SCORE_WEIGHTS = {'views': 1, 'likes': 5, 'favorites': 8, 'comments': 10}
+HOT_SCORE_GRAVITY = 1.5
+HOT_SCORE_WINDOW_DAYS = 30
+
+# 通知分发配置
+# 'thread' 由后台线程批量写入通知；'sync' 在请求中直接写入
+NOTIFICATION_DISPATCH_MODE = os.environ.get('NOTIFICATION_DISPATCH_MODE', 'thread')
+NOTIFICATION_FLUSH_INTERVAL = 2  # 后台线程最多等待多少秒凑满一批
+NOTIFICATION_BATCH_SIZE = 500
+# 打开通知列表时标记已读的范围：'page' 只标记当前页，'all' 标记全部
+NOTIFICATION_MARK_READ_SCOPE = 'page'
+# 未读通知数缓存
+NOTIFICATION_COUNTER_CACHE = 'counters'
+NOTIFICATION_UNREAD_TIMEOUT = 60 * 60
 
 # 安全配置
 SECURE_CROSS_ORIGIN_OPENER_POLICY = 'same-origin-allow-popups'
@@ -0,0 +1,20 @@
+"""
+静态文件存储
+
+collectstatic 时为每个文件生成带内容哈希的文件名（staticfiles.json 清单），
+并预先生成 gzip 和 brotli（安装了 Brotli 时）压缩版本。文件内容不变则 URL 不变，
+WhiteNoise 对带哈希的文件返回十年的 Cache-Control: max-age 和 immutable，回访用户不再下载。
+
+开发和测试时通常没有运行 collectstatic，此时 {% static %} 输出原文件名，
+由 runserver / finders 提供；一旦生成了清单，缺少条目就按 Django 的默认行为报错。
+"""
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+
+class StaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """带内容哈希和预压缩的静态文件存储，没有清单时退回原文件名"""
+
+    def stored_name(self, name):
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Message, Tag
+from .search import search_message_ids
 
 @admin.register(Message)
 class MessageAdmin(admin.ModelAdmin):
@@ -11,6 +12,12 @@ class MessageAdmin(admin.ModelAdmin):
     date_hierarchy = 'published_at'
     ordering = ('status', '-published_at')
 
+    def get_search_results(self, request, queryset, search_term):
+        """使用全文索引搜索，不再对正文做 icontains 扫描"""
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(pk__in=search_message_ids(search_term)), False
+
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
     list_display = ('name', 'slug')
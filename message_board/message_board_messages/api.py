@@ -1,46 +1,113 @@
 from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticated
-from .models import Message, Tag, Favorite, Like
-from .serializers import MessageSerializer, TagSerializer, FavoriteSerializer, LikeSerializer
+from rest_framework.renderers import BrowsableAPIRenderer
+from .models import Message, MessageQuerySet, Tag, Favorite, Like
+from .serializers import MessageSerializer, MessageListSerializer, TagSerializer, FavoriteSerializer, LikeSerializer
+from .pagination import MessageKeysetPagination
+from .search import SearchResults
+from .conditional import ConditionalMixin
+from .fastpath import (
+    FastListMixin, INTERACTION_VALUES, MESSAGE_VALUES, TAG_VALUES, interaction_rows, message_rows, tag_rows,
+)
+from .renderers import FastJSONRenderer
 
 
 
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(ConditionalMixin, FastListMixin, viewsets.ReadOnlyModelViewSet):
     """标签API视图集"""
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+    fast_values = TAG_VALUES
+    fast_rows = staticmethod(tag_rows)
+    # 标签的增删改会递增 list 的代数
+    retrieve_etag_scopes = ('list',)
 
 
-class MessageViewSet(viewsets.ReadOnlyModelViewSet):
+class MessageViewSet(ConditionalMixin, FastListMixin, viewsets.ReadOnlyModelViewSet):
     """消息API视图集"""
     queryset = Message.objects.filter(status='published').select_related('author').prefetch_related('tags')
     serializer_class = MessageSerializer
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+    fast_values = MESSAGE_VALUES
+    fast_rows = staticmethod(message_rows)
+    # 列表中的评论数和浏览量由 counts 单独失效
+    list_etag_scopes = ('list', 'counts')
+    retrieve_etag_scopes = ('message:{pk}', 'related')
+    # 默认页码分页；带 ?cursor 时按 (created_at, id) 游标分页，深翻页不使用 OFFSET；?sort=hot 按 (hot_score, id)
+    pagination_class = MessageKeysetPagination
+    sort_orderings = {
+        'latest': ('-created_at', '-id'),
+        'hot': ('-hot_score', '-id'),
+    }
 
+    @property
+    def keyset_ordering(self):
+        sort = self.request.query_params.get('sort')
+        return self.sort_orderings.get(sort, self.sort_orderings['latest'])
 
-class FavoriteViewSet(viewsets.ModelViewSet):
+    def get_queryset(self):
+        """列表只取列表字段，详情才加载正文"""
+        if self.action == 'list':
+            return Message.objects.published().for_list()
+        return super().get_queryset()
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return MessageListSerializer
+        return MessageSerializer
+
+    def filter_queryset(self, queryset):
+        """列表支持 ?search= 全文搜索，结果按相关度排序；其余按 ?sort= 排序"""
+        queryset = super().filter_queryset(queryset)
+        if self.action != 'list':
+            return queryset
+        query = self.request.query_params.get('search', '').strip()
+        if query:
+            return SearchResults(queryset, query)
+        # 页码分页同样按所选排序
+        return queryset.order_by(*self.keyset_ordering)
+
+
+class FavoriteViewSet(ConditionalMixin, FastListMixin, viewsets.ModelViewSet):
     """收藏API视图集"""
     serializer_class = FavoriteSerializer
     permission_classes = [IsAuthenticated]
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+    fast_values = INTERACTION_VALUES
+    fast_rows = staticmethod(interaction_rows)
+    list_etag_scopes = retrieve_etag_scopes = ('list', 'user:{user_id}')
+    # 带 ?cursor 时按 (user, created_at, id) 索引游标分页
+    pagination_class = MessageKeysetPagination
+    keyset_ordering = ('-created_at', '-id')
     
     def get_queryset(self):
-        """获取当前用户的收藏"""
-        return Favorite.objects.filter(user=self.request.user).select_related('message', 'message__author')
+        """获取当前用户的收藏，消息只取列表字段"""
+        return Favorite.objects.filter(user=self.request.user).only(
+            'id', 'user', 'message', 'created_at', *MessageQuerySet.list_fields('message__')
+        ).select_related('message__author').prefetch_related('message__tags')
     
     def perform_create(self, serializer):
         """创建收藏时设置用户"""
         serializer.save(user=self.request.user)
 
 
-class LikeViewSet(viewsets.ModelViewSet):
+class LikeViewSet(ConditionalMixin, FastListMixin, viewsets.ModelViewSet):
     """点赞API视图集"""
     serializer_class = LikeSerializer
     permission_classes = [IsAuthenticated]
+    renderer_classes = [FastJSONRenderer, BrowsableAPIRenderer]
+    fast_values = INTERACTION_VALUES
+    fast_rows = staticmethod(interaction_rows)
+    list_etag_scopes = retrieve_etag_scopes = ('list', 'user:{user_id}')
     
     def get_queryset(self):
-        """获取当前用户的点赞"""
-        return Like.objects.filter(user=self.request.user).select_related('message', 'message__author')
+        """获取当前用户的点赞，消息只取列表字段"""
+        return Like.objects.filter(user=self.request.user).only(
+            'id', 'user', 'message', 'created_at', *MessageQuerySet.list_fields('message__')
+        ).select_related('message__author').prefetch_related('message__tags')
     
     def perform_create(self, serializer):
         """创建点赞时设置用户"""
@@ -0,0 +1,83 @@
+"""
+条件请求（ETag / 304 Not Modified）
+
+ETag 由页面所依赖范围的代数（见 page_cache.py）和访问者的个人状态计算：
+
+- 匿名访问者: 只取决于代数
+- 登录用户: 另外包含 user:<id> 的代数（点赞、收藏状态）、用户 id、用户名和未读通知数（导航栏中显示）
+
+客户端带 If-None-Match 再次请求时，内容未变化就直接返回 304，不查询数据库也不渲染模板。
+消息的每次保存都会递增 message:<id> 的代数，因此页面不必再查询 updated_at；
+API 的详情接口反正要取出对象，直接使用 updated_at。
+
+不发送 Last-Modified：评论、点赞等变化不会修改 updated_at，只按时间判断会返回过期内容。
+"""
+import hashlib
+
+from django.utils.cache import get_conditional_response, quote_etag
+from django.views.decorators.http import condition
+from rest_framework.response import Response
+
+from .notifications import get_unread_count
+from .page_cache import get_generations
+
+
+def make_etag(*parts):
+    return hashlib.md5('|'.join(map(str, parts)).encode()).hexdigest()
+
+
+def page_etag(request, scopes):
+    """页面的 ETag，有待显示的消息提示时返回 None（不做条件请求）"""
+    if 'messages' in request.COOKIES:
+        return None
+    user = request.user
+    if not user.is_authenticated:
+        return make_etag(*get_generations(scopes))
+    # 列表中显示当前用户的点赞和收藏状态，由 user:<id> 的代数反映
+    parts = get_generations([*scopes, f'user:{user.pk}'])
+    parts += [user.pk, user.get_username(), get_unread_count(user)]
+    return make_etag(*parts)
+
+
+def conditional_page(*scopes):
+    """
+    为视图添加 ETag 并处理 If-None-Match 的装饰器
+
+    与 cached_page 一样，scopes 中可以引用视图的 URL 参数。
+    """
+    def etag_func(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        return page_etag(request, [scope.format(**kwargs) for scope in scopes])
+    return condition(etag_func=etag_func)
+
+
+class ConditionalMixin:
+    """
+    DRF 视图集的条件请求
+
+    list_etag_scopes / retrieve_etag_scopes 中可以引用 URL 参数和当前用户的 {user_id}。
+    ETag 同时包含用户 id 和响应格式（JSON / 可浏览 API）。
+    """
+    list_etag_scopes = ('list',)
+    retrieve_etag_scopes = ()
+
+    def get_etag(self, scopes, *extra):
+        user_id = self.request.user.pk
+        generations = get_generations([scope.format(user_id=user_id, **self.kwargs) for scope in scopes])
+        return quote_etag(make_etag(*generations, *extra, user_id, self.request.accepted_renderer.format))
+
+    def list(self, request, *args, **kwargs):
+        etag = self.get_etag(self.list_etag_scopes)
+        response = get_conditional_response(request, etag=etag) or super().list(request, *args, **kwargs)
+        response['ETag'] = etag
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        etag = self.get_etag(self.retrieve_etag_scopes, getattr(instance, 'updated_at', ''))
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = Response(self.get_serializer(instance).data)
+        response['ETag'] = etag
+        return response
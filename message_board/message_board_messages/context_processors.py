@@ -0,0 +1,11 @@
+from django.utils.functional import SimpleLazyObject
+
+from .notifications import get_unread_count
+
+
+def notifications(request):
+    """向模板提供当前用户的未读通知数，只有模板用到时才读取缓存"""
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return {}
+    return {'unread_notification_count': SimpleLazyObject(lambda: get_unread_count(user))}
@@ -0,0 +1,202 @@
+"""
+计数器工具
+
+- apply_counter_deltas: 用一条 UPDATE 批量调整多条消息的计数字段
+- 浏览量缓冲: 浏览量先累加在缓存中（同一访客在去重窗口内只计一次），
+  再按固定间隔或通过 flush_view_counts 管理命令批量写回数据库，
+  避免热门消息每次访问都对同一行加锁更新。
+
+有待写回增量的消息ID记在缓存中的队列里，只使用 add / incr 这些原子操作，
+多个 worker 共享缓存时不会互相覆盖：
+
+- views:dirty:<id> 标记消息已在队列中，只有 add 成功的请求入队
+- views:dirty-seq 由 incr 分配槽位号，消息ID用 add 写入 views:dirty-slot:<n>
+- 写回时读取上次处理到的位置（views:dirty-head）之后的槽位；写入方尚未写入的槽位
+  由写回方用 add 占用，写入方 add 失败后重新分配槽位，不会丢失
+"""
+import logging
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Case, F, IntegerField, Value, When
+from django.db.models.functions import Greatest
+
+from .page_cache import bump
+
+logger = logging.getLogger(__name__)
+
+VIEW_PENDING_KEY = 'views:pending:{}'
+VIEW_SEEN_KEY = 'views:seen:{}:{}'
+VIEW_DIRTY_KEY = 'views:dirty:{}'
+VIEW_DIRTY_SEQ_KEY = 'views:dirty-seq'
+VIEW_DIRTY_SLOT_KEY = 'views:dirty-slot:{}'
+VIEW_DIRTY_HEAD_KEY = 'views:dirty-head'
+VIEW_FLUSH_LOCK_KEY = 'views:flush-lock'
+VIEW_FLUSHING_KEY = 'views:flushing'
+# 入队标记的有效期：入队过程中进程意外退出时，标记过期后下一次浏览会重新入队
+VIEW_DIRTY_TIMEOUT = 24 * 60 * 60
+
+
+def apply_counter_deltas(field, deltas):
+    """
+    批量调整计数字段
+
+    deltas 为 {消息ID: 增量} 字典，所有消息只用一条 UPDATE 完成，
+    结果不会小于 0。返回受影响的行数。
+    """
+    from .models import Message
+
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    if not deltas:
+        return 0
+    if len(set(deltas.values())) == 1:
+        # 增量相同时不需要 CASE 表达式
+        increment = Value(next(iter(deltas.values())))
+    else:
+        increment = Case(
+            *[When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()],
+            default=Value(0),
+            output_field=IntegerField(),
+        )
+    return Message.objects.filter(pk__in=list(deltas)).update(
+        **{field: Greatest(F(field) + increment, Value(0))}
+    )
+
+
+def _view_cache():
+    return caches[getattr(settings, 'VIEW_COUNTER_CACHE', 'default')]
+
+
+def _visitor_key(request):
+    """识别访客：登录用户按用户ID，其次按会话，最后按IP"""
+    if request.user.is_authenticated:
+        return f'u{request.user.pk}'
+    session_key = getattr(request, 'session', None) and request.session.session_key
+    if session_key:
+        return f's{session_key}'
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if forwarded:
+        return f'ip{forwarded.split(",")[0].strip()}'
+    return f'ip{request.META.get("REMOTE_ADDR", "")}'
+
+
+def _incr(cache, key):
+    cache.add(key, 0, None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # 键在 add 与 incr 之间被淘汰
+        cache.add(key, 0, None)
+        return cache.incr(key)
+
+
+def _mark_dirty(cache, message_id):
+    """把有待写回增量的消息ID加入写回队列，已在队列中时不重复加入"""
+    if not cache.add(VIEW_DIRTY_KEY.format(message_id), 1, VIEW_DIRTY_TIMEOUT):
+        return
+    while True:
+        slot = _incr(cache, VIEW_DIRTY_SEQ_KEY)
+        # 槽位已被写回方占用（视为空槽跳过）时换一个
+        if cache.add(VIEW_DIRTY_SLOT_KEY.format(slot), message_id, None):
+            return
+
+
+def _take_dirty(cache):
+    """取出写回队列中的消息ID"""
+    head = cache.get(VIEW_DIRTY_HEAD_KEY) or 0
+    tail = cache.get(VIEW_DIRTY_SEQ_KEY) or 0
+    if tail <= head:
+        return set()
+    keys = [VIEW_DIRTY_SLOT_KEY.format(slot) for slot in range(head + 1, tail + 1)]
+    slots = cache.get_many(keys)
+    for key in keys:
+        # 写入方已分配槽位但还没写入：占用该槽位，写入方会换一个槽位。
+        # 占位不删除，等它过期，避免写入方随后 add 成功
+        if key not in slots and not cache.add(key, 0, 60 * 60):
+            slots[key] = cache.get(key)
+    cache.set(VIEW_DIRTY_HEAD_KEY, tail, None)
+    cache.delete_many([key for key, pk in slots.items() if pk])
+    dirty = {pk for pk in slots.values() if pk}
+    # 先清除入队标记再读取增量，之后的浏览会重新入队
+    cache.delete_many([VIEW_DIRTY_KEY.format(pk) for pk in dirty])
+    return dirty
+
+
+def record_view(request, message_id):
+    """
+    记录一次浏览
+
+    同一访客在 VIEW_COUNTER_DEDUPE_WINDOW 秒内重复访问只计一次。
+    返回本次是否计数。
+    """
+    cache = _view_cache()
+    window = getattr(settings, 'VIEW_COUNTER_DEDUPE_WINDOW', 30 * 60)
+    if not cache.add(VIEW_SEEN_KEY.format(message_id, _visitor_key(request)), 1, window):
+        return False
+
+    pending_key = VIEW_PENDING_KEY.format(message_id)
+    cache.add(pending_key, 0, None)
+    try:
+        cache.incr(pending_key)
+    except ValueError:
+        # 键在 add 与 incr 之间被淘汰
+        cache.set(pending_key, 1, None)
+    _mark_dirty(cache, message_id)
+
+    interval = getattr(settings, 'VIEW_COUNTER_FLUSH_INTERVAL', 60)
+    if interval and cache.add(VIEW_FLUSH_LOCK_KEY, 1, interval):
+        # 每个刷新周期内只有拿到锁的那个请求负责写回
+        try:
+            flush_view_counts()
+        except Exception:
+            logger.exception('写回浏览量失败')
+    return True
+
+
+def get_pending_views(message_id):
+    """获取尚未写回数据库的浏览量增量"""
+    return _view_cache().get(VIEW_PENDING_KEY.format(message_id)) or 0
+
+
+def flush_view_counts():
+    """
+    把缓存中累计的浏览量批量写回数据库
+
+    返回写回的浏览次数。写回后只扣减已写入的部分，期间新增的浏览会留到下一次写回；
+    写回失败时消息ID重新入队。同一时间只有一个进程执行写回。
+    """
+    cache = _view_cache()
+    if not cache.add(VIEW_FLUSHING_KEY, 1, 60):
+        return 0
+    try:
+        return _flush(cache)
+    finally:
+        cache.delete(VIEW_FLUSHING_KEY)
+
+
+def _flush(cache):
+    dirty = _take_dirty(cache)
+    if not dirty:
+        return 0
+
+    keys = {VIEW_PENDING_KEY.format(pk): pk for pk in dirty}
+    deltas = {keys[key]: int(value) for key, value in cache.get_many(keys).items() if value}
+    if not deltas:
+        return 0
+
+    try:
+        apply_counter_deltas('views', deltas)
+    except Exception:
+        for pk in deltas:
+            _mark_dirty(cache, pk)
+        raise
+    for pk, delta in deltas.items():
+        try:
+            remaining = cache.decr(VIEW_PENDING_KEY.format(pk), delta)
+        except ValueError:
+            continue
+        if remaining > 0:
+            _mark_dirty(cache, pk)
+    # 缓存的详情页和 API 列表随写回周期刷新浏览量
+    bump('counts', *(f'message:{pk}' for pk in deltas))
+    return sum(deltas.values())
@@ -0,0 +1,162 @@
+"""
+API 列表的快速读取路径
+
+ModelSerializer 对每个对象逐字段调用 to_representation，列表较大时占用大部分 CPU。
+这里直接用 values() 取出需要的列，拼成与序列化器输出完全相同的字典，
+再交给 renderers.FastJSONRenderer 编码。
+
+视图集混入 FastListMixin 并声明 fast_values（values() 的字段）和 fast_rows（行构造函数）
+即可启用；fast_list = False、设置 API_FAST_LIST = False 或请求带 ?fast=0 时
+退回序列化器路径。搜索结果等非 QuerySet 的数据也走序列化器路径。
+"""
+from django.conf import settings
+from django.db.models import QuerySet
+from django.utils import timezone
+from rest_framework import ISO_8601, serializers
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+from .models import Message
+
+Tagging = Message.tags.through
+
+# 时间格式与序列化器一致（ISO 8601，转换到当前时区）
+_datetime = serializers.DateTimeField()
+
+MESSAGE_VALUES = (
+    'id', 'title', 'slug', 'excerpt', 'views', 'likes', 'comments_count',
+    'author_id', 'author__username', 'created_at', 'published_at',
+)
+TAG_VALUES = ('id', 'name', 'slug', 'created_at')
+INTERACTION_VALUES = ('id', 'user_id', 'created_at', *(f'message__{name}' for name in MESSAGE_VALUES))
+
+
+def datetime_formatter():
+    """
+    返回与 DateTimeField.to_representation 输出一致的格式化函数
+
+    DateTimeField 每次调用都重新查找当前时区，这里每次请求只查找一次。
+    """
+    if api_settings.DATETIME_FORMAT != ISO_8601 or not settings.USE_TZ:
+        return lambda value: None if value is None else _datetime.to_representation(value)
+    tz = timezone.get_current_timezone()
+
+    def format_datetime(value):
+        if value is None:
+            return None
+        value = value.astimezone(tz).isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+    return format_datetime
+
+
+def tag_slugs(message_ids):
+    """一次查询取出消息的标签 slug，顺序与 Tag 的默认排序一致"""
+    slugs = {}
+    rows = (
+        Tagging.objects.filter(message_id__in=set(message_ids))
+        .order_by('tag__name')
+        .values_list('message_id', 'tag__slug')
+    )
+    for message_id, slug in rows:
+        slugs.setdefault(message_id, []).append(slug)
+    return slugs
+
+
+def message_row(row, tags, format_datetime, prefix=''):
+    """与 MessageListSerializer 的输出一致"""
+    pk = row[f'{prefix}id']
+    return {
+        'id': pk,
+        'title': row[f'{prefix}title'],
+        'slug': row[f'{prefix}slug'],
+        'excerpt': row[f'{prefix}excerpt'],
+        'views': row[f'{prefix}views'],
+        'likes': row[f'{prefix}likes'],
+        'comments_count': row[f'{prefix}comments_count'],
+        'author_id': row[f'{prefix}author_id'],
+        'author_name': row[f'{prefix}author__username'],
+        'tags': tags.get(pk, []),
+        'created_at': format_datetime(row[f'{prefix}created_at']),
+        'published_at': format_datetime(row[f'{prefix}published_at']),
+    }
+
+
+def message_rows(rows):
+    tags = tag_slugs(row['id'] for row in rows)
+    format_datetime = datetime_formatter()
+    return [message_row(row, tags, format_datetime) for row in rows]
+
+
+def tag_rows(rows):
+    """与 TagSerializer 的输出一致"""
+    format_datetime = datetime_formatter()
+    return [
+        {'id': row['id'], 'name': row['name'], 'slug': row['slug'], 'created_at': format_datetime(row['created_at'])}
+        for row in rows
+    ]
+
+
+def interaction_rows(rows):
+    """与 FavoriteSerializer / LikeSerializer 的输出一致"""
+    tags = tag_slugs(row['message__id'] for row in rows)
+    format_datetime = datetime_formatter()
+    return [
+        {
+            'id': row['id'],
+            'user': row['user_id'],
+            'message': message_row(row, tags, format_datetime, prefix='message__'),
+            'created_at': format_datetime(row['created_at']),
+        }
+        for row in rows
+    ]
+
+
+class FastListMixin:
+    """列表接口使用 values() + 普通字典，跳过序列化器"""
+    fast_list = True
+    fast_values = ()
+    fast_rows = None
+    fast_query_param = 'fast'
+    fields_query_param = 'fields'
+
+    def use_fast_list(self, queryset):
+        if not (self.fast_list and getattr(settings, 'API_FAST_LIST', True)):
+            return False
+        if self.request.query_params.get(self.fast_query_param) in ('0', 'false'):
+            return False
+        return isinstance(queryset, QuerySet)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        if not self.use_fast_list(queryset):
+            return self.serialized_list(queryset)
+
+        # values() 忽略 select_related，prefetch 也不再需要
+        values = queryset.prefetch_related(None).values(*self.get_fast_values())
+        page = self.paginate_queryset(values)
+        rows = self.sparse(self.fast_rows(list(values if page is None else page)))
+        if page is not None:
+            return self.get_paginated_response(rows)
+        return Response(rows)
+
+    def get_fast_values(self):
+        """fast_values 加上游标分页需要的排序字段"""
+        ordering = [name.lstrip('-') for name in getattr(self, 'keyset_ordering', ())]
+        return (*self.fast_values, *(name for name in ordering if name not in self.fast_values))
+
+    def serialized_list(self, queryset):
+        """与 ListModelMixin.list 相同，只是不再重复过滤"""
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
+    def sparse(self, rows):
+        """?fields= 与 SparseFieldsetsMixin 的行为一致，只作用于最外层"""
+        requested = self.request.query_params.get(self.fields_query_param)
+        if not requested:
+            return rows
+        allowed = {name.strip() for name in requested.split(',')}
+        return [{name: value for name, value in row.items() if name in allowed} for row in rows]
@@ -0,0 +1,256 @@
+"""
+图片缩放版本
+
+消息配图（Message.image）和 CKEditor 上传的图片在后台生成几种宽度的缩放版本，
+每种宽度各有 WebP 和 JPEG 两种格式，保存时去掉 EXIF 等元数据（先按 EXIF 方向旋转）。
+原图中的 EXIF（可能含 GPS 位置）同样在生成时去掉，原图按方向旋转后重新编码：
+
+- thumb: 列表缩略图
+- card: 首页卡片
+- detail: 详情页
+
+生成结果的描述（variants 字典）保存在 Message.image_variants 中；CKEditor 上传的图片
+没有对应的消息，描述写在 variants/<文件名>.json 中，渲染正文时读取并输出 <picture> / srcset；
+在描述生成之前保存的消息，生成完成后重新渲染正文。
+
+生成在事务提交后交给后台线程池执行（IMAGE_PROCESSING_MODE = 'thread'），不占用请求时间；
+'sync' 时在当前线程执行（测试、管理命令）。已有的图片运行 generate_image_variants 管理命令补齐。
+"""
+import json
+import logging
+import os
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.db import connections, transaction
+from django.utils.html import format_html, format_html_join
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WIDTHS = {'thumb': 240, 'card': 480, 'detail': 960}
+# 描述中的键 -> (Pillow 格式, 文件扩展名)
+FORMATS = {'webp': ('WEBP', 'webp'), 'jpeg': ('JPEG', 'jpg')}
+VARIANTS_DIR = 'variants'
+EDITOR_UPLOAD_DIR = 'uploads'
+
+# 需要从原图中去掉的元数据
+METADATA_KEYS = ('exif', 'xmp', 'XML:com.adobe.xmp', 'comment')
+
+_executor = None
+
+
+def variant_widths():
+    return {**DEFAULT_WIDTHS, **getattr(settings, 'IMAGE_VARIANT_WIDTHS', {})}
+
+
+def variant_name(name, suffix, ext):
+    """message_images/a.jpg -> message_images/variants/a-card.webp"""
+    directory, filename = posixpath.split(name)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(directory, VARIANTS_DIR, f'{stem}-{suffix}.{ext}')
+
+
+def manifest_name(name):
+    directory, filename = posixpath.split(name)
+    return posixpath.join(directory, VARIANTS_DIR, f'{posixpath.splitext(filename)[0]}.json')
+
+
+def _encode(image, fmt):
+    buffer = BytesIO()
+    quality = getattr(settings, 'IMAGE_VARIANT_QUALITY', 80)
+    if fmt == 'JPEG':
+        if image.mode == 'RGBA':
+            # JPEG 不支持透明，铺白色背景
+            from PIL import Image
+            background = Image.new('RGB', image.size, 'white')
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        image.save(buffer, 'JPEG', quality=quality, optimize=True, progressive=True)
+    else:
+        image.save(buffer, 'WEBP', quality=quality, method=4)
+    return ContentFile(buffer.getvalue())
+
+
+def _has_metadata(image):
+    return bool(image.getexif()) or any(key in image.info for key in METADATA_KEYS)
+
+
+def strip_metadata(name, image, fmt, storage):
+    """用已按方向旋转的 image 覆盖原图，不写入 EXIF 等元数据（保留颜色配置）"""
+    for key in METADATA_KEYS:
+        image.info.pop(key, None)
+    buffer = BytesIO()
+    options = {'quality': 95} if fmt in ('JPEG', 'WEBP') else {}
+    if image.info.get('icc_profile'):
+        options['icc_profile'] = image.info['icc_profile']
+    image.save(buffer, fmt, **options)
+    # 直接写入同名文件，不经过 save()：名称不变，也不会再次触发生成
+    with storage.open(name, 'wb') as file:
+        file.write(buffer.getvalue())
+
+
+def generate_variants(name, storage=None):
+    """
+    生成图片的缩放版本并返回描述：
+
+        {'source': name, 'width': ..., 'height': ...,
+         'variants': {'card': {'width': 480, 'height': 320, 'webp': '...webp', 'jpeg': '...jpg'}, ...}}
+
+    不放大图片：比原图宽的版本使用原图宽度，相同宽度只生成一次。
+    """
+    from PIL import Image, ImageOps
+
+    storage = storage or default_storage
+    with storage.open(name) as source:
+        original = Image.open(source)
+        original.load()
+    fmt, has_metadata = original.format, _has_metadata(original)
+    # 先按 EXIF 方向旋转，重新编码时不携带 EXIF
+    original = ImageOps.exif_transpose(original)
+    if has_metadata and fmt in ('JPEG', 'PNG', 'WEBP'):
+        strip_metadata(name, original, fmt, storage)
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA' if 'A' in original.getbands() or original.mode == 'P' else 'RGB')
+
+    by_width = {}
+    variants = {}
+    for suffix, target in sorted(variant_widths().items(), key=lambda item: item[1]):
+        width = min(target, original.width)
+        if width not in by_width:
+            height = max(round(original.height * width / original.width), 1)
+            resized = original if width == original.width else original.resize((width, height), Image.LANCZOS)
+            files = {'width': width, 'height': height}
+            for key, (fmt, ext) in FORMATS.items():
+                target_name = variant_name(name, suffix, ext)
+                if storage.exists(target_name):
+                    storage.delete(target_name)
+                files[key] = storage.save(target_name, _encode(resized, fmt))
+            by_width[width] = files
+        variants[suffix] = by_width[width]
+    return {'source': name, 'width': original.width, 'height': original.height, 'variants': variants}
+
+
+def run_in_background(func, *args):
+    """事务提交后执行 func，IMAGE_PROCESSING_MODE = 'thread' 时交给后台线程池"""
+    def submit():
+        if getattr(settings, 'IMAGE_PROCESSING_MODE', 'thread') == 'sync':
+            func(*args)
+            return
+        global _executor
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'IMAGE_PROCESSING_WORKERS', 2), thread_name_prefix='image-variants'
+            )
+        _executor.submit(_logged, func, *args)
+    transaction.on_commit(submit)
+
+
+def _logged(func, *args):
+    try:
+        func(*args)
+    except Exception:
+        logger.exception('生成图片缩放版本失败: %s', args)
+    finally:
+        # 后台线程使用的数据库连接不会被请求结束时的清理关闭
+        connections.close_all()
+
+
+def process_message_image(message_id):
+    """为消息配图生成缩放版本，并保存到 Message.image_variants"""
+    from .models import Message
+    from .page_cache import bump, message_scopes
+
+    name = Message.objects.filter(pk=message_id).values_list('image', flat=True).first()
+    variants = generate_variants(name) if name else {}
+    # 生成期间图片已被替换时放弃结果，由新图片的任务负责
+    updated = Message.objects.filter(pk=message_id, image=name or '').update(image_variants=variants)
+    if updated:
+        bump(*message_scopes(message_id))
+    return variants
+
+
+def process_editor_image(name, storage):
+    """为 CKEditor 上传的图片生成缩放版本，描述写入 JSON 文件，再重新渲染已经引用它的消息"""
+    variants = generate_variants(name, storage)
+    manifest = manifest_name(name)
+    if storage.exists(manifest):
+        storage.delete(manifest)
+    storage.save(manifest, ContentFile(json.dumps(variants).encode()))
+    rerender_messages(storage.url(name))
+    return variants
+
+
+def rerender_messages(url):
+    """重新渲染正文中引用了 url 的消息，让描述生成前保存的正文也输出 <picture>"""
+    from .models import Message
+    from .page_cache import bump, message_scopes
+    from .rendering import render_content
+
+    updated = []
+    for pk, content in Message.objects.filter(content__contains=url).values_list('pk', 'content'):
+        html, _ = render_content(content)
+        # 期间正文又被修改时由那次保存负责渲染
+        if Message.objects.filter(pk=pk, content=content).update(content_html=html):
+            updated.append(pk)
+    if updated:
+        bump(*message_scopes(*updated))
+    return updated
+
+
+class EditorImageStorage(FileSystemStorage):
+    """CKEditor 上传使用的存储，保存原图后在后台生成缩放版本（CKEDITOR_5_FILE_STORAGE）"""
+
+    def __init__(self, **kwargs):
+        kwargs.setdefault('location', os.path.join(settings.MEDIA_ROOT, EDITOR_UPLOAD_DIR))
+        kwargs.setdefault('base_url', f'{settings.MEDIA_URL.rstrip("/")}/{EDITOR_UPLOAD_DIR}/')
+        super().__init__(**kwargs)
+
+    def _save(self, name, content):
+        name = super()._save(name, content)
+        if not name.startswith(f'{VARIANTS_DIR}/') and f'/{VARIANTS_DIR}/' not in name:
+            run_in_background(process_editor_image, name, self)
+        return name
+
+
+def editor_image_variants(url):
+    """根据 CKEditor 上传图片的 URL 读取缩放版本的描述，不是上传图片或尚未生成时返回 None"""
+    storage = EditorImageStorage()
+    prefix = storage.base_url
+    if not url.startswith(prefix):
+        return None
+    manifest = manifest_name(url[len(prefix):])
+    try:
+        with storage.open(manifest) as file:
+            return json.loads(file.read())
+    except (OSError, ValueError):
+        return None
+
+
+def srcset(variants, ext, storage=None):
+    """同一格式各宽度的 srcset"""
+    storage = storage or default_storage
+    unique = {item['width']: item[ext] for item in variants['variants'].values()}
+    return ', '.join(f'{storage.url(name)} {width}w' for width, name in sorted(unique.items()))
+
+
+def picture_html(variants, size, alt='', sizes=None, storage=None, **attrs):
+    """
+    输出 <picture>：WebP 的 <source> 加上 JPEG 的 <img>
+
+    size 为默认显示的版本（thumb / card / detail），sizes 未指定时使用该版本的宽度。
+    """
+    storage = storage or default_storage
+    default = variants['variants'][size]
+    sizes = sizes or f'(max-width: {default["width"]}px) 100vw, {default["width"]}px'
+    extra = format_html_join('', ' {}="{}"', sorted(attrs.items()))
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}" loading="lazy"{}></picture>',
+        srcset(variants, 'webp', storage), sizes,
+        storage.url(default['jpeg']), srcset(variants, 'jpeg', storage), sizes,
+        default['width'], default['height'], alt, extra,
+    )
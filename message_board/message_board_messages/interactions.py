@@ -0,0 +1,149 @@
+"""
+互动服务：点赞 / 取消点赞、收藏 / 取消收藏
+
+依靠 (user, message) 唯一约束做“插入或忽略”：在保存点中直接插入，违反唯一约束时回滚保存点，
+与 get_or_create 的做法相同，不再先查询是否已点赞；计数更新与插入或删除在同一个短事务中完成，
+并返回新的点赞数。插入走 create()，页面缓存失效和收藏数由 Like / Favorite 的信号处理。
+
+每个用户收藏的消息 id 列表（最近收藏的在前）缓存在 INTERACTION_CACHE 中，
+收藏和取消收藏时在事务提交后直接修改缓存中的列表，不必重新查询。
+
+页面上“已点赞 / 已收藏”的状态由 interaction_state 对当前页的消息一次查询得到；
+收藏数保存在 Message.favorites_count 中，与点赞数一样原子更新。
+"""
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import IntegrityError, router, transaction
+from django.db.models import CharField, Value
+
+from .counters import apply_counter_deltas
+from .models import Favorite, Like, Message
+
+FAVORITE_IDS_KEY = 'favorites:ids:{}'
+
+InteractionState = namedtuple('InteractionState', ['liked', 'favorited'])
+
+
+def _insert_ignore(model, using, user, message):
+    """插入一行，违反唯一约束时忽略，返回是否真正插入"""
+    try:
+        # 保存点让冲突只回滚这一条插入，外层事务可以继续
+        with transaction.atomic(using=using):
+            model.objects.using(using).create(user_id=user.pk, message_id=message.pk)
+    except IntegrityError:
+        return False
+    return True
+
+
+def _bump_likes(message_id, delta, using):
+    """调整点赞数（不小于0）并返回新值"""
+    apply_counter_deltas('likes', {message_id: delta})
+    return Message.objects.using(using).values_list('likes', flat=True).get(pk=message_id)
+
+
+def like(user, message):
+    """
+    点赞，返回 (是否新点赞, 点赞数)
+
+    已经点赞过时不做任何修改，点赞数返回 None。
+    """
+    using = router.db_for_write(Like)
+    with transaction.atomic(using=using):
+        if not _insert_ignore(Like, using, user, message):
+            return False, None
+        return True, _bump_likes(message.pk, 1, using)
+
+
+def unlike(user, message):
+    """
+    取消点赞，返回 (是否取消成功, 点赞数)
+
+    尚未点赞时不做任何修改，点赞数返回 None。
+    """
+    using = router.db_for_write(Like)
+    with transaction.atomic(using=using):
+        deleted, _ = Like.objects.using(using).filter(user=user, message_id=message.pk).delete()
+        if not deleted:
+            return False, None
+        return True, _bump_likes(message.pk, -1, using)
+
+
+def toggle_like(user, message):
+    """切换点赞状态，返回 (当前是否已点赞, 点赞数)；先删除再插入，都在一个事务中"""
+    using = router.db_for_write(Like)
+    with transaction.atomic(using=using):
+        deleted, _ = Like.objects.using(using).filter(user=user, message_id=message.pk).delete()
+        if deleted:
+            return False, _bump_likes(message.pk, -1, using)
+        if _insert_ignore(Like, using, user, message):
+            return True, _bump_likes(message.pk, 1, using)
+        # 并发的另一次点击刚刚点赞
+        return True, Message.objects.using(using).values_list('likes', flat=True).get(pk=message.pk)
+
+
+def favorite(user, message):
+    """收藏，返回是否新收藏；已经收藏过时不做任何修改"""
+    # 收藏数、缓存的收藏列表和页面缓存由 Favorite 的 post_save 信号更新
+    return _insert_ignore(Favorite, router.db_for_write(Favorite), user, message)
+
+
+def unfavorite(user, message):
+    """取消收藏，返回是否取消成功；缓存由 Favorite 的 post_delete 信号更新"""
+    deleted, _ = Favorite.objects.filter(user=user, message_id=message.pk).delete()
+    return bool(deleted)
+
+
+def interaction_state(user, message_ids):
+    """
+    当前用户对一组消息的点赞和收藏状态，返回 InteractionState(liked=set, favorited=set)
+
+    点赞和收藏合并为一条 UNION ALL 查询，只读取这些消息对应的行。
+    """
+    message_ids = list(message_ids)
+    if not message_ids or user is None or not user.is_authenticated:
+        return InteractionState(set(), set())
+    likes = Like.objects.filter(user=user, message_id__in=message_ids).order_by().values_list(
+        'message_id', Value('like', output_field=CharField())
+    )
+    favorites = Favorite.objects.filter(user=user, message_id__in=message_ids).order_by().values_list(
+        'message_id', Value('favorite', output_field=CharField())
+    )
+    state = InteractionState(set(), set())
+    for message_id, kind in likes.union(favorites, all=True):
+        (state.liked if kind == 'like' else state.favorited).add(message_id)
+    return state
+
+
+def _cache():
+    return caches[getattr(settings, 'INTERACTION_CACHE', 'default')]
+
+
+def favorite_ids(user_id):
+    """用户收藏的消息 id 列表，最近收藏的在前"""
+    cache = _cache()
+    key = FAVORITE_IDS_KEY.format(user_id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = list(
+            Favorite.objects.filter(user_id=user_id).order_by('-created_at', '-id')
+            .values_list('message_id', flat=True)
+        )
+        cache.set(key, ids, getattr(settings, 'INTERACTION_CACHE_TIMEOUT', 24 * 60 * 60))
+    return ids
+
+
+def favorite_ids_changed(user_id, message_id, added, using=None):
+    """事务提交后修改缓存中的收藏列表，缓存不存在时不处理（下次读取时重建）"""
+    def callback():
+        cache = _cache()
+        key = FAVORITE_IDS_KEY.format(user_id)
+        ids = cache.get(key)
+        if ids is None:
+            return
+        ids = [pk for pk in ids if pk != message_id]
+        if added:
+            ids.insert(0, message_id)
+        cache.set(key, ids, getattr(settings, 'INTERACTION_CACHE_TIMEOUT', 24 * 60 * 60))
+    transaction.on_commit(callback, using=using)
@@ -0,0 +1,82 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from message_board_messages.api import MessageViewSet
+from message_board_messages.models import Message, Tag
+from message_board_messages.pagination import MessageKeysetPagination
+from message_board_messages.renderers import FastJSONRenderer
+
+
+def create_benchmark_data(count):
+    """创建 count 条已发布的测试消息（作者 benchmark-author），每条带 1~3 个标签"""
+    author = User.objects.create_user(username='benchmark-author')
+    tags = Tag.objects.bulk_create(Tag(name=f'基准标签{i}', slug=f'benchmark-{i}') for i in range(5))
+    now = timezone.now()
+    messages = Message.objects.bulk_create(
+        Message(
+            title=f'基准消息{i}', slug=f'benchmark-{i}', author=author, content='<p>正文</p>',
+            excerpt='正文' * 40, status='published', published_at=now,
+        )
+        for i in range(count)
+    )
+    Message.tags.through.objects.bulk_create(
+        Message.tags.through(message_id=message.pk, tag_id=tag.pk)
+        for i, message in enumerate(messages)
+        for tag in tags[:i % 3 + 1]
+    )
+    return author, tags, messages
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = '比较消息列表API的序列化器路径和快速路径，输出每秒条数（测试数据在事务中创建并回滚）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=500, help='测试消息数')
+        parser.add_argument('--page-size', type=int, default=100, help='每页条数')
+        parser.add_argument('--rounds', type=int, default=30, help='每种路径请求的次数')
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                create_benchmark_data(options['messages'])
+                results = {
+                    'serializer + JSONRenderer': self.run(options, fast=False),
+                    'values() + FastJSONRenderer': self.run(options, fast=True),
+                }
+                raise Rollback
+        except Rollback:
+            pass
+        baseline = next(iter(results.values()))
+        for name, rate in results.items():
+            self.stdout.write(f'{name:<30} {rate:>10.0f} 条/秒  x{rate / baseline:.1f}')
+
+    def run(self, options, fast):
+        factory = APIRequestFactory()
+        view = MessageViewSet.as_view(
+            {'get': 'list'},
+            renderer_classes=[FastJSONRenderer if fast else JSONRenderer],
+        )
+        page_size = MessageKeysetPagination.page_size
+        MessageKeysetPagination.page_size = options['page_size']
+        try:
+            items = 0
+            start = time.perf_counter()
+            for _ in range(options['rounds']):
+                request = factory.get('/messages/api/messages/', {'fast': int(fast)})
+                response = view(request)
+                response.render()
+                items += len(response.data['results'])
+            elapsed = time.perf_counter() - start
+        finally:
+            MessageKeysetPagination.page_size = page_size
+        return items / elapsed
@@ -0,0 +1,148 @@
+import http.client
+import itertools
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from statistics import quantiles
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from message_board_messages.models import Tag
+from .benchmark_api import create_benchmark_data
+
+MODES = ('runserver', 'sync', 'gthread', 'asgi')
+
+
+class Command(BaseCommand):
+    help = (
+        '分别用 runserver 和 gunicorn 的 sync / gthread / asgi 模式启动服务，'
+        '并发请求消息列表和详情页，输出每秒请求数和延迟（测试数据结束后删除）'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--modes', default=','.join(MODES), help=f'逗号分隔，可选 {", ".join(MODES)}')
+        parser.add_argument('--workers', type=int, help='gunicorn worker 数，默认使用 gunicorn.conf.py 的计算值（locmem 缓存时固定为 1）')
+        parser.add_argument('--threads', type=int, default=4, help='gthread 模式每个 worker 的线程数')
+        parser.add_argument('--concurrency', type=int, default=16, help='并发连接数')
+        parser.add_argument('--duration', type=float, default=10, help='每个页面压测的秒数')
+        parser.add_argument('--messages', type=int, default=200, help='测试消息数')
+        parser.add_argument('--port', type=int, default=8799)
+
+    def handle(self, *args, **options):
+        modes = [mode.strip() for mode in options['modes'].split(',') if mode.strip()]
+        unknown = set(modes) - set(MODES)
+        if unknown:
+            raise CommandError(f'未知的模式: {", ".join(sorted(unknown))}')
+        if User.objects.filter(username='benchmark-author').exists():
+            raise CommandError('已存在 benchmark-author 用户，可能是上次压测未清理的数据')
+
+        author, tags, messages = create_benchmark_data(options['messages'])
+        try:
+            paths = {
+                'message_list': [reverse('message_board_messages:message_list')],
+                # 轮流请求多条消息，不只测量同一个缓存页面
+                'message_detail': [
+                    reverse('message_board_messages:message_detail', args=[message.pk]) for message in messages[:50]
+                ],
+            }
+            self.stdout.write(f'{"模式":<12}{"页面":<16}{"请求/秒":>10}{"p50 ms":>10}{"p99 ms":>10}{"错误":>8}')
+            for mode in modes:
+                with _Server(mode, options) as ready:
+                    if not ready:
+                        self.stderr.write(f'{mode}: 服务未能启动，跳过')
+                        continue
+                    for name, urls in paths.items():
+                        rate, p50, p99, errors = self.load(options, urls)
+                        self.stdout.write(f'{mode:<12}{name:<16}{rate:>10.0f}{p50:>10.1f}{p99:>10.1f}{errors:>8}')
+        finally:
+            author.delete()
+            Tag.objects.filter(pk__in=[tag.pk for tag in tags]).delete()
+
+    def load(self, options, urls):
+        """多个线程各用一条 keep-alive 连接循环请求，返回 (请求/秒, p50, p99, 错误数)"""
+        deadline = time.monotonic() + options['duration']
+
+        def worker(offset):
+            connection = http.client.HTTPConnection('127.0.0.1', options['port'], timeout=30)
+            latencies, errors = [], 0
+            for url in itertools.islice(itertools.cycle(urls), offset % len(urls), None):
+                if time.monotonic() >= deadline:
+                    break
+                start = time.perf_counter()
+                # worker 重启时会关闭空闲的 keep-alive 连接，与浏览器和代理一样在新连接上重试一次
+                for attempt in range(2):
+                    try:
+                        connection.request('GET', url)
+                        response = connection.getresponse()
+                        response.read()
+                    except (OSError, http.client.HTTPException):
+                        connection.close()
+                        if attempt:
+                            errors += 1
+                        continue
+                    if response.status != 200:
+                        errors += 1
+                    break
+                latencies.append((time.perf_counter() - start) * 1000)
+            connection.close()
+            return latencies, errors
+
+        with ThreadPoolExecutor(options['concurrency']) as pool:
+            results = list(pool.map(worker, range(options['concurrency'])))
+        latencies = sorted(itertools.chain.from_iterable(latency for latency, _ in results))
+        errors = sum(error for _, error in results)
+        if len(latencies) < 2:
+            return 0, 0, 0, errors
+        percentiles = quantiles(latencies, n=100)
+        return (len(latencies) - errors) / options['duration'], percentiles[49], percentiles[98], errors
+
+
+class _Server:
+    """在子进程中启动服务，等待可以访问后返回 True，退出时关闭"""
+
+    def __init__(self, mode, options):
+        self.mode = mode
+        self.options = options
+        self.process = None
+
+    def __enter__(self):
+        port = str(self.options['port'])
+        env = {**os.environ, 'PORT': port, 'GUNICORN_WORKER_CLASS': self.mode,
+               'GUNICORN_THREADS': str(self.options['threads'])}
+        if self.options['workers']:
+            env['WEB_CONCURRENCY'] = str(self.options['workers'])
+        if self.mode == 'runserver':
+            command = [sys.executable, 'manage.py', 'runserver', '--noreload', f'127.0.0.1:{port}']
+        else:
+            command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py']
+        self.process = subprocess.Popen(
+            command, cwd=settings.BASE_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        return self.wait_ready()
+
+    def wait_ready(self, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and self.process.poll() is None:
+            connection = http.client.HTTPConnection('127.0.0.1', self.options['port'], timeout=5)
+            try:
+                connection.request('GET', reverse('message_board_messages:message_list'))
+                if connection.getresponse().status == 200:
+                    return True
+            except OSError:
+                pass
+            finally:
+                connection.close()
+            time.sleep(0.2)
+        return False
+
+    def __exit__(self, *exc_info):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=35)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from message_board_messages.counters import flush_view_counts
+
+
+class Command(BaseCommand):
+    help = '把缓存中累计的浏览量批量写回数据库'
+
+    def handle(self, *args, **options):
+        flushed = flush_view_counts()
+        self.stdout.write(self.style.SUCCESS(f'已写回 {flushed} 次浏览'))
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+
+from message_board_messages.images import (
+    EditorImageStorage, VARIANTS_DIR, manifest_name, process_editor_image, process_message_image,
+)
+from message_board_messages.models import Message
+
+
+class Command(BaseCommand):
+    help = '为已有的消息配图和 CKEditor 上传的图片生成缩放版本，并重新渲染引用上传图片的正文'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='重新生成已有的缩放版本')
+
+    def handle(self, *args, **options):
+        force = options['force']
+
+        processed = 0
+        messages = Message.objects.exclude(image='').exclude(image__isnull=True).only('id', 'image', 'image_variants')
+        for message in messages.iterator(chunk_size=200):
+            if force or (message.image_variants or {}).get('source') != message.image.name:
+                process_message_image(message.pk)
+                processed += 1
+        self.stdout.write(f'已处理 {processed} 张消息配图')
+
+        storage = EditorImageStorage()
+        uploads = 0
+        for name in self.editor_images(storage):
+            if force or not storage.exists(manifest_name(name)):
+                process_editor_image(name, storage)
+                uploads += 1
+        self.stdout.write(f'已处理 {uploads} 张上传图片')
+
+        # 正文中的 <img> 在渲染时才替换为 <picture>
+        rendered = 0
+        for message in Message.objects.filter(content__contains=storage.base_url).iterator(chunk_size=200):
+            message.save(update_fields=['content'])
+            rendered += 1
+        self.stdout.write(self.style.SUCCESS(f'已重新渲染 {rendered} 条消息的正文'))
+
+    def editor_images(self, storage, directory=''):
+        """遍历上传目录中的原图，跳过缩放版本所在的目录"""
+        if not storage.exists(directory):
+            return
+        directories, files = storage.listdir(directory)
+        for name in files:
+            yield f'{directory}/{name}' if directory else name
+        for child in directories:
+            if child != VARIANTS_DIR:
+                yield from self.editor_images(storage, f'{directory}/{child}' if directory else child)
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from message_board_messages.models import Message
+from message_board_messages.related import refresh_related
+
+
+class Command(BaseCommand):
+    help = '按批次重新计算所有消息的相关消息'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='每批处理的消息数')
+
+    def handle(self, *args, **options):
+        checked = refreshed = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                Message.objects.filter(pk__gt=last_pk).order_by('pk')
+                .values_list('pk', flat=True)[:options['batch_size']]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1]
+            checked += len(batch)
+            refreshed += refresh_related(batch)
+        self.stdout.write(self.style.SUCCESS(f'已重新计算 {checked} 条消息的相关消息，其中 {refreshed} 条有变化'))
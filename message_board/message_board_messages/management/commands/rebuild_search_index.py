@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from message_board_messages.models import Message
+from message_board_messages.search import clear_index, index_messages
+
+
+class Command(BaseCommand):
+    help = '清空并按批次重建消息全文搜索索引和中文倒排表'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='每批索引的消息数')
+
+    def handle(self, *args, **options):
+        clear_index()
+        indexed = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                Message.objects.filter(pk__gt=last_pk).order_by('pk')
+                .values_list('pk', flat=True)[:options['batch_size']]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1]
+            index_messages(batch)
+            indexed += len(batch)
+        self.stdout.write(self.style.SUCCESS(f'已为 {indexed} 条消息建立搜索索引'))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from message_board_messages.ranking import update_hot_scores
+
+
+class Command(BaseCommand):
+    help = '重新计算近期消息的热度分数（建议每 10 分钟运行一次）'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='每批处理的消息数')
+
+    def handle(self, *args, **options):
+        updated = update_hot_scores(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'已更新 {updated} 条消息的热度分数'))
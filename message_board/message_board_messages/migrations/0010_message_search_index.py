@@ -0,0 +1,40 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE message_search USING fts5("
+            "title, tags, body, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE TABLE message_search_index ('
+            'message_id bigint PRIMARY KEY REFERENCES message_board_messages_message (id) '
+            'ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, '
+            'document tsvector NOT NULL)'
+        )
+        schema_editor.execute(
+            'CREATE INDEX message_search_document ON message_search_index USING GIN (document)'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS message_search')
+    elif vendor == 'postgresql':
+        schema_editor.execute('DROP TABLE IF EXISTS message_search_index')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('message_board_messages', '0009_notification_recipient_read_index'),
+    ]
+
+    # 建表后运行 rebuild_search_index 为已有消息建立索引
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('message_board_messages', '0010_message_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchPosting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=32)),
+                ('weight', models.PositiveIntegerField(default=1)),
+                ('message', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_postings', to='message_board_messages.message')),
+            ],
+            options={
+                'verbose_name_plural': '搜索索引',
+                'constraints': [models.UniqueConstraint(fields=('term', 'message'), name='search_posting_term_message')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('message_board_messages', '0011_search_posting'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='related_ids',
+            field=models.JSONField(blank=True, default=list, editable=False),
+        ),
+    ]
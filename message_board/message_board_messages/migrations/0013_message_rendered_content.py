@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:23
+
+from django.db import migrations, models
+
+from message_board_messages.rendering import excerpt, render_content, word_count
+
+
+def render_existing_messages(apps, schema_editor):
+    Message = apps.get_model('message_board_messages', 'Message')
+    batch = []
+    for message in Message.objects.only('id', 'content').iterator(chunk_size=500):
+        message.content_html, text = render_content(message.content)
+        message.excerpt = excerpt(text)
+        message.word_count = word_count(text)
+        batch.append(message)
+        if len(batch) >= 500:
+            Message.objects.bulk_update(batch, ['content_html', 'excerpt', 'word_count'])
+            batch = []
+    Message.objects.bulk_update(batch, ['content_html', 'excerpt', 'word_count'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('message_board_messages', '0012_message_related_ids'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='content_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='excerpt',
+            field=models.CharField(blank=True, editable=False, max_length=200),
+        ),
+        migrations.AddField(
+            model_name='message',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(render_existing_messages, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('message_board_messages', '0013_message_rendered_content'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='hot_score',
+            field=models.FloatField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['-hot_score', '-id'], name='message_hot_score_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.18 on 2026-10-18 07:46
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_existing_favorites(apps, schema_editor):
+    Message = apps.get_model('message_board_messages', 'Message')
+    Favorite = apps.get_model('message_board_messages', 'Favorite')
+    counts = (
+        Favorite.objects.filter(message=OuterRef('pk'))
+        .values('message').annotate(count=Count('pk')).values('count')
+    )
+    Message.objects.update(favorites_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('message_board_messages', '0015_favorite_user_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='message',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(count_existing_favorites, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+
+from message_board_messages.rendering import plain_text
+from message_board_messages.tokenizer import characters
+
+
+def add_character_postings(apps, schema_editor):
+    """为已有消息补写单字记录，单独成段的汉字已有记录，保留原来的权重"""
+    Message = apps.get_model('message_board_messages', 'Message')
+    SearchPosting = apps.get_model('message_board_messages', 'SearchPosting')
+    alias = schema_editor.connection.alias
+    batch = []
+    messages = Message.objects.using(alias).only('id', 'title', 'content').prefetch_related('tags')
+    for message in messages.iterator(chunk_size=500):
+        document = (message.title, ' '.join(tag.name for tag in message.tags.all()), plain_text(message.content))
+        weights = {}
+        for text, weight in zip(document, (10, 5, 1)):
+            for char in characters(text):
+                weights[char] = weights.get(char, 0) + weight
+        batch.extend(SearchPosting(term=char, message_id=message.pk, weight=weight) for char, weight in weights.items())
+        if len(batch) >= 1000:
+            SearchPosting.objects.using(alias).bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    SearchPosting.objects.using(alias).bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('message_board_messages', '0018_notification_actor_ids'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_character_postings, migrations.RunPython.noop),
+    ]
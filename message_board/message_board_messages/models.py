@@ -1,7 +1,8 @@
-from django.db import models
+from django.db import models, transaction
 from django.db.models import F
 from django.contrib.auth.models import User
 from django_ckeditor_5.fields import CKEditor5Field
+from .rendering import excerpt, render_content, word_count
 
 
 
@@ -21,6 +22,29 @@ class Tag(models.Model):
         return self.name
 
 
+class MessageQuerySet(models.QuerySet):
+    """消息查询集"""
+
+    # 列表页需要的字段：不加载正文和渲染后的 HTML，只取摘要
+    LIST_FIELDS = (
+        'id', 'title', 'slug', 'author', 'image', 'image_variants', 'status', 'views', 'likes', 'comments_count',
+        'excerpt', 'word_count', 'created_at', 'updated_at', 'published_at',
+        'author__username',
+    )
+
+    @classmethod
+    def list_fields(cls, prefix=''):
+        """列表字段，通过关联查询消息时加上前缀，例如 'message__'"""
+        return tuple(prefix + field for field in cls.LIST_FIELDS)
+
+    def published(self):
+        return self.filter(status='published')
+
+    def for_list(self):
+        """列表投影：只取列表字段，关联作者并预取标签（头像 URL 走缓存，见 accounts.avatars）"""
+        return self.only(*self.LIST_FIELDS).select_related('author').prefetch_related('tags')
+
+
 class Message(models.Model):
     """消息模型"""
     STATUS_CHOICES = (
@@ -37,17 +61,62 @@ class Message(models.Model):
     views = models.PositiveIntegerField(default=0, db_index=True)
     likes = models.PositiveIntegerField(default=0, db_index=True)
     comments_count = models.PositiveIntegerField(default=0, db_index=True)
+    favorites_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
     published_at = models.DateTimeField(blank=True, null=True, db_index=True)
+    # 保存时由 content 生成，模板直接使用，见 rendering.py
+    content_html = models.TextField(blank=True, editable=False)
+    excerpt = models.CharField(max_length=200, blank=True, editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    # 预先计算的相关消息 id，由 related.py 维护
+    related_ids = models.JSONField(default=list, blank=True, editable=False)
+    # 时间衰减的热度分数，由 ranking.py 定期重新计算
+    hot_score = models.FloatField(default=0, editable=False)
+    # 配图的缩放版本，由 images.py 在后台生成
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+
+    # 计数字段只通过原子更新维护，编辑消息时不回写
+    COUNTER_FIELDS = ('views', 'likes', 'comments_count', 'favorites_count')
+    # 由后台任务计算的字段，同样不随编辑回写
+    DERIVED_FIELDS = ('related_ids', 'hot_score', 'image_variants')
+    # 随 content 一起写入的渲染结果
+    RENDERED_FIELDS = ('content_html', 'excerpt', 'word_count')
+
+    objects = MessageQuerySet.as_manager()
 
     class Meta:
         verbose_name_plural = '消息'
         ordering = ['-published_at']
+        indexes = [
+            # 热门列表按 (hot_score, id) 游标分页
+            models.Index(fields=['-hot_score', '-id'], name='message_hot_score_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    def update_rendered_fields(self):
+        """根据正文生成清洗后的 HTML、摘要和字数"""
+        self.content_html, text = render_content(self.content)
+        self.excerpt = excerpt(text)
+        self.word_count = word_count(text)
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'content' in update_fields:
+            self.update_rendered_fields()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, *self.RENDERED_FIELDS}
+        # 更新已有消息时排除计数和派生字段，避免用过期的值覆盖并发的更新
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            excluded = self.COUNTER_FIELDS + self.DERIVED_FIELDS
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in excluded
+            ]
+        super().save(*args, **kwargs)
+
     def increase_views(self):
         """增加浏览量"""
         self.views = F('views') + 1
@@ -71,6 +140,10 @@ class Favorite(models.Model):
         verbose_name_plural = '收藏'
         ordering = ['-created_at']
         unique_together = ('user', 'message')  # 确保用户不能重复收藏同一条消息
+        indexes = [
+            # 收藏列表按 (created_at, id) 游标分页
+            models.Index(fields=['user', '-created_at', '-id'], name='favorite_user_created_idx'),
+        ]
 
     def __str__(self):
         return f'{self.user.username} 收藏了 {self.message.title}'
@@ -104,12 +177,20 @@ class Notification(models.Model):
     verb = models.CharField(max_length=20, choices=NOTIFICATION_TYPES)
     target = models.ForeignKey(Message, on_delete=models.CASCADE, related_name='notifications', blank=True, null=True)
     content = models.TextField(blank=True, null=True)
+    # 合并后的通知包含的事件数，例如“5 人点赞了您的消息”
+    actor_count = models.PositiveIntegerField(default=1)
+    # 合并进来的不同操作者，同一个人反复点赞/收藏不重复计数
+    actor_ids = models.JSONField(default=list, blank=True)
     is_read = models.BooleanField(default=False, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
 
     class Meta:
         verbose_name_plural = '通知'
         ordering = ['-created_at']
+        indexes = [
+            # 支撑通知列表和未读数统计
+            models.Index(fields=['recipient', 'is_read', 'created_at'], name='notification_recipient_read'),
+        ]
 
     def __str__(self):
         return f'{self.actor.username} {dict(self.NOTIFICATION_TYPES).get(self.verb)} 了 {self.target.title if self.target else "内容"}'
@@ -117,5 +198,186 @@ class Notification(models.Model):
     def mark_as_read(self):
         """标记为已读"""
         if not self.is_read:
+            from .notifications import adjust_unread_count
             self.is_read = True
-            self.save(update_fields=['is_read'])
+            if Notification.objects.filter(pk=self.pk, is_read=False).update(is_read=True):
+                adjust_unread_count(self.recipient_id, -1)
+
+
+
+class SearchPosting(models.Model):
+    """搜索倒排表，每个词在每条消息中一行，weight 为按字段加权的词频"""
+    term = models.CharField(max_length=32)
+    message = models.ForeignKey(Message, on_delete=models.CASCADE, related_name='search_postings')
+    weight = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        verbose_name_plural = '搜索索引'
+        constraints = [
+            # 同时作为按词查找的索引
+            models.UniqueConstraint(fields=['term', 'message'], name='search_posting_term_message'),
+        ]
+
+    def __str__(self):
+        return f'{self.term} -> {self.message_id}'
+
+# 信号接收器，数据变化时递增相关页面缓存的代数
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete, m2m_changed
+from django.dispatch import receiver
+from .page_cache import invalidate, invalidate_messages, message_scopes
+
+
+def _deleted_with_message(instance, origin):
+    """随消息级联删除时由消息自身负责失效缓存"""
+    return isinstance(origin, Message) and origin.pk == instance.message_id
+
+
+@receiver(post_save, sender=Message)
+def invalidate_message_pages(sender, instance, **kwargs):
+    invalidate_messages(instance.pk)
+
+
+@receiver(pre_delete, sender=Message)
+def invalidate_deleted_message_pages(sender, instance, **kwargs):
+    # 删除后无法再查到所属标签，在删除前确定范围
+    invalidate(*message_scopes(instance.pk))
+
+
+@receiver(m2m_changed, sender=Message.tags.through)
+def invalidate_tagged_pages(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear') or pk_set == set():
+        return
+    if reverse:
+        # 从标签一侧修改，pk_set 为消息 id
+        message_ids = pk_set if pk_set is not None else instance.messages.values_list('pk', flat=True)
+        invalidate('list', f'tag:{instance.slug}', *(f'message:{pk}' for pk in message_ids))
+    else:
+        tags = Tag.objects.filter(pk__in=pk_set) if pk_set is not None else instance.tags.all()
+        slugs = tags.values_list('slug', flat=True)
+        invalidate('list', f'message:{instance.pk}', *(f'tag:{slug}' for slug in slugs))
+
+
+@receiver(pre_save, sender=Tag)
+def remember_tag_slug(sender, instance, **kwargs):
+    if instance.pk is not None:
+        instance._previous_slug = Tag.objects.filter(pk=instance.pk).values_list('slug', flat=True).first()
+
+
+@receiver([post_save, post_delete], sender=Tag)
+def invalidate_tag_pages(sender, instance, **kwargs):
+    # 标签名称显示在列表和详情页中
+    scopes = ['list', 'related', f'tag:{instance.slug}']
+    previous = getattr(instance, '_previous_slug', None)
+    if previous and previous != instance.slug:
+        scopes.append(f'tag:{previous}')
+    invalidate(*scopes)
+
+
+@receiver([post_save, post_delete], sender=Like)
+def invalidate_liked_message_pages(sender, instance, origin=None, **kwargs):
+    if not _deleted_with_message(instance, origin):
+        invalidate_messages(instance.message_id)
+    invalidate(f'user:{instance.user_id}')
+
+
+@receiver([post_save, post_delete], sender=Favorite)
+def invalidate_favorited_message_pages(sender, instance, origin=None, **kwargs):
+    # 收藏数只显示在详情页
+    if not _deleted_with_message(instance, origin):
+        invalidate(f'message:{instance.message_id}')
+    invalidate(f'user:{instance.user_id}')
+    if kwargs.get('created', True):
+        # 新收藏或删除收藏时更新收藏数和缓存的收藏列表
+        from .counters import apply_counter_deltas
+        from .interactions import favorite_ids_changed
+        added = kwargs['signal'] is post_save
+        if not _deleted_with_message(instance, origin):
+            apply_counter_deltas('favorites_count', {instance.message_id: 1 if added else -1})
+        favorite_ids_changed(instance.user_id, instance.message_id, added)
+
+
+# 信号接收器，配图变化后在后台生成缩放版本
+@receiver(post_save, sender=Message)
+def process_changed_image(sender, instance, update_fields=None, **kwargs):
+    if update_fields is not None and 'image' not in update_fields:
+        return
+    if (instance.image.name or '') != (instance.image_variants or {}).get('source', ''):
+        from .images import process_message_image, run_in_background
+        run_in_background(process_message_image, instance.pk)
+
+
+# 信号接收器，在事务提交后更新搜索索引
+def _reindex_on_commit(message_ids):
+    message_ids = list(message_ids)
+    if message_ids:
+        from .search import index_messages
+        transaction.on_commit(lambda: index_messages(message_ids))
+
+
+@receiver(post_save, sender=Message)
+def index_saved_message(sender, instance, **kwargs):
+    _reindex_on_commit([instance.pk])
+
+
+@receiver(post_delete, sender=Message)
+def unindex_deleted_message(sender, instance, **kwargs):
+    from .search import remove_messages
+    pk = instance.pk
+    transaction.on_commit(lambda: remove_messages([pk]))
+
+
+@receiver(m2m_changed, sender=Message.tags.through)
+def index_retagged_messages(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear') or pk_set == set():
+        return
+    if not reverse:
+        _reindex_on_commit([instance.pk])
+    else:
+        _reindex_on_commit(pk_set if pk_set is not None else instance.messages.values_list('pk', flat=True))
+
+
+@receiver(post_save, sender=Tag)
+def index_renamed_tag_messages(sender, instance, created, **kwargs):
+    if not created:
+        _reindex_on_commit(instance.messages.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Tag)
+def index_deleted_tag_messages(sender, instance, **kwargs):
+    _reindex_on_commit(instance.messages.values_list('pk', flat=True))
+
+
+# 信号接收器，在事务提交后刷新相关消息
+@receiver(post_save, sender=Message)
+def refresh_saved_message_related(sender, instance, **kwargs):
+    from .related import refresh_around
+    pk = instance.pk
+    transaction.on_commit(lambda: refresh_around(pk))
+
+
+@receiver(pre_delete, sender=Message)
+def refresh_deleted_message_neighbours(sender, instance, **kwargs):
+    from .related import schedule_neighbours
+    pk = instance.pk
+    tag_ids = list(instance.tags.values_list('pk', flat=True))
+    transaction.on_commit(lambda: schedule_neighbours(pk, tag_ids))
+
+
+@receiver(m2m_changed, sender=Message.tags.through)
+def refresh_retagged_related(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear') or pk_set == set():
+        return
+    from .related import refresh_around, refresh_related, schedule_neighbours
+    if not reverse:
+        # 移除的标签上的邻居也可能受影响
+        removed = pk_set if pk_set is not None else list(instance.tags.values_list('pk', flat=True))
+        pk = instance.pk
+        transaction.on_commit(lambda: refresh_around(pk, removed))
+    else:
+        message_ids = list(pk_set if pk_set is not None else instance.messages.values_list('pk', flat=True))
+        tag_id = instance.pk
+        def refresh():
+            refresh_related(message_ids)
+            for pk in message_ids:
+                schedule_neighbours(pk, [tag_id])
+        transaction.on_commit(refresh)
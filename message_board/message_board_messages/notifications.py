@@ -0,0 +1,252 @@
+"""
+通知分发
+
+视图只调用 notify() 把轻量的事件放入进程内队列，后台线程按批取出，
+把同一接收者、同一目标、同一类型的事件合并成一条通知
+（例如“张三 等 5 人点赞了您的消息”），再用 bulk_create / bulk_update 写入。
+尚未读的同类通知会被继续合并，而不是每次新增一行；通知记录合并进来的操作者，
+同一个人反复点赞、收藏不会重复计数，也不会再次提醒。评论逐条计数。
+
+NOTIFICATION_DISPATCH_MODE = 'sync' 时在当前请求中直接写入（测试和调试使用）。
+
+每个用户的未读数保存在缓存中：新建通知时增加，标记已读或删除时减少，
+页面渲染未读数时不再查询通知表。
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .models import Message, Notification
+
+logger = logging.getLogger(__name__)
+
+NotificationEvent = namedtuple('NotificationEvent', 'recipient_id actor_id verb target_id')
+
+ACTIONS = {
+    'like': '点赞了',
+    'comment': '评论了',
+    'favorite': '收藏了',
+    'follow': '关注了',
+}
+
+UNREAD_COUNT_KEY = 'notifications:unread:{}'
+
+_queue = queue.SimpleQueue()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def build_content(verb, actor_name, count, title):
+    """生成通知文本"""
+    action = ACTIONS.get(verb, verb)
+    target = f'您的消息 "{title}"' if title is not None else '您'
+    if count <= 1:
+        return f'{actor_name} {action}{target}'
+    if verb == 'comment':
+        return f'{actor_name} 等人{action}{target}，共 {count} 条新评论'
+    return f'{actor_name} 等 {count} 人{action}{target}'
+
+
+def notify(recipient_id, actor, verb, target=None):
+    """提交一条通知事件，接收者就是操作者本人时忽略"""
+    if recipient_id == actor.pk:
+        return
+    event = NotificationEvent(recipient_id, actor.pk, verb, target.pk if target is not None else None)
+    if getattr(settings, 'NOTIFICATION_DISPATCH_MODE', 'thread') == 'sync':
+        dispatch([event])
+    else:
+        # 事务提交后才入队，回滚的操作不会产生通知
+        transaction.on_commit(lambda: _enqueue(event))
+
+
+def _enqueue(event):
+    _queue.put(event)
+    _ensure_worker()
+
+
+def _ensure_worker():
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name='notification-dispatcher', daemon=True)
+            _worker.start()
+
+
+def _take_batch(block=True):
+    """从队列中取出一批事件，最多等待 NOTIFICATION_FLUSH_INTERVAL 秒凑满一批"""
+    batch_size = getattr(settings, 'NOTIFICATION_BATCH_SIZE', 500)
+    try:
+        events = [_queue.get(block=block)]
+    except queue.Empty:
+        return []
+    deadline = time.monotonic() + getattr(settings, 'NOTIFICATION_FLUSH_INTERVAL', 2)
+    while len(events) < batch_size:
+        timeout = deadline - time.monotonic()
+        try:
+            events.append(_queue.get(timeout=timeout) if block and timeout > 0 else _queue.get_nowait())
+        except queue.Empty:
+            break
+    return events
+
+
+def _run():
+    while True:
+        events = _take_batch()
+        try:
+            dispatch(events)
+        except Exception:
+            logger.exception('写入 %d 条通知事件失败', len(events))
+        finally:
+            close_old_connections()
+
+
+def flush_queue():
+    """立即写入队列中剩余的事件，返回处理的事件数"""
+    total = 0
+    while True:
+        events = _take_batch(block=False)
+        if not events:
+            return total
+        dispatch(events)
+        total += len(events)
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        flush_queue()
+    except Exception:
+        logger.exception('退出时写入通知失败')
+
+
+def dispatch(events):
+    """合并事件并批量写入通知，返回新建的通知数"""
+    groups = {}
+    for event in events:
+        actors = groups.setdefault((event.recipient_id, event.verb, event.target_id), [])
+        # 同一批中同一个人的重复点赞/收藏只算一次，评论逐条计数
+        if event.verb == 'comment' or event.actor_id not in actors:
+            actors.append(event.actor_id)
+    if not groups:
+        return 0
+
+    actor_ids = {actor_id for actors in groups.values() for actor_id in actors}
+    target_ids = {target_id for _, _, target_id in groups if target_id is not None}
+    usernames = dict(User.objects.filter(pk__in=actor_ids).values_list('pk', 'username'))
+    titles = dict(Message.objects.filter(pk__in=target_ids).values_list('pk', 'title'))
+
+    # 查找可以继续合并的未读通知
+    existing = {}
+    candidates = Notification.objects.filter(
+        is_read=False,
+        recipient_id__in={recipient_id for recipient_id, _, _ in groups},
+        verb__in={verb for _, verb, _ in groups},
+        target_id__in=target_ids,
+    ).order_by('created_at')
+    for notification in candidates:
+        existing[(notification.recipient_id, notification.verb, notification.target_id)] = notification
+
+    now = timezone.now()
+    to_create, to_update = [], []
+    for key, actors in groups.items():
+        recipient_id, verb, target_id = key
+        if target_id is not None and target_id not in titles:
+            continue  # 目标消息已被删除
+        notification = existing.get(key)
+        if notification is None:
+            notification = Notification(
+                recipient_id=recipient_id, verb=verb, target_id=target_id, actor_count=0, actor_ids=[]
+            )
+            to_create.append(notification)
+        else:
+            # 早于 actor_ids 字段的通知只知道最后一个操作者
+            notification.actor_ids = notification.actor_ids or [notification.actor_id]
+            if verb != 'comment':
+                actors = [actor for actor in actors if actor not in notification.actor_ids]
+                if not actors:
+                    continue  # 都已计入这条通知，不再提醒
+            to_update.append(notification)
+        actor_id = actors[-1]
+        notification.actor_id = actor_id
+        notification.actor_count += len(actors)
+        notification.actor_ids += [actor for actor in dict.fromkeys(actors) if actor not in notification.actor_ids]
+        notification.created_at = now
+        notification.content = build_content(
+            verb, usernames.get(actor_id, ''), notification.actor_count, titles.get(target_id)
+        )
+
+    with transaction.atomic():
+        Notification.objects.bulk_create(to_create)
+        Notification.objects.bulk_update(to_update, ['actor', 'actor_count', 'actor_ids', 'content', 'created_at'])
+
+    # 合并进已有未读通知的事件不改变未读数
+    created = {}
+    for notification in to_create:
+        created[notification.recipient_id] = created.get(notification.recipient_id, 0) + 1
+    for recipient_id, count in created.items():
+        adjust_unread_count(recipient_id, count)
+    return len(to_create)
+
+
+def mark_read(user, ids=None):
+    """
+    用一条 UPDATE 把用户的通知标记为已读
+
+    ids 为 None 时标记全部未读通知，否则只标记指定的通知。返回标记的条数。
+    """
+    unread = Notification.objects.filter(recipient=user, is_read=False)
+    if ids is None:
+        updated = unread.update(is_read=True)
+        reset_unread_count(user.pk)
+        return updated
+    updated = unread.filter(pk__in=list(ids)).update(is_read=True)
+    adjust_unread_count(user.pk, -updated)
+    return updated
+
+
+def _counter_cache():
+    return caches[getattr(settings, 'NOTIFICATION_COUNTER_CACHE', 'default')]
+
+
+def get_unread_count(user):
+    """获取用户未读通知数，缓存未命中时统计一次"""
+    cache = _counter_cache()
+    key = UNREAD_COUNT_KEY.format(user.pk)
+    count = cache.get(key)
+    if count is None:
+        count = Notification.objects.filter(recipient=user, is_read=False).count()
+        # 缓存设置过期时间，级联删除等未经过这里的变化会在过期后自动纠正
+        cache.set(key, count, getattr(settings, 'NOTIFICATION_UNREAD_TIMEOUT', 60 * 60))
+    return count
+
+
+def adjust_unread_count(user_id, delta):
+    """增减缓存中的未读数，未缓存时留到下次读取再统计"""
+    if not delta:
+        return
+    cache = _counter_cache()
+    key = UNREAD_COUNT_KEY.format(user_id)
+    try:
+        count = cache.incr(key, delta)
+    except ValueError:
+        return
+    if count < 0:
+        cache.delete(key)
+
+
+def reset_unread_count(user_id):
+    """用户的通知已全部读完或删除"""
+    _counter_cache().set(
+        UNREAD_COUNT_KEY.format(user_id), 0, getattr(settings, 'NOTIFICATION_UNREAD_TIMEOUT', 60 * 60)
+    )
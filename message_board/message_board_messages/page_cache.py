@@ -0,0 +1,122 @@
+"""
+按“代数”失效的页面缓存
+
+每个缓存范围（scope）在 pages 缓存中保存一个代数：
+
+- list: 首页 / 消息列表，消息的增删改、点赞、标签变化时递增
+- tag:<slug>: 某个标签的消息列表
+- message:<id>: 某条消息的详情页，评论、点赞、收藏变化时递增
+- counts: API 消息列表中的评论数和浏览量，评论增删和浏览量写回时递增（HTML 列表不显示这两项）
+- related: 详情页中的标签名，标签改名或删除时递增（相关消息变化只失效对应的 message:<id>）
+- user:<id>: 某个用户的点赞和收藏列表（API）
+
+页面缓存键包含请求路径和所依赖范围的当前代数，数据变化时只需把相关代数加一，
+旧页面不再被命中，随后自然过期，无需逐个删除缓存键。
+因此页面可以缓存数小时（PAGE_CACHE_TIMEOUT），内容仍然及时更新。
+
+只缓存匿名用户、没有会话和消息提示 Cookie 的 GET 请求，登录用户的页面包含个人状态，始终实时渲染。
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+GENERATION_KEY = 'generation:{}'
+PAGE_KEY = 'page:{}:{}'
+
+
+def _cache():
+    return caches[getattr(settings, 'PAGE_CACHE_ALIAS', 'pages')]
+
+
+def get_generations(scopes):
+    """获取各范围的当前代数，不存在时初始化"""
+    cache = _cache()
+    keys = [GENERATION_KEY.format(scope) for scope in scopes]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            # 用当前时间作初始值，代数被淘汰后重建也不会与旧页面的键重合
+            cache.add(key, time.time_ns() // 1000, None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def bump(*scopes):
+    """把各范围的代数加一，依赖这些范围的缓存页面随之失效"""
+    cache = _cache()
+    for scope in set(scopes):
+        key = GENERATION_KEY.format(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            # 尚无代数说明还没有依赖它的缓存页面
+            pass
+
+
+def invalidate(*scopes, using=None):
+    """在事务提交后递增代数，避免并发请求在提交前用旧数据重新填充缓存"""
+    transaction.on_commit(lambda: bump(*scopes), using=using)
+
+
+def message_scopes(*message_ids):
+    """消息在列表中的显示变化时需要失效的范围：列表、详情以及所属标签页"""
+    from .models import Tag
+
+    slugs = Tag.objects.filter(messages__in=message_ids).values_list('slug', flat=True).distinct()
+    return ['list', *(f'message:{pk}' for pk in message_ids), *(f'tag:{slug}' for slug in slugs)]
+
+
+def invalidate_messages(*message_ids, using=None):
+    """提交后失效消息相关的页面"""
+    transaction.on_commit(lambda: bump(*message_scopes(*message_ids)), using=using)
+
+
+def _is_cacheable_request(request):
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if settings.SESSION_COOKIE_NAME in request.COOKIES or 'messages' in request.COOKIES:
+        return False
+    return not request.user.is_authenticated
+
+
+def _is_cacheable_response(request, response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+        # 页面使用了 CSRF 令牌，需要为访问者单独设置 Cookie
+        and not request.META.get('CSRF_COOKIE_NEEDS_UPDATE')
+        and 'private' not in response.get('Cache-Control', '')
+    )
+
+
+def cached_page(*scopes, timeout=None):
+    """
+    按代数缓存整页的视图装饰器
+
+    scopes 中可以引用视图的 URL 参数，例如 @cached_page('tag:{slug}')。
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if not _is_cacheable_request(request):
+                return view_func(request, *args, **kwargs)
+
+            cache = _cache()
+            generations = get_generations([scope.format(**kwargs) for scope in scopes])
+            path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+            key = PAGE_KEY.format(path, '.'.join(map(str, generations)))
+            response = cache.get(key)
+            if response is not None:
+                return response
+
+            response = view_func(request, *args, **kwargs)
+            if _is_cacheable_response(request, response):
+                cache.set(key, response, timeout or getattr(settings, 'PAGE_CACHE_TIMEOUT', 6 * 60 * 60))
+            return response
+        return wrapper
+    return decorator
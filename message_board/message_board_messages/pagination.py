@@ -0,0 +1,225 @@
+"""
+分页工具
+
+基于游标（keyset）的分页：按 (published_at, id) / (created_at, id) 这类
+排序键定位下一页，不做 COUNT(*) 和 OFFSET，深翻页与第一页代价相同。
+"""
+import base64
+import hashlib
+import json
+from datetime import date, datetime
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.paginator import Paginator
+from django.db.models import Q
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .search import SearchResults
+
+
+def approximate_count(queryset):
+    """
+    近似总数
+
+    COUNT(*) 的结果在缓存中保存 APPROXIMATE_COUNT_TIMEOUT 秒，
+    只在调用方需要显示总数时才计算。
+    """
+    cache = caches[getattr(settings, 'APPROXIMATE_COUNT_CACHE', 'default')]
+    key = 'count:' + hashlib.md5(str(queryset.query).encode()).hexdigest()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, getattr(settings, 'APPROXIMATE_COUNT_TIMEOUT', 5 * 60))
+    return count
+
+
+class KeysetPage:
+    """游标分页的一页，接口尽量与 django.core.paginator.Page 保持一致"""
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<KeysetPage of {len(self.object_list)} items>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    @property
+    def approximate_count(self):
+        return approximate_count(self.paginator.queryset)
+
+
+class KeysetPaginator:
+    """
+    游标分页器
+
+    ordering 为排序字段元组，最后一个字段必须唯一（通常是 id），例如
+    ('-created_at', '-id')。允许为空的排序字段会过滤掉空值。
+    """
+
+    def __init__(self, queryset, ordering, per_page=10):
+        self.ordering = tuple(ordering)
+        self.per_page = int(per_page)
+        self.fields = [queryset.model._meta.get_field(name.lstrip('-')) for name in self.ordering]
+        for field in self.fields:
+            if field.null:
+                queryset = queryset.filter(**{f'{field.name}__isnull': False})
+        self.queryset = queryset
+
+    def _key(self, obj):
+        if isinstance(obj, dict):
+            return [obj.get(field.attname, obj.get(field.name)) for field in self.fields]
+        return [getattr(obj, field.attname) for field in self.fields]
+
+    def encode_cursor(self, obj, reverse=False):
+        values = [
+            value.isoformat() if isinstance(value, (datetime, date)) else value
+            for value in self._key(obj)
+        ]
+        payload = json.dumps({'v': values, 'r': int(reverse)}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """解析游标，无效时返回 None（回到第一页）"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+            if len(payload['v']) != len(self.fields):
+                return None
+            values = [field.to_python(value) for field, value in zip(self.fields, payload['v'])]
+            return values, bool(payload.get('r'))
+        except Exception:
+            return None
+
+    def _seek(self, values, reverse):
+        """构造“排在游标之后”的过滤条件"""
+        condition = Q()
+        equal = {}
+        for name, field, value in zip(self.ordering, self.fields, values):
+            descending = name.startswith('-')
+            lookup = 'lt' if descending != reverse else 'gt'
+            condition |= Q(**equal, **{f'{field.name}__{lookup}': value})
+            equal[field.name] = value
+        return condition
+
+    def get_page(self, cursor=None):
+        decoded = self.decode_cursor(cursor) if cursor else None
+        values, reverse = decoded if decoded else (None, False)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(name[1:] if name.startswith('-') else f'-{name}' for name in ordering)
+        queryset = self.queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._seek(values, reverse))
+
+        rows = list(queryset[:self.per_page + 1])
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+            has_previous, has_next = has_more, True
+        else:
+            has_previous, has_next = values is not None, has_more
+
+        next_cursor = self.encode_cursor(rows[-1]) if has_next and rows else None
+        previous_cursor = self.encode_cursor(rows[0], reverse=True) if has_previous and rows else None
+        return KeysetPage(rows, self, next_cursor, previous_cursor)
+
+
+def paginate_messages(request, queryset, ordering, per_page=10):
+    """
+    列表页分页
+
+    默认（MESSAGE_PAGINATION_MODE = 'cursor'）使用游标分页，模板只输出上一页/下一页的游标链接；
+    带 page 参数的旧链接仍按页码分页。
+    """
+    mode = getattr(settings, 'MESSAGE_PAGINATION_MODE', 'cursor')
+    if 'cursor' in request.GET or (mode == 'cursor' and 'page' not in request.GET):
+        return KeysetPaginator(queryset, ordering, per_page).get_page(request.GET.get('cursor'))
+    paginator = Paginator(queryset.order_by(*ordering), per_page)
+    return paginator.get_page(request.GET.get('page'))  # 自动处理无效页码
+
+
+class MessageKeysetPagination(BasePagination):
+    """
+    消息API的分页
+
+    默认保持原来的页码分页格式（count / next / previous / results），现有客户端不受影响；
+    带 cursor 参数（第一页可以为空值）时按 view.keyset_ordering 做游标分页，
+    next / previous 为游标链接，?with_count=1 时附带近似总数。按相关度排序的搜索结果总是页码分页。
+    """
+    page_size = api_settings.PAGE_SIZE or 10
+    ordering = ('-created_at', '-id')
+    cursor_query_param = 'cursor'
+    count_query_param = 'with_count'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.fallback = None
+        if self.use_page_numbers(request, view) or isinstance(queryset, SearchResults):
+            self.fallback = PageNumberPagination()
+            self.fallback.page_size = self.page_size
+            return self.fallback.paginate_queryset(queryset, request, view)
+
+        ordering = getattr(view, 'keyset_ordering', self.ordering)
+        self.paginator = KeysetPaginator(queryset, ordering, self.page_size)
+        self.page = self.paginator.get_page(request.query_params.get(self.cursor_query_param))
+        return list(self.page)
+
+    def use_page_numbers(self, request, view):
+        return self.cursor_query_param not in request.query_params
+
+    def get_link(self, cursor):
+        if cursor is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), PageNumberPagination.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        if self.fallback is not None:
+            return self.fallback.get_paginated_response(data)
+        payload = {
+            'next': self.get_link(self.page.next_cursor),
+            'previous': self.get_link(self.page.previous_cursor),
+        }
+        if self.request.query_params.get(self.count_query_param) in ('1', 'true'):
+            payload['count'] = self.page.approximate_count
+        payload['results'] = data
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'count': {'type': 'integer', 'description': '总数；游标分页时为近似总数，仅在 with_count=1 时返回'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,65 @@
+"""
+热门排序
+
+热度分数按时间衰减（与 Hacker News 的排序类似）：
+
+    score = (浏览 * w_views + 点赞 * w_likes + 收藏 * w_favorites + 评论 * w_comments) / (小时数 + 2) ** gravity
+
+分数保存在 Message.hot_score 中，(hot_score, id) 上有索引，热门列表只是一次按索引的读取。
+分数随时间变化，由 update_hot_scores 管理命令定期（例如每 10 分钟）重新计算：
+只重新计算 HOT_SCORE_WINDOW_DAYS 天内发布的消息，更早的消息分数归零。
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Message
+from .page_cache import bump
+
+DEFAULT_WEIGHTS = {'views': 1, 'likes': 5, 'favorites': 8, 'comments': 10}
+
+
+def hot_score(views, likes, favorites, comments, published_at, now=None):
+    """计算单条消息的热度分数"""
+    weights = {**DEFAULT_WEIGHTS, **getattr(settings, 'HOT_SCORE_WEIGHTS', {})}
+    gravity = getattr(settings, 'HOT_SCORE_GRAVITY', 1.5)
+    now = now or timezone.now()
+    points = (
+        views * weights['views'] + likes * weights['likes']
+        + favorites * weights['favorites'] + comments * weights['comments']
+    )
+    hours = max((now - published_at).total_seconds() / 3600, 0)
+    return points / (hours + 2) ** gravity
+
+
+def update_hot_scores(batch_size=500):
+    """重新计算时间窗口内已发布消息的热度分数，返回更新的条数"""
+    now = timezone.now()
+    since = now - timedelta(days=getattr(settings, 'HOT_SCORE_WINDOW_DAYS', 30))
+    # 移出窗口或不再发布的消息不再参与热门排序
+    Message.objects.exclude(hot_score=0).exclude(status='published', published_at__gte=since).update(hot_score=0)
+
+    recent = Message.objects.published().filter(published_at__gte=since)
+    updated = 0
+    last_pk = 0
+    while True:
+        rows = list(
+            recent.filter(pk__gt=last_pk).order_by('pk')
+            .values('pk', 'views', 'likes', 'favorites_count', 'comments_count', 'published_at')[:batch_size]
+        )
+        if not rows:
+            break
+        last_pk = rows[-1]['pk']
+        messages = [
+            Message(pk=row['pk'], hot_score=hot_score(
+                row['views'], row['likes'], row['favorites_count'], row['comments_count'], row['published_at'], now
+            ))
+            for row in rows
+        ]
+        # bulk_update 不触发 post_save，也不修改 updated_at
+        Message.objects.bulk_update(messages, ['hot_score'], batch_size=batch_size)
+        updated += len(messages)
+    # 热门列表的顺序随之变化
+    bump('list')
+    return updated
@@ -0,0 +1,201 @@
+"""
+相关消息索引
+
+每条消息的相关消息 id 预先计算并保存在 Message.related_ids 中，详情页只需一次主键查询。
+相关度按共同标签数排序，相同时较新发布的优先。
+
+消息保存、标签变化后，在事务提交后重新计算该消息自身的相关消息；共享标签的最近
+RELATED_REFRESH_NEIGHBOURS 条消息放入进程内队列，由后台线程按批合并后刷新，不占用请求时间。
+RELATED_REFRESH_MODE = 'sync' 时在事务提交后直接刷新（测试和调试使用）。
+较早的消息可能漏掉新发布的相关消息，由 rebuild_related_messages 管理命令（例如每天定时运行）全量重建。
+
+只有相关消息实际变化的消息，以及相关消息中显示了被修改消息的详情页才会失效。
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+from functools import reduce
+from operator import or_
+
+from django.conf import settings
+from django.db import close_old_connections, connections, router
+from django.db.models import Count, Max, Q
+
+from .models import Message
+from .page_cache import bump
+
+logger = logging.getLogger(__name__)
+
+Tagging = Message.tags.through
+
+_queue = queue.SimpleQueue()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def related_count():
+    return getattr(settings, 'RELATED_MESSAGES_COUNT', 3)
+
+
+def compute_related(message_id, tag_ids=None):
+    """计算一条消息的相关消息 id 列表"""
+    if tag_ids is None:
+        tag_ids = list(Tagging.objects.filter(message_id=message_id).values_list('tag_id', flat=True))
+    if not tag_ids:
+        return []
+    return list(
+        Tagging.objects.filter(tag_id__in=tag_ids, message__status='published')
+        .exclude(message_id=message_id)
+        .values('message_id')
+        .annotate(overlap=Count('tag_id'), published=Max('message__published_at'))
+        .order_by('-overlap', '-published', '-message_id')
+        .values_list('message_id', flat=True)[:related_count()]
+    )
+
+
+def refresh_related(message_ids):
+    """重新计算并写入指定消息的相关消息，返回实际变化的条数"""
+    message_ids = set(message_ids)
+    tags = {}
+    for message_id, tag_id in Tagging.objects.filter(message_id__in=message_ids).values_list('message_id', 'tag_id'):
+        tags.setdefault(message_id, []).append(tag_id)
+    changed = []
+    for pk, related_ids in Message.objects.filter(pk__in=message_ids).values_list('pk', 'related_ids'):
+        computed = compute_related(pk, tags.get(pk, []))
+        if computed != related_ids:
+            changed.append(Message(pk=pk, related_ids=computed))
+    # bulk_update 不触发 post_save，不会再次引起刷新
+    Message.objects.bulk_update(changed, ['related_ids'], batch_size=500)
+    # 只失效相关消息变化了的详情页
+    bump(*(f'message:{message.pk}' for message in changed))
+    return len(changed)
+
+
+def neighbours(tag_ids, exclude=None):
+    """共享这些标签的最近发布的消息"""
+    if not tag_ids:
+        return []
+    return list(
+        Tagging.objects.filter(tag_id__in=tag_ids, message__status='published')
+        .exclude(message_id=exclude)
+        .values('message_id')
+        .annotate(published=Max('message__published_at'))
+        .order_by('-published')
+        .values_list('message_id', flat=True)[:getattr(settings, 'RELATED_REFRESH_NEIGHBOURS', 50)]
+    )
+
+
+def referrers(message_id, tag_ids):
+    """相关消息中包含该消息的消息 id，在数据库中过滤，不把 related_ids 取回 Python"""
+    if connections[router.db_for_read(Message)].features.supports_json_field_contains:
+        contains = Q(related_ids__contains=[message_id])
+    else:
+        # SQLite 等不支持 JSON contains，related_ids 最多 related_count() 项，逐个位置比较
+        contains = reduce(or_, (Q(**{f'related_ids__{i}': message_id}) for i in range(related_count())))
+    return list(
+        Message.objects.filter(contains, pk__in=Tagging.objects.filter(tag_id__in=tag_ids).values('message_id'))
+        .values_list('pk', flat=True)
+    )
+
+
+def refresh_around(message_id, tag_ids=()):
+    """
+    刷新一条消息的相关消息，再安排刷新它的邻居
+
+    tag_ids 为额外需要考虑的标签，例如刚被移除的标签。
+    """
+    refresh_related([message_id])
+    schedule_neighbours(message_id, tag_ids)
+
+
+def schedule_neighbours(message_id, tag_ids=()):
+    """安排刷新共享标签的邻居，消息已删除时 tag_ids 为它删除前的标签"""
+    item = (message_id, tuple(tag_ids))
+    if getattr(settings, 'RELATED_REFRESH_MODE', 'thread') == 'sync':
+        refresh_neighbours([item])
+    else:
+        _queue.put(item)
+        _ensure_worker()
+
+
+def refresh_neighbours(items):
+    """刷新一批 (消息 id, 标签 id) 的邻居，并失效相关消息中显示了这些消息的详情页"""
+    affected, referring = set(), set()
+    for message_id, tag_ids in items:
+        tag_ids = set(tag_ids) | set(Tagging.objects.filter(message_id=message_id).values_list('tag_id', flat=True))
+        affected.update(neighbours(tag_ids, exclude=message_id))
+        # 标题、发布状态可能变化，较早的邻居不在刷新范围内，仍要失效其页面
+        referring.update(referrers(message_id, tag_ids))
+    refresh_related(affected)
+    bump(*(f'message:{pk}' for pk in referring))
+
+
+def _ensure_worker():
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name='related-refresher', daemon=True)
+            _worker.start()
+
+
+def _take_batch(block=True):
+    """从队列中取出一批，最多等待 RELATED_REFRESH_INTERVAL 秒，同一消息的多次变化合并成一条"""
+    try:
+        items = [_queue.get(block=block)]
+    except queue.Empty:
+        return []
+    deadline = time.monotonic() + getattr(settings, 'RELATED_REFRESH_INTERVAL', 2)
+    while len(items) < 500:
+        timeout = deadline - time.monotonic()
+        try:
+            items.append(_queue.get(timeout=timeout) if block and timeout > 0 else _queue.get_nowait())
+        except queue.Empty:
+            break
+    merged = {}
+    for message_id, tag_ids in items:
+        merged.setdefault(message_id, set()).update(tag_ids)
+    return [(message_id, tuple(tag_ids)) for message_id, tag_ids in merged.items()]
+
+
+def _run():
+    while True:
+        items = _take_batch()
+        try:
+            refresh_neighbours(items)
+        except Exception:
+            logger.exception('刷新 %d 条消息的邻居失败', len(items))
+        finally:
+            close_old_connections()
+
+
+def flush_queue():
+    """立即刷新队列中剩余的邻居，返回处理的消息数"""
+    total = 0
+    while True:
+        items = _take_batch(block=False)
+        if not items:
+            return total
+        refresh_neighbours(items)
+        total += len(items)
+
+
+@atexit.register
+def _flush_on_exit():
+    try:
+        flush_queue()
+    except Exception:
+        logger.exception('退出时刷新相关消息失败')
+
+
+def related_messages(message, queryset=None):
+    """按预先计算的顺序取出相关消息，没有相关消息时返回最新消息"""
+    queryset = queryset if queryset is not None else Message.objects.all()
+    queryset = queryset.filter(status='published').exclude(pk=message.pk)
+    if message.related_ids:
+        found = queryset.in_bulk(message.related_ids)
+        return [found[pk] for pk in message.related_ids if pk in found]
+    return list(queryset.order_by('-published_at')[:related_count()])
@@ -0,0 +1,29 @@
+"""
+API 渲染器
+
+FastJSONRenderer 用 orjson 编码，速度约为标准库 json 的数倍。orjson 已列在 requirements 中，
+只有在缺少它的环境（例如没有对应 wheel 的平台）才退回 DRF 自带的 JSONRenderer，
+输出格式保持一致（紧凑、不转义中文）。
+"""
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # 没有 wheel 的平台上退回标准库
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """使用 orjson 编码的 JSON 渲染器"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        renderer_context = renderer_context or {}
+        indent = self.get_indent(accepted_media_type, renderer_context)
+        option = orjson.OPT_INDENT_2 if indent else 0
+        # orjson 不认识的类型（Decimal、惰性翻译字符串等）交给 DRF 的编码器处理
+        ret = orjson.dumps(data, default=JSONEncoder().default, option=option)
+        # 与 JSONRenderer 一样转义 U+2028 / U+2029，输出可以安全嵌入 <script>
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -0,0 +1,166 @@
+"""
+消息正文渲染
+
+CKEditor 提交的 HTML 在保存时处理一次，结果保存在消息上：
+
+- content_html: 按白名单清洗后的 HTML，详情页直接输出；CKEditor 上传的图片已生成缩放版本时
+  输出为带 srcset 的 <picture>（见 images.py）
+- excerpt: 纯文本摘要，列表页直接输出
+- word_count: 字数，汉字按字计、字母数字按词计
+
+模板中不再对每条消息执行 striptags / truncatechars。
+"""
+import re
+from html import escape
+from html.parser import HTMLParser
+
+from django.utils.text import Truncator
+
+from .images import EditorImageStorage, editor_image_variants, picture_html
+from .tokenizer import CJK_RANGES
+
+EXCERPT_LENGTH = 100
+
+# 允许的标签及其属性
+ALLOWED_TAGS = {
+    'a': {'href', 'title', 'target'},
+    'img': {'src', 'alt', 'title', 'width', 'height'},
+    'figure': {'class', 'style'},
+    'figcaption': set(),
+    'oembed': {'url'},
+    'p': {'style'}, 'span': {'class'}, 'div': {'class'},
+    'br': set(), 'hr': set(),
+    'h1': set(), 'h2': set(), 'h3': set(), 'h4': set(), 'h5': set(), 'h6': set(),
+    'strong': set(), 'b': set(), 'em': set(), 'i': set(), 'u': set(), 's': set(),
+    'sub': set(), 'sup': set(), 'code': set(), 'pre': set(), 'blockquote': set(),
+    'ul': set(), 'ol': {'start'}, 'li': set(),
+    'table': set(), 'thead': set(), 'tbody': set(), 'tr': set(),
+    'th': {'colspan', 'rowspan'}, 'td': {'colspan', 'rowspan'},
+}
+VOID_TAGS = {'br', 'hr', 'img'}
+# 连同内容一起丢弃的标签
+DROPPED_TAGS = {'script', 'style', 'iframe', 'object', 'embed', 'noscript', 'template'}
+# 结束时在纯文本中插入空白的块级标签
+BLOCK_TAGS = {
+    'p', 'div', 'br', 'hr', 'li', 'tr', 'td', 'th', 'blockquote', 'pre', 'figure', 'figcaption',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+}
+
+URL_ATTRIBUTES = {'href', 'src', 'url'}
+ALLOWED_SCHEMES = {'http', 'https', 'mailto'}
+SCHEME_RE = re.compile(r'^([a-z][a-z0-9+.\-]*):')
+# style 只保留尺寸和对齐
+STYLE_RE = re.compile(r'^\s*(width|height|text-align)\s*:\s*[\w.%\s-]+$', re.I)
+
+WORD_RE = re.compile(rf'[{CJK_RANGES}]|[^\W_{CJK_RANGES}]+')
+
+
+def _safe_url(value):
+    url = re.sub(r'[\x00-\x20]', '', value).lower()
+    match = SCHEME_RE.match(url)
+    return match is None or match.group(1) in ALLOWED_SCHEMES
+
+
+def _safe_style(value):
+    declarations = [item for item in value.split(';') if item.strip()]
+    kept = [item.strip() for item in declarations if STYLE_RE.match(item)]
+    return '; '.join(kept)
+
+
+class _Renderer(HTMLParser):
+    """一次解析同时生成清洗后的 HTML 和纯文本"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.html = []
+        self.text = []
+        self.open_tags = []
+        self.dropping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROPPED_TAGS:
+            self.dropping += 1
+            return
+        if self.dropping or tag not in ALLOWED_TAGS:
+            return
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+        kept = []
+        for name, value in attrs:
+            if name not in ALLOWED_TAGS[tag] or value is None:
+                continue
+            if name in URL_ATTRIBUTES and not _safe_url(value):
+                continue
+            if name == 'style':
+                value = _safe_style(value)
+                if not value:
+                    continue
+            kept.append(f' {name}="{escape(value)}"')
+        if tag == 'a':
+            kept.append(' rel="noopener nofollow"')
+        if tag == 'img' and self._append_picture(attrs):
+            return
+        self.html.append(f'<{tag}{"".join(kept)}>')
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def _append_picture(self, attrs):
+        """上传的图片已有缩放版本时输出 <picture>，返回是否已输出"""
+        attrs = dict(attrs)
+        variants = editor_image_variants(attrs.get('src') or '')
+        if not variants:
+            return False
+        self.html.append(picture_html(variants, 'detail', alt=attrs.get('alt') or '', storage=EditorImageStorage()))
+        return True
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and self.open_tags and self.open_tags[-1] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROPPED_TAGS:
+            self.dropping = max(self.dropping - 1, 0)
+            return
+        if self.dropping or tag not in self.open_tags:
+            return
+        # 关闭中间未闭合的标签
+        while self.open_tags:
+            current = self.open_tags.pop()
+            self.html.append(f'</{current}>')
+            if current == tag:
+                break
+        if tag in BLOCK_TAGS:
+            self.text.append(' ')
+
+    def handle_data(self, data):
+        if self.dropping:
+            return
+        self.html.append(escape(data, quote=False))
+        self.text.append(data)
+
+    def close(self):
+        super().close()
+        while self.open_tags:
+            self.html.append(f'</{self.open_tags.pop()}>')
+
+
+def render_content(content):
+    """返回 (清洗后的 HTML, 纯文本)"""
+    renderer = _Renderer()
+    renderer.feed(content or '')
+    renderer.close()
+    text = re.sub(r'\s+', ' ', ''.join(renderer.text)).strip()
+    return ''.join(renderer.html), text
+
+
+def plain_text(content):
+    return render_content(content)[1]
+
+
+def excerpt(text, length=EXCERPT_LENGTH):
+    return Truncator(text).chars(length)
+
+
+def word_count(text):
+    return len(WORD_RE.findall(text))
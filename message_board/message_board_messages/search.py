@@ -0,0 +1,255 @@
+"""
+消息全文搜索
+
+倒排索引覆盖标题、去除 HTML 后的正文和标签名，按数据库选择实现：
+
+- SQLite: FTS5 虚拟表 message_search，rowid 即消息 id，按 bm25 排序
+- PostgreSQL: message_search_index 表保存带权重的 tsvector，GIN 索引，按 ts_rank 排序
+- 其他数据库: 退回到 icontains 查询
+
+上面的分词都不能切分中文，因此同时把文本按 tokenizer.py 切成二元组写入 SearchPosting 倒排表；
+含中文的查询改为在倒排表中求交集（每个二元组都必须出现），按加权词频排序；
+倒排表同时保存每个汉字的单字记录，只搜一个字时同样是按词的等值查找。
+
+索引表由迁移 0010 创建，数据变化时由 models.py 中的信号在事务提交后更新；
+已有数据或索引损坏时运行 rebuild_search_index 管理命令重建。
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Count, Q, Sum
+
+from .models import Message, SearchPosting
+from .rendering import plain_text
+from .tokenizer import CJK_RE, characters, query_terms, tokenize
+
+SQLITE_TABLE = 'message_search'
+POSTGRES_TABLE = 'message_search_index'
+
+# 标题、标签、正文的权重
+SQLITE_WEIGHTS = (10.0, 5.0, 1.0)
+POSTING_WEIGHTS = (10, 5, 1)
+
+
+def build_document(message):
+    """生成消息的索引文本：(标题, 标签, 正文)"""
+    tags = ' '.join(tag.name for tag in message.tags.all())
+    return message.title, tags, plain_text(message.content)
+
+
+def build_postings(pk, document):
+    """把索引文本切分成倒排记录，同一个词在各字段中的出现次数按字段权重累加"""
+    weights = Counter()
+    for text, weight in zip(document, POSTING_WEIGHTS):
+        for term in tokenize(text):
+            # 单独成段的汉字由下面的单字记录统计
+            if not (len(term) == 1 and CJK_RE.match(term)):
+                weights[term] += weight
+        for char in characters(text):
+            weights[char] += weight
+    return [SearchPosting(term=term, message_id=pk, weight=weight) for term, weight in weights.items()]
+
+
+def parse_query(query):
+    """拆分搜索词，过长的输入截断"""
+    return (query or '').strip()[:100].split()
+
+
+class SQLiteBackend:
+    """SQLite FTS5 索引"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def index(self, documents):
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {SQLITE_TABLE} WHERE rowid = %s', [(pk,) for pk in documents]
+            )
+            cursor.executemany(
+                f'INSERT INTO {SQLITE_TABLE} (rowid, title, tags, body) VALUES (%s, %s, %s, %s)',
+                [(pk, *document) for pk, document in documents.items()],
+            )
+
+    def remove(self, ids):
+        with self.connection.cursor() as cursor:
+            cursor.executemany(f'DELETE FROM {SQLITE_TABLE} WHERE rowid = %s', [(pk,) for pk in ids])
+
+    def clear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SQLITE_TABLE}')
+
+    def search(self, terms, limit):
+        # 每个词加引号避免被解析为 FTS5 语法，末尾的 * 允许前缀匹配，多个词之间为 AND
+        match = ' '.join('"%s"*' % term.replace('"', '""') for term in terms)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {SQLITE_TABLE} WHERE {SQLITE_TABLE} MATCH %s '
+                f'ORDER BY bm25({SQLITE_TABLE}, %s, %s, %s) LIMIT %s',
+                [match, *SQLITE_WEIGHTS, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresBackend:
+    """PostgreSQL tsvector + GIN 索引，使用 simple 配置不做词干处理"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def index(self, documents):
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f"""
+                INSERT INTO {POSTGRES_TABLE} (message_id, document) VALUES (
+                    %s,
+                    setweight(to_tsvector('simple', %s), 'A') ||
+                    setweight(to_tsvector('simple', %s), 'B') ||
+                    setweight(to_tsvector('simple', %s), 'C')
+                )
+                ON CONFLICT (message_id) DO UPDATE SET document = EXCLUDED.document
+                """,
+                [(pk, *document) for pk, document in documents.items()],
+            )
+
+    def remove(self, ids):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {POSTGRES_TABLE} WHERE message_id = ANY(%s)', [list(ids)])
+
+    def clear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE {POSTGRES_TABLE}')
+
+    def search(self, terms, limit):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT message_id FROM {POSTGRES_TABLE}, plainto_tsquery('simple', %s) query
+                WHERE document @@ query
+                ORDER BY ts_rank(document, query) DESC, message_id DESC
+                LIMIT %s
+                """,
+                [' '.join(terms), limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class FallbackBackend:
+    """没有全文索引的数据库，使用 icontains 查询"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def index(self, documents):
+        pass
+
+    def remove(self, ids):
+        pass
+
+    def clear(self):
+        pass
+
+    def search(self, terms, limit):
+        condition = Q()
+        for term in terms:
+            condition &= Q(title__icontains=term) | Q(content__icontains=term) | Q(tags__name__icontains=term)
+        queryset = Message.objects.using(self.connection.alias).filter(condition).distinct()
+        return list(queryset.order_by('-created_at').values_list('pk', flat=True)[:limit])
+
+
+BACKENDS = {
+    'sqlite': SQLiteBackend,
+    'postgresql': PostgresBackend,
+}
+
+
+def get_backend(using=None):
+    connection = connections[using or router.db_for_write(Message)]
+    return BACKENDS.get(connection.vendor, FallbackBackend)(connection)
+
+
+def index_messages(ids, using=None):
+    """重新索引指定的消息，已删除的消息从索引中移除"""
+    ids = set(ids)
+    if not ids:
+        return
+    backend = get_backend(using)
+    messages = Message.objects.using(backend.connection.alias).filter(pk__in=ids).prefetch_related('tags')
+    documents = {message.pk: build_document(message) for message in messages}
+    postings = [posting for pk, document in documents.items() for posting in build_postings(pk, document)]
+    with transaction.atomic(using=backend.connection.alias):
+        backend.remove(ids - documents.keys())
+        backend.index(documents)
+        SearchPosting.objects.using(backend.connection.alias).filter(message_id__in=ids).delete()
+        SearchPosting.objects.using(backend.connection.alias).bulk_create(postings, batch_size=1000)
+
+
+def remove_messages(ids, using=None):
+    # 倒排记录随消息级联删除
+    get_backend(using).remove(set(ids))
+
+
+def clear_index(using=None):
+    """清空全文索引和倒排表"""
+    backend = get_backend(using)
+    with transaction.atomic(using=backend.connection.alias):
+        backend.clear()
+        SearchPosting.objects.using(backend.connection.alias).all().delete()
+
+
+def search_postings(required, optional=(), limit=1000, using=None):
+    """在倒排表中查找包含全部 required 词的消息，按加权词频排序"""
+    postings = SearchPosting.objects.using(using or router.db_for_read(SearchPosting))
+    return list(
+        postings.filter(term__in=[*required, *optional])
+        .values('message_id')
+        .annotate(matched=Count('term', filter=Q(term__in=required), distinct=True), score=Sum('weight'))
+        .filter(matched=len(required))
+        .order_by('-score', '-message_id')
+        .values_list('message_id', flat=True)[:limit]
+    )
+
+
+def search_message_ids(query, limit=None, using=None):
+    """按相关度返回匹配消息的 id 列表"""
+    terms = parse_query(query)
+    if not terms:
+        return []
+    limit = limit or getattr(settings, 'SEARCH_MAX_RESULTS', 1000)
+    required, optional = query_terms(' '.join(terms))
+    if any(CJK_RE.match(term) for term in required):
+        # 含中文的查询使用二元组倒排表，全文索引无法匹配一段汉字中间的字
+        return search_postings(required, optional, limit, using)
+    return get_backend(using).search(terms, limit)
+
+
+class SearchResults:
+    """
+    按相关度排列的搜索结果
+
+    可直接交给 Paginator / PageNumberPagination，分页时只加载当前页的消息。
+    """
+
+    def __init__(self, queryset, query):
+        self.queryset = queryset
+        ranked = search_message_ids(query, using=queryset.db)
+        # 按列表查询集的条件（例如只含已发布消息）过滤，保持相关度顺序
+        visible = set(queryset.filter(pk__in=ranked).values_list('pk', flat=True)) if ranked else set()
+        self.ids = [pk for pk in ranked if pk in visible]
+
+    def count(self):
+        return len(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __iter__(self):
+        return iter(self[:])
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0] if index >= 0 else self[:][index]
+        ids = self.ids[index]
+        objects = self.queryset.in_bulk(ids)
+        return [objects[pk] for pk in ids if pk in objects]
@@ -3,6 +3,30 @@ from .models import Message, Tag, Favorite, Like
 from django.contrib.auth.models import User
 
 
+class SparseFieldsetsMixin:
+    """
+    支持 ?fields=id,title 只返回指定字段
+
+    只作用于最外层的序列化器（或列表中的每一项），嵌套的序列化器保持完整。
+    """
+    fields_query_param = 'fields'
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or not self._is_top_level():
+            return fields
+        requested = request.query_params.get(self.fields_query_param)
+        if not requested:
+            return fields
+        allowed = {name.strip() for name in requested.split(',')}
+        return {name: field for name, field in fields.items() if name in allowed}
+
+    def _is_top_level(self):
+        parent = getattr(self, 'parent', None)
+        return parent is None or (isinstance(parent, serializers.ListSerializer) and parent.parent is None)
+
+
 class UserSerializer(serializers.ModelSerializer):
     """用户序列化器"""
     class Meta:
@@ -10,17 +34,14 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ['id', 'username', 'email']
 
 
-
-
-
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     """标签序列化器"""
     class Meta:
         model = Tag
         fields = ['id', 'name', 'slug', 'created_at']
 
 
-class MessageSerializer(serializers.ModelSerializer):
+class MessageSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     """消息序列化器"""
     author = UserSerializer(read_only=True)
     tags = TagSerializer(many=True, read_only=True)
@@ -28,26 +49,40 @@ class MessageSerializer(serializers.ModelSerializer):
     class Meta:
         model = Message
         fields = [
-            'id', 'title', 'slug', 'author', 'tags', 'content',
-            'image', 'status', 'views', 'likes', 'comments_count',
+            'id', 'title', 'slug', 'author', 'tags', 'content', 'excerpt', 'word_count',
+            'image', 'status', 'views', 'likes', 'comments_count', 'favorites_count',
             'created_at', 'updated_at', 'published_at'
         ]
 
 
-class FavoriteSerializer(serializers.ModelSerializer):
-    """收藏序列化器"""
-    user = UserSerializer(read_only=True)
-    message = MessageSerializer(read_only=True)
+class MessageListSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
+    """消息列表序列化器：只输出摘要、计数、作者 id/名称和标签 slug，不输出正文"""
+    author_id = serializers.IntegerField(read_only=True)
+    author_name = serializers.CharField(source='author.username', read_only=True)
+    tags = serializers.SlugRelatedField(many=True, read_only=True, slug_field='slug')
+
+    class Meta:
+        model = Message
+        fields = [
+            'id', 'title', 'slug', 'excerpt', 'views', 'likes', 'comments_count',
+            'author_id', 'author_name', 'tags', 'created_at', 'published_at'
+        ]
+
+
+class FavoriteSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
+    """收藏序列化器，消息使用列表表示"""
+    user = serializers.PrimaryKeyRelatedField(read_only=True)
+    message = MessageListSerializer(read_only=True)
     
     class Meta:
         model = Favorite
         fields = ['id', 'user', 'message', 'created_at']
 
 
-class LikeSerializer(serializers.ModelSerializer):
-    """点赞序列化器"""
-    user = UserSerializer(read_only=True)
-    message = MessageSerializer(read_only=True)
+class LikeSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
+    """点赞序列化器，消息使用列表表示"""
+    user = serializers.PrimaryKeyRelatedField(read_only=True)
+    message = MessageListSerializer(read_only=True)
     
     class Meta:
         model = Like
@@ -0,0 +1,23 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from ..images import picture_html
+
+register = template.Library()
+
+
+@register.simple_tag
+def message_picture(message, size='detail', sizes=None, **attrs):
+    """
+    输出消息配图的 <picture>，缩放版本尚未生成时退回原图
+
+    用法: {% message_picture message 'card' class='card-img-top' %}
+    """
+    if not message.image:
+        return ''
+    alt = attrs.pop('alt', message.title)
+    variants = message.image_variants or {}
+    if variants.get('source') == message.image.name and size in variants.get('variants', {}):
+        return picture_html(variants, size, alt=alt, sizes=sizes, **attrs)
+    extra = format_html_join('', ' {}="{}"', sorted(attrs.items()))
+    return format_html('<img src="{}" alt="{}" loading="lazy"{}>', message.image.url, alt, extra)
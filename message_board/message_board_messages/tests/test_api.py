@@ -0,0 +1,117 @@
+import json
+
+import pytest
+from django.contrib.auth.models import User
+from django.test import Client
+from ..models import Favorite, Like, Message, Tag
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def reader():
+    """创建登录用户"""
+    return User.objects.create_user(username='reader', password='testpassword')
+
+
+@pytest.fixture
+def messages(reader):
+    """创建带标签的已发布消息，并全部收藏"""
+    author = User.objects.create_user(username='author')
+    tag = Tag.objects.create(name='测试标签', slug='test-tag')
+    result = []
+    for i in range(3):
+        message = Message.objects.create(
+            title=f'消息{i}', slug=f'message-{i}', author=author, content='<p>很长的正文</p>', status='published'
+        )
+        message.tags.add(tag)
+        Favorite.objects.create(user=reader, message=message)
+        result.append(message)
+    return result
+
+
+@pytest.fixture
+def client(reader):
+    client = Client()
+    client.login(username='reader', password='testpassword')
+    return client
+
+
+class TestCompactRepresentation:
+    """测试列表的精简表示和 ?fields= 稀疏字段"""
+
+    def test_list_item_is_compact(self, client, messages):
+        item = client.get('/messages/api/messages/').json()['results'][0]
+        assert set(item) == {
+            'id', 'title', 'slug', 'excerpt', 'views', 'likes', 'comments_count',
+            'author_id', 'author_name', 'tags', 'created_at', 'published_at',
+        }
+        assert item['author_name'] == 'author'
+        assert item['tags'] == ['test-tag']
+
+    def test_sparse_fieldsets(self, client, messages):
+        results = client.get('/messages/api/messages/', {'fields': 'id,title'}).json()['results']
+        assert results[0] == {'id': messages[-1].pk, 'title': '消息2'}
+        detail = client.get(f'/messages/api/messages/{messages[0].pk}/', {'fields': 'content'}).json()
+        assert detail == {'content': '<p>很长的正文</p>'}
+
+    def test_favorites_embed_compact_message(self, client, messages, django_assert_max_num_queries):
+        with django_assert_max_num_queries(6):
+            results = client.get('/messages/api/favorites/').json()['results']
+        assert len(results) == 3
+        assert 'content' not in results[0]['message']
+        # 稀疏字段只作用于最外层，嵌套的消息保持完整的列表表示
+        favorite = client.get('/messages/api/favorites/', {'fields': 'message'}).json()['results'][0]
+        assert set(favorite) == {'message'}
+        assert favorite['message']['tags'] == ['test-tag']
+
+
+class TestFastList:
+    """测试列表的快速读取路径与序列化器路径输出一致"""
+
+    @pytest.mark.parametrize('url', [
+        '/messages/api/messages/', '/messages/api/tags/', '/messages/api/favorites/', '/messages/api/likes/',
+    ])
+    def test_same_output_as_serializers(self, client, messages, reader, url):
+        for message in messages:
+            Like.objects.create(user=reader, message=message)
+        messages[0].tags.add(Tag.objects.create(name='另一个标签', slug='another'))
+        fast = client.get(url).json()
+        slow = client.get(url, {'fast': '0'}).json()
+        assert fast['results']
+        assert fast['results'] == slow['results']
+
+    def test_sparse_fieldsets(self, client, messages):
+        results = client.get('/messages/api/messages/', {'fields': 'id,tags'}).json()['results']
+        assert results[0] == {'id': messages[-1].pk, 'tags': ['test-tag']}
+
+    def test_cursor_pages(self, client, messages, monkeypatch):
+        from ..pagination import MessageKeysetPagination
+        monkeypatch.setattr(MessageKeysetPagination, 'page_size', 2)
+        first = client.get('/messages/api/messages/', {'cursor': ''}).json()
+        ids = [item['id'] for item in first['results']]
+        second = client.get(first['next']).json()
+        ids += [item['id'] for item in second['results']]
+        assert ids == [message.pk for message in reversed(messages)]
+
+    def test_query_count(self, client, messages, django_assert_max_num_queries):
+        # 会话、用户、总数、列表、标签
+        with django_assert_max_num_queries(5):
+            assert len(client.get('/messages/api/messages/').json()['results']) == 3
+        # 游标分页不查询总数
+        with django_assert_max_num_queries(4):
+            assert len(client.get('/messages/api/messages/', {'cursor': ''}).json()['results']) == 3
+
+
+class TestFastJSONRenderer:
+    def test_uses_orjson(self):
+        # orjson 在 requirements 中，退回标准库说明依赖没有安装
+        from .. import renderers
+        assert renderers.orjson is not None
+
+    def test_matches_json_renderer(self):
+        from rest_framework.renderers import JSONRenderer
+        from ..renderers import FastJSONRenderer
+        data = {'title': '消息 ', 'count': 1, 'items': [None, True, 1.5]}
+        assert json.loads(FastJSONRenderer().render(data)) == json.loads(JSONRenderer().render(data))
+        assert b'\\u2028' in FastJSONRenderer().render(data)
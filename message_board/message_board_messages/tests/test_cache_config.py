@@ -0,0 +1,61 @@
+import pytest
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from message_board.cache_config import CACHE_ALIASES, build_caches, uses_shared_sessions
+from ..counters import VIEW_PENDING_KEY
+
+
+class TestBuildCaches:
+    """测试缓存配置生成"""
+
+    def test_default_is_locmem_per_alias(self):
+        config = build_caches({})
+        assert set(config) == set(CACHE_ALIASES)
+        assert config['default']['BACKEND'].endswith('LocMemCache')
+        # 每个别名使用独立的 locmem 存储和键前缀
+        assert len({c['LOCATION'] for c in config.values()}) == len(CACHE_ALIASES)
+        assert config['pages']['KEY_PREFIX'] == 'message_board:pages'
+        assert not uses_shared_sessions({})
+
+    def test_redis_with_prefix_and_version(self):
+        env = {
+            'CACHE_BACKEND': 'redis', 'CACHE_URL': 'redis://cache:6379/2',
+            'CACHE_KEY_PREFIX': 'board', 'CACHE_VERSION': '3',
+        }
+        config = build_caches(env)
+        assert config['counters'] == {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': 'redis://cache:6379/2',
+            'KEY_PREFIX': 'board:counters',
+            'VERSION': 3,
+            'TIMEOUT': None,
+        }
+        assert uses_shared_sessions(env)
+
+    def test_per_alias_override(self):
+        config = build_caches({'CACHE_BACKEND': 'memcached', 'CACHE_BACKEND_SESSIONS': 'db'})
+        assert config['default']['LOCATION'] == '127.0.0.1:11211'
+        assert config['sessions']['BACKEND'].endswith('DatabaseCache')
+
+    def test_unknown_backend(self):
+        with pytest.raises(ValueError):
+            build_caches({'CACHE_BACKEND': 'mongo'})
+
+
+@pytest.mark.django_db
+def test_counters_are_shared_between_processes(settings, tmp_path, rf):
+    """共享后端上一个进程记录的浏览量对另一个进程可见"""
+    from django.contrib.auth.models import AnonymousUser
+    from ..counters import record_view
+
+    settings.CACHES = build_caches({'CACHE_BACKEND': 'file', 'CACHE_URL': str(tmp_path)})
+    settings.VIEW_COUNTER_FLUSH_INTERVAL = None
+    request = rf.get('/')
+    request.user = AnonymousUser()
+    record_view(request, 42)
+
+    # 模拟另一个 worker 进程：用同样的配置单独创建缓存对象
+    config = settings.CACHES['counters']
+    other_worker = FileBasedCache(config['LOCATION'], config)
+    assert other_worker.get(VIEW_PENDING_KEY.format(42)) == 1
+    assert caches['counters'].get(VIEW_PENDING_KEY.format(42)) == 1
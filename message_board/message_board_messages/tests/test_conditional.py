@@ -0,0 +1,159 @@
+import pytest
+from django.contrib.auth.models import User
+from django.test import Client
+from django.urls import reverse
+from comments.models import Comment
+from ..counters import flush_view_counts, record_view
+from ..models import Favorite, Message, Tag
+from ..notifications import adjust_unread_count
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def no_inline_view_flush(settings):
+    """浏览量写回会递增详情页的代数，测试中关闭请求内自动写回"""
+    settings.VIEW_COUNTER_FLUSH_INTERVAL = None
+
+
+@pytest.fixture
+def author():
+    return User.objects.create_user(username='author', password='testpassword')
+
+
+@pytest.fixture
+def tag():
+    return Tag.objects.create(name='测试标签', slug='test-tag')
+
+
+@pytest.fixture
+def message(author, tag):
+    message = Message.objects.create(
+        title='测试消息标题', slug='test-message', author=author,
+        content='测试消息内容', status='published'
+    )
+    message.tags.add(tag)
+    return message
+
+
+def revalidate(client, url, etag, **extra):
+    return client.get(url, HTTP_IF_NONE_MATCH=etag, **extra)
+
+
+class TestConditionalPages:
+    """测试页面的 ETag 和 304 响应"""
+
+    @pytest.mark.parametrize('name', ['list', 'tag', 'detail'])
+    def test_not_modified(self, name, message, tag, django_capture_on_commit_callbacks):
+        url = {
+            'list': reverse('message_board_messages:message_list'),
+            'tag': reverse('message_board_messages:tag_messages', args=[tag.slug]),
+            'detail': reverse('message_board_messages:message_detail', args=[message.pk]),
+        }[name]
+        client = Client()
+        etag = client.get(url)['ETag']
+        response = revalidate(client, url, etag)
+        assert response.status_code == 304
+        assert response['ETag'] == etag
+
+        with django_capture_on_commit_callbacks(execute=True):
+            message.title = '新标题'
+            message.save()
+        response = revalidate(client, url, etag)
+        assert response.status_code == 200
+        assert response['ETag'] != etag
+
+    def test_comment_changes_detail_etag(self, message, author, django_capture_on_commit_callbacks):
+        url = reverse('message_board_messages:message_detail', args=[message.pk])
+        etag = Client().get(url)['ETag']
+        with django_capture_on_commit_callbacks(execute=True):
+            Comment.objects.create(message=message, author=author, content='评论')
+        assert revalidate(Client(), url, etag).status_code == 200
+
+    def test_personal_state(self, message, author):
+        url = reverse('message_board_messages:message_list')
+        anonymous = Client().get(url)['ETag']
+        client = Client()
+        client.login(username='author', password='testpassword')
+        etag = client.get(url)['ETag']
+        assert etag != anonymous
+        assert revalidate(client, url, etag).status_code == 304
+        adjust_unread_count(author.pk, 1)
+        assert revalidate(client, url, etag).status_code == 200
+
+    @pytest.mark.parametrize('name', ['list', 'tag'])
+    def test_favorite_changes_personal_etag(self, name, message, tag, author, django_capture_on_commit_callbacks):
+        url = {
+            'list': reverse('message_board_messages:message_list'),
+            'tag': reverse('message_board_messages:tag_messages', args=[tag.slug]),
+        }[name]
+        client = Client()
+        client.login(username='author', password='testpassword')
+        etag = client.get(url)['ETag']
+        with django_capture_on_commit_callbacks(execute=True):
+            Favorite.objects.create(user=author, message=message)
+        assert revalidate(client, url, etag).status_code == 200
+
+    def test_pending_flash_message(self, message):
+        url = reverse('message_board_messages:message_list')
+        client = Client()
+        etag = client.get(url)['ETag']
+        client.cookies['messages'] = 'pending'
+        assert revalidate(client, url, etag).status_code == 200
+
+
+class TestConditionalAPI:
+    """测试 API 的 ETag 和 304 响应"""
+
+    @pytest.fixture
+    def client(self, author):
+        client = Client()
+        client.login(username='author', password='testpassword')
+        return client
+
+    def test_list_and_retrieve(self, client, message, django_capture_on_commit_callbacks):
+        for url in ['/messages/api/messages/', f'/messages/api/messages/{message.pk}/']:
+            etag = client.get(url)['ETag']
+            assert revalidate(client, url, etag).status_code == 304
+            # 可浏览 API 的表示不同
+            assert revalidate(client, url, etag, HTTP_ACCEPT='text/html').status_code == 200
+
+        url = f'/messages/api/messages/{message.pk}/'
+        etag = client.get(url)['ETag']
+        with django_capture_on_commit_callbacks(execute=True):
+            message.title = '新标题'
+            message.save()
+        assert revalidate(client, url, etag).status_code == 200
+
+    def test_list_follows_comment_and_view_counts(self, client, author, message, rf,
+                                                   django_capture_on_commit_callbacks):
+        url = '/messages/api/messages/'
+        etag = client.get(url)['ETag']
+        with django_capture_on_commit_callbacks(execute=True):
+            comment = Comment.objects.create(message=message, author=author, content='评论')
+        response = revalidate(client, url, etag)
+        assert response.status_code == 200
+        assert response.json()['results'][0]['comments_count'] == 1
+
+        etag = response['ETag']
+        with django_capture_on_commit_callbacks(execute=True):
+            comment.delete()
+        response = revalidate(client, url, etag)
+        assert response.status_code == 200
+        etag = response['ETag']
+
+        request = rf.get('/')
+        request.user = author
+        record_view(request, message.pk)
+        flush_view_counts()
+        assert revalidate(client, url, etag).status_code == 200
+
+    def test_favorites_follow_user_state(self, client, author, message, django_capture_on_commit_callbacks):
+        url = '/messages/api/favorites/'
+        etag = client.get(url)['ETag']
+        assert revalidate(client, url, etag).status_code == 304
+        with django_capture_on_commit_callbacks(execute=True):
+            Favorite.objects.create(user=author, message=message)
+        response = revalidate(client, url, etag)
+        assert response.status_code == 200
+        assert len(response.json()['results']) == 1
@@ -0,0 +1,51 @@
+import runpy
+
+import pytest
+from django.conf import settings
+from message_board.cache_config import CACHE_ALIASES
+
+CONFIG = settings.BASE_DIR / 'gunicorn.conf.py'
+
+
+def load(monkeypatch, **env):
+    for name in ('GUNICORN_WORKER_CLASS', 'WEB_CONCURRENCY', 'GUNICORN_THREADS', 'PORT',
+                 *(f'CACHE_BACKEND_{alias.upper()}' for alias in CACHE_ALIASES)):
+        monkeypatch.delenv(name, raising=False)
+    env.setdefault('CACHE_BACKEND', 'redis')
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    return runpy.run_path(str(CONFIG))
+
+
+class TestGunicornConfig:
+    """测试 gunicorn.conf.py 的运行方式"""
+
+    def test_defaults(self, monkeypatch):
+        config = load(monkeypatch)
+        assert config['worker_class'] == 'gthread'
+        assert config['threads'] == 4
+        assert config['wsgi_app'] == 'message_board.wsgi:application'
+        assert config['preload_app'] is True
+        assert config['bind'] == '0.0.0.0:8000'
+        assert 3 <= config['workers'] <= 12
+
+    @pytest.mark.parametrize('mode, worker_class, app', [
+        ('sync', 'sync', 'message_board.wsgi:application'),
+        ('asgi', 'uvicorn_worker.UvicornWorker', 'message_board.asgi:application'),
+    ])
+    def test_modes(self, monkeypatch, mode, worker_class, app):
+        config = load(monkeypatch, GUNICORN_WORKER_CLASS=mode, WEB_CONCURRENCY='2', PORT='9000')
+        assert (config['worker_class'], config['wsgi_app']) == (worker_class, app)
+        assert config['threads'] == 1
+        assert config['workers'] == 2
+        assert config['bind'] == '0.0.0.0:9000'
+
+    def test_unknown_mode(self, monkeypatch):
+        with pytest.raises(ValueError):
+            load(monkeypatch, GUNICORN_WORKER_CLASS='eventlet')
+
+    @pytest.mark.parametrize('env', [{'CACHE_BACKEND': 'locmem'}, {'CACHE_BACKEND_PAGES': 'locmem'}])
+    def test_process_local_cache_uses_one_worker(self, monkeypatch, env):
+        config = load(monkeypatch, WEB_CONCURRENCY='4', **env)
+        assert config['workers'] == 1
+        assert config['threads'] == 4
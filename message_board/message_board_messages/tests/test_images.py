@@ -0,0 +1,125 @@
+from io import BytesIO
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.template import Context, Template
+from PIL import Image
+from ..images import EditorImageStorage
+from ..models import Message
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def media(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path)
+    settings.IMAGE_PROCESSING_MODE = 'sync'
+    return tmp_path
+
+
+def photo(width=1600, height=1200, **save_options):
+    buffer = BytesIO()
+    Image.new('RGB', (width, height), 'red').save(buffer, 'JPEG', **save_options)
+    return ContentFile(buffer.getvalue(), name='photo.jpg')
+
+
+def exif_photo():
+    exif = Image.Exif()
+    exif[0x010F] = 'Camera Maker'  # Make
+    exif[0x0112] = 6  # 方向：需要旋转 90 度
+    exif[0x8825] = {1: 'N', 2: (39.0, 54.0, 0.0)}  # GPS 位置
+    return photo(exif=exif.tobytes())
+
+
+@pytest.fixture
+def author():
+    return User.objects.create_user(username='author')
+
+
+class TestMessageImageVariants:
+    """测试消息配图的缩放版本"""
+
+    def test_variants_generated_on_commit(self, author, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            message = Message(title='配图', slug='photo', author=author, content='内容', status='published')
+            message.image.save('photo.jpg', exif_photo(), save=False)
+            message.save()
+        message.refresh_from_db()
+        variants = message.image_variants
+        assert variants['source'] == message.image.name
+        # 按 EXIF 方向旋转后再缩放
+        assert (variants['width'], variants['height']) == (1200, 1600)
+        assert variants['variants']['card']['width'] == 480
+        for name in (variants['variants']['detail']['webp'], variants['variants']['detail']['jpeg']):
+            with default_storage.open(name) as file:
+                image = Image.open(file)
+                assert image.width == 960
+                assert not image.getexif()
+        # 原图去掉 EXIF（含 GPS），按方向旋转后保存
+        with default_storage.open(message.image.name) as file:
+            image = Image.open(file)
+            assert image.size == (1200, 1600)
+            assert not image.getexif()
+
+    def test_small_image_is_not_enlarged(self, author, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            message = Message(title='小图', slug='small', author=author, content='内容', status='published')
+            message.image.save('small.jpg', photo(300, 200), save=False)
+            message.save()
+        message.refresh_from_db()
+        widths = {name: item['width'] for name, item in message.image_variants['variants'].items()}
+        assert widths == {'thumb': 240, 'card': 300, 'detail': 300}
+
+    def test_template_tag(self, author, django_capture_on_commit_callbacks):
+        with django_capture_on_commit_callbacks(execute=True):
+            message = Message(title='配图', slug='photo', author=author, content='内容', status='published')
+            message.image.save('photo.jpg', photo(), save=False)
+            message.save()
+        template = Template("{% load message_images %}{% message_picture message 'card' class='card-img-top' %}")
+        pending = template.render(Context({'message': message}))
+        # 尚未读到缩放版本时输出原图
+        assert pending.startswith('<img src="') and 'srcset' not in pending
+        message.refresh_from_db()
+        html = template.render(Context({'message': message}))
+        assert '<source type="image/webp" srcset="' in html
+        assert '480w' in html and '960w' in html
+        assert 'class="card-img-top"' in html
+
+
+class TestEditorImages:
+    """测试 CKEditor 上传图片的缩放版本"""
+
+    def test_upload_and_render(self, author, django_capture_on_commit_callbacks):
+        storage = EditorImageStorage()
+        with django_capture_on_commit_callbacks(execute=True):
+            name = storage.save('photo.jpg', photo())
+        assert storage.exists(f'variants/{name[:-4]}-detail.webp')
+
+        message = Message.objects.create(
+            title='正文图片', slug='inline', author=author, status='published',
+            content=f'<p><img src="{storage.url(name)}" alt="图片"></p>',
+        )
+        assert '<picture><source type="image/webp"' in message.content_html
+        assert 'alt="图片"' in message.content_html
+
+    def test_message_saved_before_variants_is_rerendered(self, author, settings,
+                                                        django_capture_on_commit_callbacks):
+        storage = EditorImageStorage()
+        settings.IMAGE_PROCESSING_MODE = 'thread'
+        # 模拟后台线程尚未完成：先保存消息，再执行生成任务
+        with django_capture_on_commit_callbacks() as callbacks:
+            name = storage.save('photo.jpg', exif_photo())
+        message = Message.objects.create(
+            title='正文图片', slug='inline', author=author, status='published',
+            content=f'<p><img src="{storage.url(name)}" alt="图片"></p>',
+        )
+        assert '<picture>' not in message.content_html
+        settings.IMAGE_PROCESSING_MODE = 'sync'
+        for callback in callbacks:
+            callback()
+        message.refresh_from_db()
+        assert '<picture><source type="image/webp"' in message.content_html
+        with storage.open(name) as file:
+            assert not Image.open(file).getexif()
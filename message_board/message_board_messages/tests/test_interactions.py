@@ -0,0 +1,171 @@
+import pytest
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.test import Client
+from django.urls import reverse
+from ..models import Favorite, Message, Like
+from .. import interactions
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def user():
+    """创建测试用户"""
+    return User.objects.create_user(username='testuser', password='testpassword')
+
+
+@pytest.fixture
+def message(user):
+    """创建测试消息"""
+    author = User.objects.create_user(username='author')
+    return Message.objects.create(
+        title='测试消息标题', slug='test-message', author=author,
+        content='测试消息内容', status='published'
+    )
+
+
+class TestLikeService:
+    """测试点赞服务"""
+
+    def test_like_is_idempotent(self, user, message):
+        """重复点赞被唯一约束忽略，计数不变"""
+        assert interactions.like(user, message) == (True, 1)
+        assert interactions.like(user, message) == (False, None)
+        assert Like.objects.count() == 1
+        message.refresh_from_db()
+        assert message.likes == 1
+
+    def test_unlike(self, user, message):
+        interactions.like(user, message)
+        assert interactions.unlike(user, message) == (True, 0)
+        assert interactions.unlike(user, message) == (False, None)
+        assert not Like.objects.exists()
+
+    def test_toggle(self, user, message):
+        assert interactions.toggle_like(user, message) == (True, 1)
+        assert interactions.toggle_like(user, message) == (False, 0)
+
+    def test_like_is_one_short_transaction(self, user, message, django_assert_max_num_queries):
+        """点赞只需插入、计数更新和读取点赞数三条语句（外加事务和保存点控制）"""
+        with django_assert_max_num_queries(7) as captured:
+            interactions.like(user, message)
+        statements = [q['sql'].split()[0].upper() for q in captured.captured_queries]
+        assert statements.count('INSERT') == 1
+        assert statements.count('SELECT') == 1
+
+    def test_duplicate_like_rolls_back_savepoint_only(self, user, message):
+        """重复插入违反唯一约束时只回滚保存点，外层事务仍可继续"""
+        interactions.like(user, message)
+        with transaction.atomic():
+            assert interactions.like(user, message) == (False, None)
+            assert Like.objects.filter(user=user, message=message).count() == 1
+        message.refresh_from_db()
+        assert message.likes == 1
+
+    @pytest.mark.parametrize('liked', [False, True])
+    def test_toggle_is_one_transaction(self, user, message, liked, django_assert_max_num_queries):
+        """切换点赞（包括取消已有的点赞）只用一个事务"""
+        if liked:
+            interactions.like(user, message)
+        with django_assert_max_num_queries(6 if liked else 9) as captured:
+            assert interactions.toggle_like(user, message) == (not liked, 0 if liked else 1)
+        statements = [q['sql'].split()[0].upper() for q in captured.captured_queries]
+        # 插入时多一个保存点，用于忽略唯一约束冲突
+        assert statements.count('SAVEPOINT') == (1 if liked else 2)
+
+
+class TestLikeView:
+    """测试点赞视图"""
+
+    def test_toggle_via_view(self, user, message):
+        client = Client()
+        client.login(username='testuser', password='testpassword')
+        url = reverse('message_board_messages:like_message', args=[message.pk])
+        assert client.post(url).json() == {'liked': True, 'likes_count': 1}
+        assert client.post(url).json() == {'liked': False, 'likes_count': 0}
+        assert client.post(url, {'action': 'unlike'}).json() == {'liked': False, 'likes_count': 0}
+
+
+class TestFavoriteService:
+    """测试收藏服务和缓存的收藏列表"""
+
+    def test_favorite_is_idempotent(self, user, message):
+        assert interactions.favorite(user, message) is True
+        assert interactions.favorite(user, message) is False
+        assert Favorite.objects.count() == 1
+        assert interactions.unfavorite(user, message) is True
+        assert interactions.unfavorite(user, message) is False
+
+    def test_cached_ids_follow_changes(self, user, message, django_capture_on_commit_callbacks):
+        other = Message.objects.create(
+            title='另一条消息', slug='other', author=message.author, content='内容', status='published'
+        )
+        assert interactions.favorite_ids(user.pk) == []
+        with django_capture_on_commit_callbacks(execute=True):
+            interactions.favorite(user, message)
+        with django_capture_on_commit_callbacks(execute=True):
+            Favorite.objects.create(user=user, message=other)
+        assert interactions.favorite_ids(user.pk) == [other.pk, message.pk]
+        with django_capture_on_commit_callbacks(execute=True):
+            interactions.unfavorite(user, other)
+        # 缓存命中，不再查询数据库
+        assert interactions.favorite_ids(user.pk) == [message.pk]
+
+
+class TestFavoriteList:
+    """测试收藏列表"""
+
+    def test_cursor_pages_skip_drafts(self, user, message):
+        for i in range(15):
+            target = Message.objects.create(
+                title=f'消息{i}', slug=f'message-{i}', author=message.author, content='内容',
+                status='draft' if i % 4 == 0 else 'published',
+            )
+            Favorite.objects.create(user=user, message=target)
+        client = Client()
+        client.login(username='testuser', password='testpassword')
+        url = reverse('message_board_messages:favorite_list')
+
+        first = client.get(url).context['messages_list']
+        second = client.get(url, {'cursor': first.next_cursor}).context['messages_list']
+        titles = [item.title for item in [*first, *second]]
+        # 最近收藏的在前，草稿在数据库中过滤
+        assert titles == [f'消息{i}' for i in reversed(range(15)) if i % 4]
+        assert not second.has_next()
+
+
+class TestInteractionState:
+    """测试点赞 / 收藏状态查询和收藏数"""
+
+    def test_state_in_one_query(self, user, message, django_assert_num_queries):
+        other = Message.objects.create(
+            title='另一条消息', slug='other', author=message.author, content='内容', status='published'
+        )
+        interactions.like(user, message)
+        interactions.favorite(user, message)
+        interactions.favorite(user, other)
+        with django_assert_num_queries(1):
+            state = interactions.interaction_state(user, [message.pk, other.pk])
+        assert state.liked == {message.pk}
+        assert state.favorited == {message.pk, other.pk}
+
+    def test_favorites_count(self, user, message):
+        other_user = User.objects.create_user(username='other')
+        interactions.favorite(user, message)
+        interactions.favorite(user, message)
+        Favorite.objects.create(user=other_user, message=message)
+        message.refresh_from_db()
+        assert message.favorites_count == 2
+        interactions.unfavorite(user, message)
+        message.refresh_from_db()
+        assert message.favorites_count == 1
+
+    def test_detail_page_flags(self, user, message):
+        interactions.favorite(user, message)
+        client = Client()
+        client.login(username='testuser', password='testpassword')
+        response = client.get(reverse('message_board_messages:message_detail', args=[message.pk]))
+        assert response.context['interaction'].favorited == {message.pk}
+        assert '已收藏' in response.content.decode()
+        assert '收藏数: 1' in response.content.decode()
@@ -0,0 +1,107 @@
+import re
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from ..models import Message, Tag, Favorite
+
+pytestmark = pytest.mark.django_db
+
+
+def create_messages(count, tag, reader=None):
+    """创建 count 条消息，每条消息有不同的作者和两个标签"""
+    other_tag = Tag.objects.get_or_create(name='其他', slug='other')[0]
+    for i in range(count):
+        author = User.objects.create_user(username=f'author{Message.objects.count()}')
+        message = Message.objects.create(
+            title=f'消息{i}', slug=f'message-{author.pk}', author=author,
+            content='<p>内容</p>', status='published'
+        )
+        message.tags.add(tag, other_tag)
+        if reader is not None:
+            Favorite.objects.create(user=reader, message=message)
+
+
+def count_queries(client, url):
+    for cache in caches.all():  # 每次都从冷缓存开始，查询数可比较
+        cache.clear()
+    with CaptureQueriesContext(connection) as captured:
+        response = client.get(url)
+    assert response.status_code == 200
+    return len(captured)
+
+
+@pytest.fixture
+def tag():
+    """创建测试标签"""
+    return Tag.objects.create(name='测试标签', slug='test-tag')
+
+
+class TestListQueryCount:
+    """列表页的查询数不随每页消息数增长"""
+
+    def test_message_list(self, tag):
+        url = reverse('message_board_messages:message_list')
+        create_messages(2, tag)
+        small = count_queries(Client(), url)
+        create_messages(8, tag)
+        assert count_queries(Client(), url) == small
+
+    def test_tag_messages(self, tag, settings):
+        settings.CACHES = {**settings.CACHES, 'pages': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+        url = reverse('message_board_messages:tag_messages', args=[tag.slug])
+        create_messages(2, tag)
+        small = count_queries(Client(), url)
+        create_messages(8, tag)
+        assert count_queries(Client(), url) == small
+
+    def test_favorite_list(self, tag):
+        reader = User.objects.create_user(username='reader', password='testpassword')
+        client = Client()
+        client.login(username='reader', password='testpassword')
+        url = reverse('message_board_messages:favorite_list')
+        create_messages(2, tag, reader)
+        small = count_queries(client, url)
+        create_messages(8, tag, reader)
+        response = client.get(url)
+        assert len(response.context['messages_list']) == 10
+        assert count_queries(client, url) == small
+
+
+class TestListProjection:
+    """列表查询只取列表字段，不加载正文"""
+
+    CONTENT_COLUMN = re.compile(r'"message_board_messages_message"\."(content|content_html)"')
+
+    def loaded_content(self, client, url):
+        for cache in caches.all():
+            cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get(url)
+        assert response.status_code == 200
+        return [q['sql'] for q in captured.captured_queries if self.CONTENT_COLUMN.search(q['sql'])]
+
+    def test_lists_defer_content(self, tag):
+        reader = User.objects.create_user(username='reader', password='testpassword')
+        create_messages(3, tag, reader)
+        client = Client()
+        client.login(username='reader', password='testpassword')
+        for url in (
+            reverse('message_board_messages:message_list'),
+            reverse('message_board_messages:tag_messages', args=[tag.slug]),
+            reverse('message_board_messages:favorite_list'),
+            '/messages/api/messages/',
+        ):
+            assert self.loaded_content(client, url) == [], url
+
+    def test_api_list_is_compact_and_detail_is_full(self, tag):
+        create_messages(1, tag)
+        item = Client().get('/messages/api/messages/').json()['results'][0]
+        assert 'content' not in item
+        assert item['excerpt'] == '内容'
+        detail = Client().get(f'/messages/api/messages/{item["id"]}/').json()
+        assert detail['content'] == '<p>内容</p>'
@@ -0,0 +1,161 @@
+import pytest
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from ..models import Message, Notification
+from ..notifications import NotificationEvent, dispatch, flush_queue, get_unread_count, _queue
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def author():
+    """创建消息作者"""
+    return User.objects.create_user(username='author', password='testpassword')
+
+
+@pytest.fixture
+def message(author):
+    """创建测试消息"""
+    return Message.objects.create(
+        title='测试消息标题', slug='test-message', author=author,
+        content='测试消息内容', status='published'
+    )
+
+
+@pytest.fixture
+def fans():
+    """创建五个点赞用户"""
+    return [User.objects.create_user(username=f'fan{i}', password='testpassword') for i in range(5)]
+
+
+class TestNotificationDispatch:
+    """测试通知合并写入"""
+
+    def test_events_are_coalesced(self, author, message, fans):
+        """同一目标的多次点赞合并成一条通知"""
+        created = dispatch([NotificationEvent(author.pk, fan.pk, 'like', message.pk) for fan in fans])
+        assert created == 1
+        notification = Notification.objects.get()
+        assert notification.actor_count == 5
+        assert notification.actor == fans[-1]
+        assert notification.content == 'fan4 等 5 人点赞了您的消息 "测试消息标题"'
+
+    def test_unread_notification_keeps_merging(self, author, message, fans):
+        """未读的同类通知继续合并，已读后新建一条"""
+        dispatch([NotificationEvent(author.pk, fans[0].pk, 'like', message.pk)])
+        dispatch([NotificationEvent(author.pk, fans[1].pk, 'like', message.pk)])
+        assert Notification.objects.get().actor_count == 2
+
+        Notification.objects.update(is_read=True)
+        dispatch([NotificationEvent(author.pk, fans[2].pk, 'like', message.pk)])
+        assert Notification.objects.count() == 2
+
+    def test_repeat_actor_is_counted_once(self, author, message, fans):
+        """同一个人反复点赞只计一次，也不再更新通知；评论逐条计数"""
+        for _ in range(5):
+            dispatch([NotificationEvent(author.pk, fans[0].pk, 'like', message.pk)])
+        notification = Notification.objects.get()
+        assert notification.actor_count == 1
+        assert notification.content == 'fan0 点赞了您的消息 "测试消息标题"'
+
+        dispatch([NotificationEvent(author.pk, fans[1].pk, 'like', message.pk),
+                  NotificationEvent(author.pk, fans[0].pk, 'like', message.pk)])
+        notification.refresh_from_db()
+        assert notification.actor_count == 2
+        assert notification.actor_ids == [fans[0].pk, fans[1].pk]
+
+        for _ in range(2):
+            dispatch([NotificationEvent(author.pk, fans[0].pk, 'comment', message.pk)])
+        assert Notification.objects.get(verb='comment').actor_count == 2
+
+    def test_queue_is_flushed_in_one_batch(self, author, message, fans, django_assert_max_num_queries):
+        """队列中的事件批量写入，查询数与事件数无关"""
+        for fan in fans:
+            _queue.put(NotificationEvent(author.pk, fan.pk, 'favorite', message.pk))
+        _queue.put(NotificationEvent(author.pk, fans[0].pk, 'comment', message.pk))
+        with django_assert_max_num_queries(8):
+            assert flush_queue() == 6
+        assert Notification.objects.count() == 2
+
+    def test_like_view_notifies_author(self, author, message, fans):
+        client = Client()
+        client.login(username='fan0', password='testpassword')
+        client.post(reverse('message_board_messages:like_message', args=[message.pk]))
+        notification = Notification.objects.get()
+        assert notification.recipient == author
+        assert notification.content == 'fan0 点赞了您的消息 "测试消息标题"'
+
+    def test_own_actions_do_not_notify(self, author, message):
+        client = Client()
+        client.login(username='author', password='testpassword')
+        client.post(reverse('message_board_messages:like_message', args=[message.pk]))
+        assert not Notification.objects.exists()
+
+
+class TestNotificationList:
+    """测试通知列表的批量标记已读"""
+
+    def create_unread(self, author, message, actor, count):
+        Notification.objects.bulk_create([
+            Notification(recipient=author, actor=actor, verb='comment', target=message, content=f'通知{i}')
+            for i in range(count)
+        ])
+
+    def count_queries(self, client):
+        for cache in caches.all():  # 每次都从冷缓存开始，查询数可比较
+            cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get(reverse('message_board_messages:notification_list'))
+        assert response.status_code == 200
+        return len(captured)
+
+    def test_marks_only_the_page_with_constant_queries(self, author, message, fans):
+        client = Client()
+        client.login(username='author', password='testpassword')
+        self.create_unread(author, message, fans[0], 5)
+        small = self.count_queries(client)
+        assert not Notification.objects.filter(is_read=False).exists()
+
+        self.create_unread(author, message, fans[0], 30)
+        assert self.count_queries(client) == small
+        # 只有当前页的20条被标记为已读
+        assert Notification.objects.filter(is_read=False).count() == 10
+
+    def test_mark_all_scope(self, author, message, fans, settings):
+        settings.NOTIFICATION_MARK_READ_SCOPE = 'all'
+        client = Client()
+        client.login(username='author', password='testpassword')
+        self.create_unread(author, message, fans[0], 30)
+        client.get(reverse('message_board_messages:notification_list'))
+        assert not Notification.objects.filter(is_read=False).exists()
+
+
+class TestUnreadCounter:
+    """测试缓存的未读通知数"""
+
+    def test_counter_follows_changes_without_queries(self, author, message, fans, django_assert_num_queries):
+        assert get_unread_count(author) == 0
+        dispatch([NotificationEvent(author.pk, fans[0].pk, 'like', message.pk)])
+        dispatch([NotificationEvent(author.pk, fans[1].pk, 'comment', message.pk)])
+        with django_assert_num_queries(0):
+            assert get_unread_count(author) == 2
+
+        Notification.objects.filter(verb='like').get().mark_as_read()
+        with django_assert_num_queries(0):
+            assert get_unread_count(author) == 1
+
+    def test_pages_read_count_from_cache(self, author, message, fans, django_assert_num_queries):
+        client = Client()
+        client.login(username='author', password='testpassword')
+        dispatch([NotificationEvent(author.pk, fans[0].pk, 'like', message.pk)])
+        url = reverse('message_board_messages:unread_notification_count')
+        assert client.get(url).json() == {'unread_count': 1}
+
+        client.get(reverse('message_board_messages:mark_all_as_read'))
+        assert client.get(url).json() == {'unread_count': 0}
+        response = client.get(reverse('message_board_messages:message_list'))
+        assert response.context['unread_notification_count'] == 0
@@ -0,0 +1,117 @@
+import pytest
+from django.contrib.auth.models import User
+from django.test import Client
+from django.urls import reverse
+from comments.models import Comment
+from ..models import Message, Tag
+from .. import interactions
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def no_inline_view_flush(settings):
+    """浏览量写回会刷新详情页，测试中关闭请求内自动写回"""
+    settings.VIEW_COUNTER_FLUSH_INTERVAL = None
+
+
+@pytest.fixture
+def author():
+    """创建消息作者"""
+    return User.objects.create_user(username='author', password='testpassword')
+
+
+@pytest.fixture
+def tag():
+    """创建测试标签"""
+    return Tag.objects.create(name='测试标签', slug='test-tag')
+
+
+@pytest.fixture
+def message(author, tag):
+    """创建带标签的测试消息"""
+    message = Message.objects.create(
+        title='测试消息标题', slug='test-message', author=author,
+        content='测试消息内容', status='published'
+    )
+    message.tags.add(tag)
+    return message
+
+
+def urls(message, tag):
+    return {
+        'list': reverse('message_board_messages:message_list'),
+        'tag': reverse('message_board_messages:tag_messages', args=[tag.slug]),
+        'detail': reverse('message_board_messages:message_detail', args=[message.pk]),
+    }
+
+
+def is_cached(url, django_assert_num_queries):
+    """匿名访问不查询数据库即说明命中了缓存"""
+    try:
+        with django_assert_num_queries(0):
+            Client().get(url)
+    except pytest.fail.Exception:
+        return False
+    return True
+
+
+class TestPageCache:
+    """测试按代数失效的页面缓存"""
+
+    def test_anonymous_pages_are_cached(self, message, tag, django_assert_num_queries):
+        for url in urls(message, tag).values():
+            first = Client().get(url)
+            assert first.status_code == 200
+            with django_assert_num_queries(0):
+                assert Client().get(url).content == first.content
+
+    def test_logged_in_users_bypass_cache(self, message, tag, author):
+        client = Client()
+        client.login(username='author', password='testpassword')
+        url = urls(message, tag)['detail']
+        Client().get(url)
+        # 登录用户看到带有个人状态的页面（例如删除按钮）
+        assert '确认删除' in client.get(url).content.decode()
+        assert '确认删除' not in Client().get(url).content.decode()
+
+    def test_new_message_invalidates_list_and_tag(self, message, tag, author, django_capture_on_commit_callbacks):
+        pages = urls(message, tag)
+        Client().get(pages['list'])
+        Client().get(pages['tag'])
+        with django_capture_on_commit_callbacks(execute=True):
+            new = Message.objects.create(
+                title='新发布的消息', slug='new-message', author=author, content='内容', status='published'
+            )
+            new.tags.add(tag)
+        assert '新发布的消息' in Client().get(pages['list']).content.decode()
+        assert '新发布的消息' in Client().get(pages['tag']).content.decode()
+
+    def test_like_invalidates_message_pages(self, message, tag, author, django_capture_on_commit_callbacks,
+                                            django_assert_num_queries):
+        pages = urls(message, tag)
+        for url in pages.values():
+            Client().get(url)
+        with django_capture_on_commit_callbacks(execute=True):
+            interactions.like(author, message)
+        for url in pages.values():
+            assert not is_cached(url, django_assert_num_queries)
+
+    def test_comment_only_invalidates_detail(self, message, tag, author, django_capture_on_commit_callbacks,
+                                             django_assert_num_queries):
+        pages = urls(message, tag)
+        for url in pages.values():
+            Client().get(url)
+        with django_capture_on_commit_callbacks(execute=True):
+            Comment.objects.create(message=message, author=author, content='新的评论')
+        assert '新的评论' in Client().get(pages['detail']).content.decode()
+        assert is_cached(pages['list'], django_assert_num_queries)
+        assert is_cached(pages['tag'], django_assert_num_queries)
+
+    def test_tag_rename_invalidates_old_and_new_slug(self, message, tag, django_capture_on_commit_callbacks):
+        old_url = urls(message, tag)['tag']
+        Client().get(old_url)
+        with django_capture_on_commit_callbacks(execute=True):
+            tag.slug = 'renamed'
+            tag.save()
+        assert Client().get(old_url).status_code == 404
@@ -0,0 +1,114 @@
+import pytest
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+from ..models import Message
+from ..pagination import KeysetPaginator
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def user():
+    """创建测试用户"""
+    return User.objects.create_user(username='testuser', password='testpassword')
+
+
+@pytest.fixture
+def messages_25(user):
+    """创建25条创建时间相同的消息，用于检验 id 作为第二排序键"""
+    now = timezone.now()
+    Message.objects.bulk_create([
+        Message(
+            title=f'消息{i}', slug=f'message-{i}', author=user, content='内容',
+            status='published', published_at=now - timedelta(minutes=i // 2)
+        )
+        for i in range(25)
+    ])
+    # 所有消息使用同一个创建时间，只能依靠 id 区分顺序
+    Message.objects.update(created_at=now)
+    return list(Message.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+
+class TestKeysetPaginator:
+    """测试游标分页"""
+
+    def test_walks_forward_and_backward(self, messages_25):
+        """向后翻页覆盖全部消息，向前翻页回到上一页"""
+        paginator = KeysetPaginator(Message.objects.all(), ('-created_at', '-id'), per_page=10)
+        pages = [paginator.get_page()]
+        while pages[-1].has_next():
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+
+        assert [len(page) for page in pages] == [10, 10, 5]
+        assert [m.id for page in pages for m in page] == messages_25
+        assert not pages[0].has_previous()
+
+        previous = paginator.get_page(pages[2].previous_cursor)
+        assert [m.id for m in previous] == [m.id for m in pages[1]]
+
+    def test_invalid_cursor_returns_first_page(self, messages_25):
+        """无效游标回到第一页"""
+        paginator = KeysetPaginator(Message.objects.all(), ('-created_at', '-id'), per_page=10)
+        assert [m.id for m in paginator.get_page('not-a-cursor')] == messages_25[:10]
+
+    def test_deep_page_has_no_offset(self, messages_25, django_assert_num_queries):
+        """深翻页只执行一条不带 OFFSET 的查询"""
+        paginator = KeysetPaginator(Message.objects.all(), ('-published_at', '-id'), per_page=10)
+        cursor = paginator.get_page().next_cursor
+        with django_assert_num_queries(1) as captured:
+            paginator.get_page(cursor)
+        assert 'OFFSET' not in captured.captured_queries[0]['sql'].upper()
+
+
+class TestCursorViews:
+    """测试列表页和API的游标分页"""
+
+    def test_message_list_cursor_mode(self, messages_25):
+        """列表页默认使用游标分页，链接中带游标"""
+        url = reverse('message_board_messages:message_list')
+        response = Client().get(url)
+        page = response.context['messages_list']
+        assert page.is_cursor
+        assert page.has_next()
+        assert f'?cursor={page.next_cursor}' in response.content.decode()
+        assert '?page=' not in response.content.decode()
+        response = Client().get(url, {'cursor': page.next_cursor})
+        assert len(response.context['messages_list']) == 10
+
+    def test_message_list_old_page_links(self, messages_25):
+        """带 page 参数的旧链接仍按页码分页"""
+        url = reverse('message_board_messages:message_list')
+        page = Client().get(url, {'page': 3}).context['messages_list']
+        assert not getattr(page, 'is_cursor', False)
+        assert len(page) == 5
+
+    def test_api_cursor_pagination(self, messages_25):
+        """带 cursor 参数时API使用游标分页，with_count 时返回近似总数"""
+        cache.clear()
+        client = Client()
+        data = client.get('/messages/api/messages/', {'cursor': '', 'with_count': '1'}).json()
+        assert data['count'] == 25
+        assert len(data['results']) == 10
+        seen = [item['id'] for item in data['results']]
+        while data['next']:
+            data = client.get(data['next']).json()
+            seen.extend(item['id'] for item in data['results'])
+        assert seen == messages_25
+        assert 'cursor=' in client.get('/messages/api/messages/', {'cursor': ''}).json()['next']
+
+    def test_api_defaults_to_page_numbers(self, messages_25):
+        """不带 cursor 参数时保持原来的页码分页格式"""
+        data = Client().get('/messages/api/messages/').json()
+        assert data['count'] == 25
+        assert data['next'].endswith('?page=2')
+        assert data['previous'] is None
+
+    def test_api_page_numbers_still_supported(self, messages_25):
+        """带 page 参数的客户端使用页码分页"""
+        data = Client().get('/messages/api/messages/', {'page': 3}).json()
+        assert data['count'] == 25
+        assert len(data['results']) == 5
@@ -0,0 +1,79 @@
+from datetime import timedelta
+
+import pytest
+from django.contrib.auth.models import User
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+from ..models import Favorite, Message
+from ..ranking import hot_score, update_hot_scores
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def author():
+    return User.objects.create_user(username='author', password='testpassword')
+
+
+def create_message(author, title, hours_ago=1, **counters):
+    message = Message.objects.create(
+        title=title, slug=title, author=author, content='内容', status='published',
+        published_at=timezone.now() - timedelta(hours=hours_ago),
+    )
+    if counters:
+        Message.objects.filter(pk=message.pk).update(**counters)
+    return message
+
+
+class TestHotScore:
+    """测试热度分数的计算"""
+
+    def test_decays_with_age(self):
+        now = timezone.now()
+        fresh = hot_score(100, 10, 1, 1, now - timedelta(hours=1), now)
+        old = hot_score(100, 10, 1, 1, now - timedelta(days=3), now)
+        assert fresh > old > 0
+
+    def test_update_hot_scores(self, author):
+        quiet = create_message(author, 'quiet')
+        popular = create_message(author, 'popular', likes=20, comments_count=5)
+        stale = create_message(author, 'stale', hours_ago=24 * 60, likes=1000)
+        Message.objects.filter(pk=stale.pk).update(hot_score=99)
+        Favorite.objects.create(user=author, message=quiet)
+
+        assert update_hot_scores() == 2
+        scores = dict(Message.objects.values_list('pk', 'hot_score'))
+        assert scores[popular.pk] > scores[quiet.pk] > 0
+        # 超出时间窗口的消息分数归零
+        assert scores[stale.pk] == 0
+
+
+class TestHotFeed:
+    """测试列表和 API 的 ?sort=hot"""
+
+    @pytest.fixture
+    def messages(self, author):
+        result = [create_message(author, f'message-{i}', hours_ago=i + 1, likes=(2 - i) * 10) for i in range(3)]
+        update_hot_scores()
+        return result
+
+    def expected(self):
+        # 较早发布但点赞更多的消息排在前面
+        ids = list(Message.objects.order_by('-hot_score', '-id').values_list('pk', flat=True))
+        assert ids == sorted(ids)
+        return ids
+
+    def test_message_list(self, messages):
+        response = Client().get(reverse('message_board_messages:message_list'), {'sort': 'hot'})
+        assert [message.pk for message in response.context['messages_list']] == self.expected()
+        assert response.context['sort'] == 'hot'
+
+    def test_api_cursor_pages(self, messages, monkeypatch):
+        from ..pagination import MessageKeysetPagination
+        monkeypatch.setattr(MessageKeysetPagination, 'page_size', 2)
+        client = Client()
+        first = client.get('/messages/api/messages/', {'sort': 'hot', 'cursor': ''}).json()
+        second = client.get(first['next']).json()
+        ids = [item['id'] for item in first['results'] + second['results']]
+        assert ids == self.expected()
@@ -0,0 +1,139 @@
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from .. import related
+from ..models import Message, Tag
+from ..page_cache import get_generations
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def tags():
+    """创建三个标签"""
+    return [Tag.objects.create(name=f'标签{i}', slug=f'tag-{i}') for i in range(3)]
+
+
+@pytest.fixture
+def create(django_capture_on_commit_callbacks):
+    """创建消息并执行提交后的相关消息刷新"""
+    author = User.objects.create_user(username='author', password='testpassword')
+
+    def create(title, tags, days_ago=0, status='published'):
+        with django_capture_on_commit_callbacks(execute=True):
+            message = Message.objects.create(
+                title=title, slug=f'message-{Message.objects.count()}', author=author, content='内容',
+                status=status, published_at=timezone.now() - timedelta(days=days_ago)
+            )
+            message.tags.add(*tags)
+        message.refresh_from_db()
+        return message
+    return create
+
+
+class TestRelatedMessages:
+    """测试预先计算的相关消息"""
+
+    def test_ranked_by_overlap_then_recency(self, create, tags):
+        old_two_tags = create('旧的两个共同标签', tags[:2], days_ago=10)
+        new_one_tag = create('新的一个共同标签', tags[:1], days_ago=1)
+        create('草稿', tags[:2], status='draft')
+        create('无关', tags[2:])
+        message = create('当前消息', tags[:2])
+        assert message.related_ids == [old_two_tags.pk, new_one_tag.pk]
+
+    def test_new_message_updates_neighbours(self, create, tags):
+        first = create('第一条', tags[:1])
+        assert first.related_ids == []
+        second = create('第二条', tags[:1])
+        first.refresh_from_db()
+        assert first.related_ids == [second.pk]
+
+    def test_untagging_removes_from_neighbours(self, create, tags, django_capture_on_commit_callbacks):
+        first = create('第一条', tags[:1])
+        second = create('第二条', tags[:1])
+        with django_capture_on_commit_callbacks(execute=True):
+            second.tags.clear()
+        first.refresh_from_db()
+        assert first.related_ids == []
+
+    def test_editing_does_not_overwrite_related_ids(self, create, tags):
+        first = create('第一条', tags[:1])
+        stale = Message.objects.get(pk=first.pk)
+        create('第二条', tags[:1])
+        stale.title = '修改标题'
+        stale.save()
+        first.refresh_from_db()
+        assert first.related_ids != []
+
+    def test_detail_uses_one_lookup(self, create, tags):
+        related = create('相关消息', tags[:1])
+        message = create('当前消息', tags[:1])
+        with CaptureQueriesContext(connection) as captured:
+            response = Client().get(reverse('message_board_messages:message_detail', args=[message.pk]))
+        assert list(response.context['related_messages']) == [related]
+        # 不再按标签关联表做 DISTINCT 连接查询
+        assert not [q for q in captured.captured_queries if 'DISTINCT' in q['sql']]
+
+    def test_rebuild_command(self, create, tags):
+        first = create('第一条', tags[:1])
+        second = create('第二条', tags[:1])
+        Message.objects.update(related_ids=[])
+        call_command('rebuild_related_messages', stdout=StringIO())
+        first.refresh_from_db()
+        assert first.related_ids == [second.pk]
+
+    def test_only_changed_pages_are_invalidated(self, create, tags, django_capture_on_commit_callbacks):
+        first = create('第一条', tags[:1])
+        other = create('无关', tags[2:])
+        scopes = [f'message:{first.pk}', f'message:{other.pk}', 'related']
+        before = get_generations(scopes)
+        second = create('第二条', tags[:1])
+        after = get_generations(scopes)
+        assert after[0] > before[0]
+        assert after[1:] == before[1:]
+
+        # 标题显示在第一条的相关消息中
+        before = get_generations(scopes)
+        with django_capture_on_commit_callbacks(execute=True):
+            second.title = '新标题'
+            second.save()
+        after = get_generations(scopes)
+        assert after[0] > before[0]
+        assert after[1:] == before[1:]
+
+    def test_referrers_filtered_in_database(self, create, tags, settings):
+        settings.RELATED_MESSAGES_COUNT = 2
+        messages = [create(f'第{i}条', tags[:1], days_ago=5 - i) for i in range(4)]
+        create('无关', tags[2:])
+        related_ids = dict(Message.objects.values_list('pk', 'related_ids'))
+        for message in messages:
+            with CaptureQueriesContext(connection) as captured:
+                found = related.referrers(message.pk, [tags[0].pk])
+            assert sorted(found) == sorted(pk for pk, ids in related_ids.items() if message.pk in ids)
+            # 一条查询，只取主键
+            assert len(captured.captured_queries) == 1
+            assert 'related_ids' not in captured.captured_queries[0]['sql'].split('FROM')[0]
+        # 最早的一条不在任何消息的前两条相关消息中
+        assert related.referrers(messages[0].pk, [tags[0].pk]) == []
+
+    def test_neighbours_refresh_in_background(self, create, tags, settings, monkeypatch):
+        settings.RELATED_REFRESH_MODE = 'thread'
+        monkeypatch.setattr(related, '_ensure_worker', lambda: None)
+        first = create('第一条', tags[:1])
+        second = create('第二条', tags[:1])
+        # 自身的相关消息在提交后立即刷新，邻居留给后台线程
+        assert second.related_ids == [first.pk]
+        first.refresh_from_db()
+        assert first.related_ids == []
+        assert related.flush_queue() == 2
+        first.refresh_from_db()
+        assert first.related_ids == [second.pk]
@@ -0,0 +1,52 @@
+import pytest
+from django.contrib.auth.models import User
+from django.template.defaultfilters import truncatechars
+from ..models import Message
+from ..rendering import excerpt, render_content, word_count
+
+pytestmark = pytest.mark.django_db
+
+
+class TestRenderContent:
+    """测试正文清洗和纯文本提取"""
+
+    def test_removes_scripts_and_unsafe_attributes(self):
+        html, text = render_content(
+            '<p onclick="x()">你好<script>alert(1)</script></p>'
+            '<a href="javascript:alert(1)">链接</a><img src="/a.png" onerror="x()">'
+        )
+        assert html == '<p>你好</p><a rel="noopener nofollow">链接</a><img src="/a.png">'
+        assert text == '你好 链接'
+
+    def test_keeps_editor_markup(self):
+        html, _ = render_content(
+            '<figure class="image" style="width:50%;position:fixed"><img src="/a.png" alt="图"></figure>'
+            '<p>a &lt; b<br>c'
+        )
+        assert html == (
+            '<figure class="image" style="width:50%"><img src="/a.png" alt="图"></figure>'
+            '<p>a &lt; b<br>c</p>'
+        )
+
+    def test_excerpt_and_word_count(self):
+        _, text = render_content('<p>Django 缓存教程</p><p>第二段</p>')
+        assert text == 'Django 缓存教程 第二段'
+        assert word_count(text) == 8
+        # 与原来模板中的 truncatechars:100 结果一致
+        assert excerpt('长' * 150) == truncatechars('长' * 150, 100)
+
+
+class TestRenderedFields:
+    """测试保存时生成的派生字段"""
+
+    def test_fields_follow_content(self):
+        author = User.objects.create_user(username='author')
+        message = Message.objects.create(
+            title='标题', slug='title', author=author, content='<p>第一版<script>x</script></p>'
+        )
+        assert (message.content_html, message.excerpt, message.word_count) == ('<p>第一版</p>', '第一版', 3)
+
+        message.content = '<p>第二版内容</p>'
+        message.save(update_fields=['content'])
+        message.refresh_from_db()
+        assert (message.excerpt, message.word_count) == ('第二版内容', 5)
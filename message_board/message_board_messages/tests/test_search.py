@@ -0,0 +1,143 @@
+from io import StringIO
+
+import pytest
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from ..models import Message, SearchPosting, Tag
+from ..search import search_message_ids
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def author():
+    """创建消息作者"""
+    return User.objects.create_user(username='author', password='testpassword')
+
+
+@pytest.fixture
+def create(author, django_capture_on_commit_callbacks):
+    """创建消息并执行提交后的索引更新"""
+    def create(title, content, status='published', tags=()):
+        with django_capture_on_commit_callbacks(execute=True):
+            message = Message.objects.create(
+                title=title, slug=f'message-{Message.objects.count()}', author=author,
+                content=content, status=status
+            )
+            message.tags.add(*tags)
+        return message
+    return create
+
+
+class TestSearchIndex:
+    """测试全文索引的同步和排序"""
+
+    def test_title_matches_rank_first(self, create):
+        body = create('Weekly notes', '<p>Python <strong>tips</strong> inside</p>')
+        title = create('Python tips', '<p>Nothing else</p>')
+        assert search_message_ids('python tips') == [title.pk, body.pk]
+        assert search_message_ids('strong') == []  # HTML 标签不进入索引
+
+    def test_edit_and_delete_update_index(self, create, django_capture_on_commit_callbacks):
+        message = create('Old title', 'content')
+        with django_capture_on_commit_callbacks(execute=True):
+            message.title = 'New title'
+            message.save()
+        assert search_message_ids('old') == []
+        assert search_message_ids('new') == [message.pk]
+        with django_capture_on_commit_callbacks(execute=True):
+            message.delete()
+        assert search_message_ids('new') == []
+
+    def test_tag_names_are_indexed(self, create, django_capture_on_commit_callbacks):
+        tag = Tag.objects.create(name='django', slug='django')
+        message = create('Release', 'content', tags=[tag])
+        assert search_message_ids('django') == [message.pk]
+        with django_capture_on_commit_callbacks(execute=True):
+            tag.name = 'framework'
+            tag.save()
+        assert search_message_ids('framework') == [message.pk]
+
+    def test_rebuild_command(self, create):
+        message = create('Indexed', 'content')
+        call_command('rebuild_search_index', stdout=StringIO())
+        assert search_message_ids('indexed') == [message.pk]
+
+
+class TestSearchViews:
+    """测试列表页和API的搜索"""
+
+    def test_message_list_search(self, create):
+        create('Python tips', 'content')
+        create('Python draft', 'content', status='draft')
+        create('Other', 'content')
+        response = Client().get(reverse('message_board_messages:message_list'), {'search': 'python'})
+        page = response.context['messages_list']
+        assert [message.title for message in page.object_list] == ['Python tips']
+        assert page.paginator.count == 1
+
+    def test_api_search_is_paginated_by_rank(self, create):
+        for i in range(12):
+            create(f'Python {i}', 'content')
+        response = Client().get('/messages/api/messages/', {'search': 'python'})
+        data = response.json()
+        assert data['count'] == 12
+        assert len(data['results']) == 10
+        assert 'page=2' in data['next']
+
+
+class TestChineseSearch:
+    """测试中文二元组倒排表"""
+
+    def test_tokenize_bigrams(self):
+        from ..tokenizer import characters, tokenize, query_terms
+        assert tokenize('消息列表 Django５') == ['消息', '息列', '列表', 'django5']
+        assert characters('消息 列') == ['消', '息', '列']
+        assert query_terms('消息 消息') == (['消息'], [])
+
+    def test_any_substring_is_found(self, create):
+        message = create('留言板的消息列表', '<p>支持分页和搜索</p>')
+        create('无关的内容', '<p>其他</p>')
+        assert search_message_ids('消息列表') == [message.pk]
+        assert search_message_ids('分页') == [message.pk]
+        assert search_message_ids('列消') == []
+
+    def test_single_character(self, create):
+        message = create('消息列表', '<p>正文</p>')
+        other = create('列', '<p>内容</p>')
+        create('无关', '<p>其他</p>')
+        assert set(search_message_ids('列')) == {message.pk, other.pk}
+        assert search_message_ids('列 正文') == [message.pk]
+        assert search_message_ids('表 消息') == [message.pk]
+        assert search_message_ids('缺') == []
+        # 单字按索引等值查找，不做 LIKE 扫描
+        with CaptureQueriesContext(connection) as captured:
+            search_message_ids('列')
+        assert not [query for query in captured.captured_queries if 'LIKE' in query['sql'].upper()]
+
+        response = Client().get(reverse('message_board_messages:message_list'), {'search': '列'})
+        assert response.context['messages_list'].paginator.count == 2
+        assert Client().get('/messages/api/messages/', {'search': '列'}).json()['count'] == 2
+
+    def test_title_matches_rank_first_and_mixed_query(self, create):
+        tag = Tag.objects.create(name='教程', slug='tutorial')
+        body = create('笔记', '<p>Django 缓存教程</p>')
+        title = create('Django 缓存教程', '<p>正文</p>', tags=[tag])
+        assert search_message_ids('缓存教程') == [title.pk, body.pk]
+        assert search_message_ids('django 缓存') == [title.pk, body.pk]
+        assert search_message_ids('flask 缓存') == []
+
+    def test_postings_follow_edits(self, create, django_capture_on_commit_callbacks):
+        message = create('原来的标题', '内容')
+        with django_capture_on_commit_callbacks(execute=True):
+            message.title = '修改后的标题'
+            message.save()
+        assert search_message_ids('原来') == []
+        assert search_message_ids('修改') == [message.pk]
+        pk = message.pk
+        message.delete()
+        assert not SearchPosting.objects.filter(message_id=pk).exists()
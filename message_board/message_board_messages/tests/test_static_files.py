@@ -0,0 +1,38 @@
+import re
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def collected(settings, tmp_path):
+    settings.STATIC_ROOT = str(tmp_path)
+    # 只收集项目自己的静态文件，admin、CKEditor 等应用的文件压缩较慢
+    settings.STATICFILES_FINDERS = ['django.contrib.staticfiles.finders.FileSystemFinder']
+    call_command('collectstatic', interactive=False, verbosity=0)
+    return tmp_path
+
+
+class TestStaticPipeline:
+    """测试带哈希、预压缩的静态文件"""
+
+    def test_without_manifest_uses_plain_names(self, client):
+        response = client.get(reverse('home'))
+        assert '/static/css/site.css' in response.content.decode()
+        assert '<style>' not in response.content.decode()
+
+    def test_hashed_and_precompressed(self, collected, client):
+        html = client.get(reverse('home')).content.decode()
+        url = re.search(r'/static/css/site\.[0-9a-f]{12}\.css', html).group()
+        name = url[len('/static/'):]
+        assert (collected / f'{name}.gz').exists()
+        assert (collected / f'{name}.br').exists()
+
+        response = client.get(url, HTTP_ACCEPT_ENCODING='gzip, br')
+        assert response.status_code == 200
+        assert response['Content-Encoding'] == 'br'
+        assert 'immutable' in response['Cache-Control']
+        assert response['Vary'] == 'Accept-Encoding'
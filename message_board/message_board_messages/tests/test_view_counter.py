@@ -0,0 +1,135 @@
+import pytest
+from django.core.cache import cache
+from django.test import Client, RequestFactory
+from django.contrib.auth.models import AnonymousUser, User
+from django.urls import reverse
+from ..models import Message
+from .. import counters
+from ..counters import record_view, get_pending_views, flush_view_counts, apply_counter_deltas
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture(autouse=True)
+def clear_cache(settings):
+    """每个测试使用干净的缓存，并关闭请求内自动写回"""
+    settings.VIEW_COUNTER_FLUSH_INTERVAL = None
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def user():
+    """创建测试用户"""
+    return User.objects.create_user(username='testuser', password='testpassword')
+
+
+@pytest.fixture
+def message(user):
+    """创建测试消息"""
+    return Message.objects.create(
+        title='测试消息标题',
+        slug='test-message',
+        author=user,
+        content='测试消息内容',
+        status='published'
+    )
+
+
+def make_request(ip):
+    request = RequestFactory().get('/', REMOTE_ADDR=ip)
+    request.user = AnonymousUser()
+    return request
+
+
+class TestViewCounter:
+    """测试浏览量缓冲计数"""
+
+    def test_views_are_buffered_until_flush(self, message):
+        """浏览量先记在缓存中，写回前数据库不变"""
+        for i in range(5):
+            assert record_view(make_request(f'10.0.0.{i}'), message.pk)
+        message.refresh_from_db()
+        assert message.views == 0
+        assert get_pending_views(message.pk) == 5
+
+        assert flush_view_counts() == 5
+        message.refresh_from_db()
+        assert message.views == 5
+        assert get_pending_views(message.pk) == 0
+
+    def test_repeat_visits_are_deduplicated(self, message):
+        """同一访客在去重窗口内只计一次"""
+        assert record_view(make_request('10.0.0.1'), message.pk)
+        assert not record_view(make_request('10.0.0.1'), message.pk)
+        assert get_pending_views(message.pk) == 1
+
+    def test_flush_is_one_update(self, user, message, django_assert_num_queries):
+        """多条消息的增量只用一条UPDATE写回"""
+        other = Message.objects.create(
+            title='另一条消息', slug='other', author=user, content='内容', status='published'
+        )
+        for i in range(3):
+            record_view(make_request(f'10.0.0.{i}'), message.pk)
+        record_view(make_request('10.0.0.1'), other.pk)
+        with django_assert_num_queries(1):
+            flush_view_counts()
+        assert list(Message.objects.order_by('pk').values_list('views', flat=True)) == [3, 1]
+
+    def test_failed_flush_requeues(self, message, monkeypatch):
+        """写回失败时消息重新入队，下一次写回补上"""
+        record_view(make_request('10.0.0.1'), message.pk)
+
+        def fail(field, deltas):
+            raise RuntimeError('数据库不可用')
+        monkeypatch.setattr(counters, 'apply_counter_deltas', fail)
+        with pytest.raises(RuntimeError):
+            flush_view_counts()
+        monkeypatch.undo()
+        assert flush_view_counts() == 1
+        message.refresh_from_db()
+        assert message.views == 1
+
+    def test_views_during_flush_are_kept(self, message, monkeypatch):
+        """写回期间新增的浏览留到下一次写回"""
+        record_view(make_request('10.0.0.1'), message.pk)
+
+        def apply_and_view(field, deltas):
+            record_view(make_request('10.0.0.2'), message.pk)
+            return apply_counter_deltas(field, deltas)
+        monkeypatch.setattr(counters, 'apply_counter_deltas', apply_and_view)
+        assert flush_view_counts() == 1
+        monkeypatch.undo()
+        assert flush_view_counts() == 1
+        message.refresh_from_db()
+        assert message.views == 2
+
+    def test_slot_claimed_before_write(self, message):
+        """写入方分配了槽位但尚未写入时被写回方占用，写入方换一个槽位"""
+        cache = counters._view_cache()
+        # 模拟另一个 worker 刚分配槽位
+        pending_slot = counters._incr(cache, counters.VIEW_DIRTY_SEQ_KEY)
+        record_view(make_request('10.0.0.1'), message.pk)
+        assert flush_view_counts() == 1
+        # 该 worker 此时才写入槽位：add 失败，不会写入已经处理过的位置
+        assert not cache.add(counters.VIEW_DIRTY_SLOT_KEY.format(pending_slot), message.pk)
+
+    def test_apply_counter_deltas_floor_at_zero(self, message):
+        """计数不会被减成负数"""
+        apply_counter_deltas('comments_count', {message.pk: -3})
+        message.refresh_from_db()
+        assert message.comments_count == 0
+
+    def test_detail_view_shows_pending_views(self, message):
+        """详情页显示已存储的浏览量加上未写回的增量，命中页面缓存的访问同样计数"""
+        url = reverse('message_board_messages:message_detail', args=[message.pk])
+        assert Client(REMOTE_ADDR='10.0.0.1').get(url).status_code == 200
+        assert Client(REMOTE_ADDR='10.0.0.2').get(url).status_code == 200
+        assert get_pending_views(message.pk) == 2
+
+        client = Client()
+        client.login(username='testuser', password='testpassword')
+        assert client.get(url).context['views_count'] == 2
+        message.refresh_from_db()
+        assert message.views == 0
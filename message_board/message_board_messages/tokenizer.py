@@ -0,0 +1,83 @@
+"""
+中文分词
+
+FTS5 的 unicode61 分词器和 PostgreSQL 的 simple 配置只按空白和标点切分，
+一整句中文会成为一个词，无法搜索其中的词语。这里把连续的汉字切成二元组（bigram），
+例如“消息列表”切成“消息”“息列”“列表”，查询时要求查询词的每个二元组都出现，
+任何长度不少于两个字的子串都能被找到。每个汉字另外作为单字写入索引（characters），
+只搜一个字时按单字等值查找。字母和数字仍按单词切分并转为小写。
+
+安装 jieba 且 SEARCH_SEGMENTER = 'jieba' 时，索引额外写入词典分词得到的长词，
+查询中出现同样的词时相关度更高；是否匹配仍由二元组决定，不依赖分词结果。
+"""
+import re
+import unicodedata
+
+from django.conf import settings
+
+try:
+    import jieba
+except ImportError:  # 可选依赖
+    jieba = None
+
+CJK_RANGES = '\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'
+TOKEN_RE = re.compile(rf'[{CJK_RANGES}]+|[^\W_{CJK_RANGES}]+')
+CJK_RE = re.compile(rf'[{CJK_RANGES}]')
+
+MAX_TERM_LENGTH = 32
+
+
+def contains_cjk(text):
+    return bool(CJK_RE.search(text or ''))
+
+
+def normalize(text):
+    """全角转半角并转为小写"""
+    return unicodedata.normalize('NFKC', text or '').lower()
+
+
+def bigrams(run):
+    """连续汉字切成二元组，单个汉字原样返回"""
+    if len(run) == 1:
+        return [run]
+    return [run[i:i + 2] for i in range(len(run) - 1)]
+
+
+def characters(text):
+    """文本中的全部汉字（可重复），用于单字索引"""
+    return CJK_RE.findall(normalize(text))
+
+
+def _segmenter():
+    if jieba is not None and getattr(settings, 'SEARCH_SEGMENTER', 'bigram') == 'jieba':
+        return jieba
+    return None
+
+
+def tokenize(text):
+    """切分文本，返回词列表（可重复，用于统计词频）"""
+    segmenter = _segmenter()
+    terms = []
+    for match in TOKEN_RE.finditer(normalize(text)):
+        token = match.group()
+        if not CJK_RE.match(token):
+            terms.append(token[:MAX_TERM_LENGTH])
+            continue
+        terms.extend(bigrams(token))
+        if segmenter is not None:
+            terms.extend(word for word in segmenter.cut_for_search(token) if len(word) > 2)
+    return terms
+
+
+def query_terms(query):
+    """
+    切分查询，返回 (必须匹配的词, 只影响排序的词)
+
+    必须匹配的词与索引时的二元组切分一致；词典分词得到的长词只用于加权。
+    """
+    required, optional = [], []
+    for term in tokenize(query):
+        target = optional if CJK_RE.match(term) and len(term) > 2 else required
+        if term not in target:
+            target.append(term)
+    return required, optional
@@ -31,6 +31,7 @@ urlpatterns = [
     path('notifications/mark-all-as-read/', views.mark_all_as_read, name='mark_all_as_read'),
     path('notifications/<int:notification_id>/delete/', views.delete_notification, name='delete_notification'),
     path('notifications/delete-all/', views.delete_all_notifications, name='delete_all_notifications'),
+    path('notifications/unread-count/', views.unread_notification_count, name='unread_notification_count'),
     # API路由
     path('api/', include(router.urls)),
 ]
\ No newline at end of file
@@ -20,6 +20,7 @@ from .notification_views import (
     mark_all_as_read,
     delete_notification,
     delete_all_notifications,
+    unread_notification_count,
     get_unread_notification_count
 )
 
@@ -39,5 +40,6 @@ __all__ = [
     'mark_all_as_read',
     'delete_notification',
     'delete_all_notifications',
+    'unread_notification_count',
     'get_unread_notification_count'
 ]
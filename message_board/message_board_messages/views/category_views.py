@@ -1,19 +1,24 @@
 from django.shortcuts import render, get_object_or_404
-from django.core.paginator import Paginator
-from django.views.decorators.cache import cache_page
+from accounts.avatars import request_avatar_urls
+from ..interactions import interaction_state
 from ..models import Message, Tag
+from ..conditional import conditional_page
+from ..page_cache import cached_page
+from ..pagination import paginate_messages
 
 
-@cache_page(60 * 15)  # 缓存15分钟
+@conditional_page('tag:{slug}')
+@cached_page('tag:{slug}')  # 标签或其中的消息变化时失效
 def tag_messages(request, slug):
     """按标签查看消息"""
     tag = get_object_or_404(Tag, slug=slug)
-    # 使用select_related优化查询
-    messages_list = Message.objects.filter(tags=tag, status='published').select_related('author').order_by('-published_at')
-    paginator = Paginator(messages_list, 10)
-    page = request.GET.get('page')
-    messages = paginator.get_page(page)  # 自动处理无效页码
+    # 只取列表字段（不含正文），关联作者并预取标签
+    messages_list = Message.objects.published().filter(tags=tag).for_list()
+    # 与消息列表一样按 created_at 排序：游标分页会排除 published_at 为空的消息（例如后台直接创建的）
+    messages = paginate_messages(request, messages_list, ('-created_at', '-id'))
+    request_avatar_urls(request, [message.author_id for message in messages])
     return render(request, 'messages/message_list.html', {
-        'messages': messages,
-        'tag': tag
+        'messages_list': messages,
+        'tag': tag,
+        'interaction': interaction_state(request.user, [message.pk for message in messages]),
     })
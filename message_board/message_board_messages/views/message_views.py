@@ -1,54 +1,77 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.utils import timezone
 from django.core.paginator import Paginator
-from django.views.decorators.cache import cache_page
+from django.utils import timezone
+from accounts.avatars import request_avatar_urls
 from ..models import Message, Tag
 from ..forms import MessageForm
+from ..interactions import interaction_state
+from ..counters import record_view, get_pending_views
+from ..conditional import conditional_page
+from ..page_cache import cached_page
+from ..pagination import paginate_messages
+from ..related import related_messages
+from ..search import SearchResults
 
+# ?sort= 可选的排序，最后一个字段唯一，用于游标分页
+SORT_ORDERINGS = {
+    'latest': ('-created_at', '-id'),
+    'hot': ('-hot_score', '-id'),
+}
 
+
+@conditional_page('list')
+@cached_page('list')
 def message_list(request):
     """消息列表视图"""
-    # 获取所有已发布的消息，使用select_related优化查询
-    # 先按created_at降序排序，确保所有消息都能正确显示
-    messages_list = Message.objects.filter(status='published').select_related('author').order_by('-created_at')
-    # 打印消息数量，用于调试
-    print(f"Found {messages_list.count()} published messages")
-    # 分页，每页显示10条，使用get_page()方法简化分页代码
-    paginator = Paginator(messages_list, 10)
-    page = request.GET.get('page')
-    messages = paginator.get_page(page)  # 自动处理无效页码
-    # 打印分页后消息数量，用于调试
-    print(f"Pagination: page {page}, items: {messages.object_list.count()}")
-    return render(request, 'messages/message_list.html', {'messages_list': messages})
+    # 获取所有已发布的消息，只取列表字段（不含正文），关联作者并预取标签
+    messages_list = Message.objects.published().for_list()
+    query = request.GET.get('search', '').strip()
+    sort = request.GET.get('sort') if request.GET.get('sort') in SORT_ORDERINGS else 'latest'
+    if query:
+        # 搜索结果按相关度排序，使用全文索引并只加载当前页
+        messages = Paginator(SearchResults(messages_list, query), 10).get_page(request.GET.get('page'))
+    else:
+        # 分页，每页显示10条；带cursor参数时使用游标分页；?sort=hot 按热度分数排序
+        messages = paginate_messages(request, messages_list, SORT_ORDERINGS[sort])
+    # 本页作者的头像 URL 一次取出
+    request_avatar_urls(request, [message.author_id for message in messages])
+    return render(request, 'messages/message_list.html', {
+        'messages_list': messages,
+        'sort': sort,
+        'interaction': interaction_state(request.user, [message.pk for message in messages]),
+    })
 
 
 def message_detail(request, pk):
     """消息详情视图"""
+    response = _render_message_detail(request, pk=pk)
+    # 浏览量在缓存页面之外记录，命中缓存或返回 304 的访问同样计数；增量定期批量写回数据库
+    if response.status_code in (200, 304):
+        record_view(request, pk)
+    return response
+
+
+@conditional_page('message:{pk}', 'related')
+@cached_page('message:{pk}', 'related')
+def _render_message_detail(request, pk):
     # 使用select_related优化查询，减少数据库查询次数
     message = get_object_or_404(Message.objects.select_related('author'), pk=pk, status='published')
-    # 增加浏览量
-    message.increase_views()
-    # 获取相关消息，使用select_related优化查询
-    # 基于标签相似度获取相关消息
-    if message.tags.exists():
-        # 获取包含相同标签的消息
-        related_messages = Message.objects.filter(
-            tags__in=message.tags.all(), status='published'
-        ).select_related('author').exclude(pk=pk).distinct().order_by('-published_at')[:3]
-    else:
-        # 如果没有标签，获取最新的消息
-        related_messages = Message.objects.filter(
-            status='published'
-        ).select_related('author').exclude(pk=pk).order_by('-published_at')[:3]
+    views_count = message.views + get_pending_views(message.pk)
+    # 相关消息预先计算并保存在 related_ids 中，一次主键查询取出
+    related = related_messages(message, Message.objects.only('id', 'title', 'created_at'))
     # 获取当前消息的评论，使用select_related优化查询
     from comments.models import Comment
-    comments = Comment.objects.filter(message=message).select_related('author').order_by('-created_at')
+    comments = list(Comment.objects.filter(message=message).select_related('author').order_by('-created_at'))
+    request_avatar_urls(request, [message.author_id, *(comment.author_id for comment in comments)])
     return render(request, 'messages/message_detail.html', {
         'message': message,
-        'related_messages': related_messages,
-        'comments': comments
+        'views_count': views_count,
+        'related_messages': related,
+        'comments': comments,
+        # 匿名访问者没有个人状态，不查询
+        'interaction': interaction_state(request.user, [message.pk]),
     })
 
 
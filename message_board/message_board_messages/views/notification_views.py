@@ -1,26 +1,34 @@
 from django.shortcuts import render, get_object_or_404, redirect
+from django.http import JsonResponse
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
 from django.views.decorators.cache import never_cache
+from django.conf import settings
 from ..models import Notification
+from ..notifications import mark_read, get_unread_count, adjust_unread_count, reset_unread_count
 
 
 @login_required
 def notification_list(request):
     """用户通知列表"""
-    notifications = Notification.objects.filter(recipient=request.user).order_by('-created_at')
-    paginator = Paginator(notifications, 20)
+    notifications = Notification.objects.filter(recipient=request.user).select_related('actor', 'target')
+    paginator = Paginator(notifications.order_by('-created_at', '-id'), 20)
     page = request.GET.get('page')
     notification_page = paginator.get_page(page)
-    
-    # 标记所有通知为已读
-    unread_notifications = notifications.filter(is_read=False)
-    for notification in unread_notifications:
-        notification.mark_as_read()
-    
+    # 先取出本页通知，页面上仍能区分哪些是新通知
+    notification_page.object_list = list(notification_page.object_list)
+
+    # 用一条 UPDATE 标记为已读：默认只标记当前页，NOTIFICATION_MARK_READ_SCOPE = 'all' 时标记全部
+    if getattr(settings, 'NOTIFICATION_MARK_READ_SCOPE', 'page') == 'all':
+        mark_read(request.user)
+        unread_count = 0
+    else:
+        mark_read(request.user, [n.pk for n in notification_page.object_list if not n.is_read])
+        unread_count = get_unread_count(request.user)
+
     context = {
         'notification_page': notification_page,
-        'unread_count': 0,  # 已标记为已读，所以为0
+        'unread_count': unread_count,
     }
     return render(request, 'message_board_messages/notification_list.html', context)
 
@@ -43,8 +51,8 @@ def notification_detail(request, notification_id):
 @login_required
 def mark_all_as_read(request):
     """标记所有通知为已读"""
-    Notification.objects.filter(recipient=request.user, is_read=False).update(is_read=True)
-    return redirect('notification_list')
+    mark_read(request.user)
+    return redirect('message_board_messages:notification_list')
 
 
 @login_required
@@ -52,18 +60,27 @@ def delete_notification(request, notification_id):
     """删除通知"""
     notification = get_object_or_404(Notification, id=notification_id, recipient=request.user)
     notification.delete()
-    return redirect('notification_list')
+    if not notification.is_read:
+        adjust_unread_count(request.user.pk, -1)
+    return redirect('message_board_messages:notification_list')
 
 
 @login_required
 def delete_all_notifications(request):
     """删除所有通知"""
     Notification.objects.filter(recipient=request.user).delete()
-    return redirect('notification_list')
+    reset_unread_count(request.user.pk)
+    return redirect('message_board_messages:notification_list')
+
+
+@never_cache
+def unread_notification_count(request):
+    """以JSON返回当前用户的未读通知数，供页面轮询"""
+    return JsonResponse({'unread_count': get_unread_notification_count(request.user)})
 
 
 def get_unread_notification_count(user):
-    """获取用户未读通知数量"""
+    """获取用户未读通知数量（读取缓存中的计数）"""
     if user.is_authenticated:
-        return Notification.objects.filter(recipient=user, is_read=False).count()
+        return get_unread_count(user)
     return 0
@@ -0,0 +1,44 @@
+// 密码显示/隐藏功能
+document.addEventListener('DOMContentLoaded', function() {
+    const toggleButtons = document.querySelectorAll('.toggle-password');
+    toggleButtons.forEach(button => {
+        // 鼠标按下时显示密码
+        button.addEventListener('mousedown', function() {
+            const targetId = this.getAttribute('data-target');
+            const targetField = document.getElementById(targetId);
+            if (targetField) {
+                targetField.type = 'text';
+                // 切换图标
+                const icon = this.querySelector('i');
+                icon.classList.remove('fa-eye-slash');
+                icon.classList.add('fa-eye');
+            }
+        });
+
+        // 鼠标抬起时隐藏密码
+        button.addEventListener('mouseup', function() {
+            const targetId = this.getAttribute('data-target');
+            const targetField = document.getElementById(targetId);
+            if (targetField) {
+                targetField.type = 'password';
+                // 切换图标
+                const icon = this.querySelector('i');
+                icon.classList.remove('fa-eye');
+                icon.classList.add('fa-eye-slash');
+            }
+        });
+
+        // 鼠标离开按钮时隐藏密码
+        button.addEventListener('mouseleave', function() {
+            const targetId = this.getAttribute('data-target');
+            const targetField = document.getElementById(targetId);
+            if (targetField) {
+                targetField.type = 'password';
+                // 切换图标
+                const icon = this.querySelector('i');
+                icon.classList.remove('fa-eye');
+                icon.classList.add('fa-eye-slash');
+            }
+        });
+    });
+});